@@ -0,0 +1,82 @@
+"""
+Booking latency seen by the voice turn, with and without the write-behind journal.
+
+  direct  - upsert into MongoDB (w=majority) on the turn's critical path
+  journal - append to the local SQLite journal, MongoDB is written in the background
+
+    MONGODB_CONNECTION_STRING=mongodb://localhost:27017 python benchmarks/appointment_journal.py -n 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+
+def _booking(i: int) -> dict:
+    from agent_utils.appointment_journal import idempotency_key
+
+    patient_id = f"bench-{uuid.uuid4().hex[:8]}"
+    return {
+        "patient_full_name": "Benchmark Patient",
+        "patient_id": patient_id,
+        "doctor_specialty": "general physician",
+        "appointment_date": "2030-01-01",
+        "appointment_time": f"{9 + i % 8:02d}:00",
+        "status": "scheduled",
+        "idempotency_key": idempotency_key(patient_id, "general physician", "2030-01-01", f"{9 + i % 8:02d}:00"),
+    }
+
+
+def _summary(name: str, samples: list):
+    samples = sorted(samples)
+    print(
+        f"{name:>8}: p50 {statistics.median(samples) * 1000:.2f}ms "
+        f"p95 {samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000:.2f}ms "
+        f"max {samples[-1] * 1000:.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=100, help="Bookings per mode")
+    args = parser.parse_args()
+
+    os.environ.setdefault('MONGODB_CONNECTION_STRING', 'mongodb://localhost:27017')
+    from agent_utils.appointment_journal import AppointmentJournal
+    from agent_utils.mongodb import get_mongodb_connection
+
+    db = await get_mongodb_connection()
+    direct = []
+    for i in range(args.n):
+        booking = _booking(i)
+        started = time.perf_counter()
+        await db.appointments.update_one(
+            {"idempotency_key": booking["idempotency_key"]}, {"$setOnInsert": booking}, upsert=True)
+        direct.append(time.perf_counter() - started)
+
+    journal = AppointmentJournal(os.path.join(tempfile.mkdtemp(), 'journal.sqlite3'))
+    journaled = []
+    for i in range(args.n):
+        booking = _booking(i)
+        started = time.perf_counter()
+        await journal.record(booking)
+        journaled.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await journal.drain(timeout=60)
+    print(f"background flush of {args.n} bookings took {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    _summary('direct', direct)
+    _summary('journal', journaled)
+    await db.appointments.delete_many({"patient_id": {"$regex": "^bench-"}})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+CPU per session of the caller-side audio pipeline, by blueprint audio flags.
+
+A publisher streams noisy audio into a room; the benchmark subscribes to it
+once per simulated session with the noise cancellation the pipeline would pick,
+and mixes the background ambience the way BackgroundAudioPlayer does. Needs a
+LiveKit Cloud project, the noise cancellation models only run against it:
+
+    LIVEKIT_URL=wss://<project>.livekit.cloud LIVEKIT_API_KEY=... LIVEKIT_API_SECRET=... \\
+        python benchmarks/audio_pipeline.py -n 20 --seconds 30
+
+Each configuration runs in its own subprocess. The last column is how many
+sessions fit on one worker at --cpu-budget of one core for this audio work.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+# name -> (backgroundDenoisingEnabled, SIP caller, backgroundSound)
+CONFIGS = {
+    "always-on": (True, False, "office"),
+    "sip": (True, True, "office"),
+    "denoise-only": (True, True, "off"),
+    "ambience-only": (False, True, "office"),
+    "off": (False, True, "off"),
+}
+
+
+def _token(room: str, identity: str) -> str:
+    from livekit import api
+
+    return api.AccessToken(os.environ['LIVEKIT_API_KEY'], os.environ['LIVEKIT_API_SECRET']) \
+        .with_identity(identity) \
+        .with_grants(api.VideoGrants(room_join=True, room=room)) \
+        .to_jwt()
+
+
+async def _publish_noise(room, seconds: float):
+    import numpy as np
+    from livekit import rtc
+
+    source = rtc.AudioSource(48000, 1)
+    track = rtc.LocalAudioTrack.create_audio_track("caller", source)
+    await room.local_participant.publish_track(
+        track, rtc.TrackPublishOptions(source=rtc.TrackSource.SOURCE_MICROPHONE))
+    rng = np.random.default_rng(0)
+    for _ in range(int(seconds * 50)):
+        samples = (rng.normal(0, 2000, 960)).astype(np.int16)
+        await source.capture_frame(rtc.AudioFrame(samples.tobytes(), 48000, 1, 960))
+
+
+async def _consume_caller(track, nc, deadline: float):
+    from livekit import rtc
+
+    stream = rtc.AudioStream.from_track(track=track, sample_rate=48000, num_channels=1, noise_cancellation=nc)
+    async for _ in stream:
+        if time.monotonic() > deadline:
+            break
+    await stream.aclose()
+
+
+async def _mix_background(source, volume: float, deadline: float):
+    import numpy as np
+    from livekit import rtc
+
+    from agent_utils.background_audio import load_clip, looped_frames
+
+    clip = await load_clip(source)
+
+    async def with_volume():
+        async for frame in looped_frames(clip):
+            data = np.frombuffer(frame.data, dtype=np.int16)
+            yield rtc.AudioFrame((data * volume).astype(np.int16).tobytes(),
+                                 frame.sample_rate, frame.num_channels, frame.samples_per_channel)
+
+    mixer = rtc.AudioMixer(sample_rate=48000, num_channels=1, blocksize=960)
+    mixer.add_stream(with_volume())
+    started = time.monotonic()
+    produced = 0.0
+    async for frame in mixer:
+        produced += frame.samples_per_channel / frame.sample_rate
+        # Paced like a real-time output track
+        await asyncio.sleep(max(0.0, started + produced - time.monotonic()))
+        if time.monotonic() > deadline:
+            break
+    await mixer.aclose()
+
+
+async def run_config(name: str, sessions: int, seconds: float) -> dict:
+    from livekit import rtc
+
+    from agent_utils.audio_pipeline import (
+        BACKGROUND_VOLUME,
+        background_source,
+        noise_cancellation_for,
+    )
+
+    denoise, sip, sound = CONFIGS[name]
+    metadata = {"backgroundDenoisingEnabled": denoise, "backgroundSound": sound}
+
+    class Participant:
+        kind = rtc.ParticipantKind.PARTICIPANT_KIND_SIP if sip else rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD
+
+    room_name = f"bench-{uuid.uuid4().hex[:8]}"
+    publisher, subscriber = rtc.Room(), rtc.Room()
+    subscribed = asyncio.get_running_loop().create_future()
+
+    @subscriber.on("track_subscribed")
+    def _on_track(track, *_):
+        if not subscribed.done():
+            subscribed.set_result(track)
+
+    await subscriber.connect(os.environ['LIVEKIT_URL'], _token(room_name, "agent"))
+    await publisher.connect(os.environ['LIVEKIT_URL'], _token(room_name, "caller"))
+    publishing = asyncio.create_task(_publish_noise(publisher, seconds + 10))
+    track = await asyncio.wait_for(subscribed, 10)
+
+    background = background_source(metadata)
+    cpu_started = time.process_time()
+    deadline = time.monotonic() + seconds
+    work = [_consume_caller(track, noise_cancellation_for(metadata, Participant()), deadline)
+            for _ in range(sessions)]
+    if background is not None:
+        work += [_mix_background(background, BACKGROUND_VOLUME, deadline) for _ in range(sessions)]
+    await asyncio.gather(*work)
+    cpu = time.process_time() - cpu_started
+
+    publishing.cancel()
+    await publisher.disconnect()
+    await subscriber.disconnect()
+    return {"config": name, "sessions": sessions, "cpu_per_session": cpu / (seconds * sessions)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=20, help="Concurrent sessions")
+    parser.add_argument('--seconds', type=float, default=30.0, help="Measured duration")
+    parser.add_argument('--cpu-budget', type=float, default=0.7, help="Share of one core available to audio")
+    parser.add_argument('--config', choices=list(CONFIGS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.config:
+        print(json.dumps(asyncio.run(run_config(args.config, args.n, args.seconds))))
+        return
+
+    baseline = None
+    for name in CONFIGS:
+        output = subprocess.run(
+            [sys.executable, __file__, '-n', str(args.n), '--seconds', str(args.seconds), '--config', name],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        per_session = result['cpu_per_session']
+        capacity = args.cpu_budget / per_session if per_session else float('inf')
+        baseline = baseline or capacity
+        print(
+            f"{name:>13}: {per_session * 100:.2f}% of a core per session, "
+            f"~{capacity:.0f} sessions per worker ({capacity / baseline:.1f}x)"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+CPU and memory of background ambience for many concurrent sessions in one process.
+
+  per-session - every session decodes and resamples the clip file itself and
+                again on every loop, as BackgroundAudioPlayer does for a file source
+  shared      - the clip is decoded once, sessions loop over the shared PCM buffer
+
+Each mode runs in its own subprocess so RSS is not shared between them.
+
+    python benchmarks/background_audio.py -n 24 --seconds 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _consume(frames, seconds: float):
+    produced = 0.0
+    async for frame in frames:
+        produced += frame.samples_per_channel / frame.sample_rate
+        if produced >= seconds:
+            break
+
+
+async def _per_session_frames(path: str):
+    from livekit.agents.utils.audio import audio_frames_from_file
+
+    while True:
+        async for frame in audio_frames_from_file(path, sample_rate=48000, num_channels=1):
+            yield frame
+
+
+async def run_mode(mode: str, sessions: int, seconds: float) -> dict:
+    from livekit.agents import BuiltinAudioClip
+
+    from agent_utils.background_audio import load_clip, looped_frames
+
+    path = BuiltinAudioClip.OFFICE_AMBIENCE.path()
+    rss_before = _rss_mb()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+
+    if mode == 'shared':
+        clip = await load_clip(path)
+        streams = [looped_frames(clip) for _ in range(sessions)]
+    else:
+        streams = [_per_session_frames(path) for _ in range(sessions)]
+    await asyncio.gather(*(_consume(stream, seconds) for stream in streams))
+
+    cpu = time.process_time() - cpu_started
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "cpu_ms_per_session": cpu * 1000 / sessions,
+        "cpu_ms_per_audio_second": cpu * 1000 / (sessions * seconds),
+        "rss_growth_mb": _rss_mb() - rss_before,
+        "wall_s": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=24, help="Concurrent sessions")
+    parser.add_argument('--seconds', type=float, default=60.0, help="Ambience played per session")
+    parser.add_argument('--mode', choices=['per-session', 'shared'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(run_mode(args.mode, args.n, args.seconds))))
+        return
+
+    for mode in ('per-session', 'shared'):
+        output = subprocess.run(
+            [sys.executable, __file__, '-n', str(args.n), '--seconds', str(args.seconds), '--mode', mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:>11}: {result['sessions']} sessions, "
+            f"{result['cpu_ms_per_session']:.1f}ms CPU/session "
+            f"({result['cpu_ms_per_audio_second']:.2f}ms per second of audio), "
+            f"RSS +{result['rss_growth_mb']:.1f}MB"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Worker boot budget check: fails (exit 1) when importing the agent module takes
+longer or grows RSS more than the budget.
+
+Importing agent.py is what a worker and every job process does at boot, it
+also preloads the provider plugins the configured blueprints use. Each run is
+a fresh interpreter, the median of --runs is compared against the budget.
+
+    python benchmarks/boot_budget.py --max-seconds 8 --max-rss-mb 700
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+_PROBE = """
+import json, time
+from agent_utils.model_providers import rss_mb
+rss_before = rss_mb()
+started = time.perf_counter()
+import agent
+from agent_utils.model_providers import ProviderMappings
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "rss_mb": rss_mb(),
+    "rss_growth_mb": rss_mb() - rss_before,
+    "plugins": ProviderMappings.import_report,
+}))
+"""
+
+
+def boot_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE], cwd=SRC_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-seconds', type=float, default=float(os.getenv('BOOT_BUDGET_SECONDS', '8.0')))
+    parser.add_argument('--max-rss-mb', type=float, default=float(os.getenv('BOOT_BUDGET_RSS_MB', '700')))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [boot_once() for _ in range(args.runs)]
+    seconds = statistics.median(r['seconds'] for r in runs)
+    rss = statistics.median(r['rss_mb'] for r in runs)
+
+    for module_path, (import_seconds, rss_growth) in sorted(runs[-1]['plugins'].items()):
+        print(f"  {module_path:<32} {import_seconds * 1000:7.0f}ms  RSS +{rss_growth:.1f}MB")
+    print(f"boot: {seconds:.2f}s (budget {args.max_seconds:.2f}s), RSS {rss:.0f}MB (budget {args.max_rss_mb:.0f}MB)")
+
+    failed = []
+    if seconds > args.max_seconds:
+        failed.append("boot time")
+    if rss > args.max_rss_mb:
+        failed.append("RSS")
+    if failed:
+        print(f"FAIL: {' and '.join(failed)} over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Room stand-in for running full agent sessions offline.
+
+CallerInput plays caller utterances (synthetic speech or decoded recordings)
+into the session in real time, with silence in between, the way the room's
+audio track would. SpeakerOutput plays the agent's audio out on a virtual
+clock and records when each reply starts, so the caller-perceived turn
+latency (end of caller speech -> first agent audio) can be measured.
+start_offline_session() wires both into an AgentSession built from a
+blueprint the same way the entrypoint does, without connecting to LiveKit.
+"""
+
+import asyncio
+import inspect
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import AgentSession, io
+
+from agent_utils.provider_instances import create_provider_instances
+from agent_utils.session_data import SessionData
+from agent_utils.session_metrics import SessionMetrics
+
+CALLER_SAMPLE_RATE = 24000
+CALLER_FRAME_MS = 20
+# Caller waits this long for a reply before giving up on the turn
+REPLY_TIMEOUT = 15.0
+
+_speech: dict[int, bytes] = {}
+
+
+def synthetic_speech(seconds: float, sample_rate: int = CALLER_SAMPLE_RATE) -> bytes:
+    """Voiced harmonics modulated at a syllable rate, cached per 100ms of length"""
+    key = max(1, round(seconds * 10))
+    pcm = _speech.get(key)
+    if pcm is None:
+        t = np.arange(int(key * sample_rate / 10)) / sample_rate
+        voice = sum(np.sin(2 * np.pi * 140 * h * t) / h for h in range(1, 6))
+        envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+        pcm = _speech[key] = (voice * envelope * 0.25 * 32767 / 2.3).astype(np.int16).tobytes()
+    return pcm
+
+
+def load_utterance(path: str, sample_rate: int = CALLER_SAMPLE_RATE) -> bytes:
+    """Recorded caller audio as mono 16-bit PCM at the caller input's rate"""
+    import av
+
+    chunks = []
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=sample_rate)
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().tobytes())
+    for resampled in resampler.resample(None):
+        chunks.append(resampled.to_ndarray().tobytes())
+    return b''.join(chunks)
+
+
+class CallerInput(io.AudioInput):
+    """Real-time paced caller audio: queued utterances, silence otherwise"""
+
+    def __init__(self, sample_rate: int = CALLER_SAMPLE_RATE):
+        # Newer livekit-agents 1.2 releases keep a label on every input
+        if 'label' in inspect.signature(io.AudioInput.__init__).parameters:
+            super().__init__(label='fake-room')
+        self.sample_rate = sample_rate
+        self._samples_per_frame = sample_rate * CALLER_FRAME_MS // 1000
+        self._silence = bytes(self._samples_per_frame * 2)
+        self._queue: list[tuple] = []
+        self._current: Optional[tuple] = None
+        self._offset = 0
+        self._next_frame: Optional[float] = None
+        self._closed = False
+
+    def say(self, pcm: bytes) -> "asyncio.Future[float]":
+        """Queue an utterance, the future resolves to the wall time its audio ended"""
+        done = asyncio.get_running_loop().create_future()
+        self._queue.append((pcm, done))
+        return done
+
+    def close(self):
+        self._closed = True
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        if self._closed:
+            raise StopAsyncIteration
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._next_frame is None or self._next_frame < now - 0.2:
+            # Start, or the loop fell behind: resync instead of bursting
+            self._next_frame = now
+        delay = self._next_frame - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_frame += CALLER_FRAME_MS / 1000
+
+        if self._current is None and self._queue:
+            self._current, self._offset = self._queue.pop(0), 0
+        if self._current is None:
+            data = self._silence
+        else:
+            pcm, done = self._current
+            frame_bytes = self._samples_per_frame * 2
+            data = pcm[self._offset:self._offset + frame_bytes]
+            self._offset += frame_bytes
+            if len(data) < frame_bytes:
+                data += self._silence[:frame_bytes - len(data)]
+            if self._offset >= len(pcm):
+                self._current = None
+                if not done.done():
+                    done.set_result(time.time())
+        return rtc.AudioFrame(data=data, sample_rate=self.sample_rate, num_channels=1,
+                              samples_per_channel=self._samples_per_frame)
+
+
+class SpeakerOutput(io.AudioOutput):
+    """Plays agent audio out on a virtual clock and records when replies start"""
+
+    def __init__(self, sample_rate: Optional[int] = None):
+        # Newer livekit-agents 1.2 releases require a label and capabilities
+        extra = {}
+        if hasattr(io, 'AudioOutputCapabilities'):
+            extra = {'label': 'fake-room', 'capabilities': io.AudioOutputCapabilities(pause=False)}
+        super().__init__(next_in_chain=None, sample_rate=sample_rate, **extra)
+        # Wall time of the first frame of each playback segment
+        self.segment_starts: list[float] = []
+        self.playing = False
+        self._pushed = 0.0
+        self._playout_end = 0.0
+        self._interrupted = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        now = time.time()
+        if not self._pushed:
+            self.segment_starts.append(now)
+            self.playing = True
+            self._idle.clear()
+            self._playout_end = now
+        self._pushed += frame.duration
+        self._playout_end += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if not self._pushed:
+            return
+        self._flush_task = asyncio.create_task(self._wait_for_playout())
+
+    def clear_buffer(self) -> None:
+        if self._pushed:
+            self._interrupted.set()
+
+    async def _wait_for_playout(self):
+        try:
+            await asyncio.wait_for(self._interrupted.wait(), max(0.0, self._playout_end - time.time()))
+            interrupted = True
+        except asyncio.TimeoutError:
+            interrupted = False
+        position = self._pushed if not interrupted else max(0.0, self._pushed - (self._playout_end - time.time()))
+        self._pushed = 0.0
+        self._interrupted.clear()
+        self.playing = False
+        self._idle.set()
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
+
+    def first_segment_after(self, t: float) -> Optional[float]:
+        return next((s for s in self.segment_starts if s >= t), None)
+
+    async def wait_quiet(self, quiet: float = 0.4, timeout: float = REPLY_TIMEOUT):
+        """Wait until nothing has played for `quiet` seconds (tool fillers and replies included)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            await self._idle.wait()
+            await asyncio.sleep(quiet)
+            if self._idle.is_set():
+                return
+
+
+async def caller_turn(caller: CallerInput, speaker: SpeakerOutput, pcm: bytes,
+                      timeout: float = REPLY_TIMEOUT) -> Optional[float]:
+    """Speak one utterance and wait for the reply; returns the perceived latency or None"""
+    speech_end = await caller.say(pcm)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        started = speaker.first_segment_after(speech_end)
+        if started is not None:
+            await speaker.wait_quiet()
+            return started - speech_end
+        await asyncio.sleep(0.02)
+    return None
+
+
+class OfflineSession:
+    def __init__(self, session: AgentSession, caller: CallerInput, speaker: SpeakerOutput,
+                 metrics: SessionMetrics, providers: dict[str, Any]):
+        self.session = session
+        self.caller = caller
+        self.speaker = speaker
+        self.metrics = metrics
+        self.providers = providers
+
+    async def aclose(self):
+        self.caller.close()
+        await self.session.aclose()
+        for instance in self.providers.values():
+            await instance.aclose()
+
+
+async def start_offline_session(agent, metadata: Mapping[str, Any], vad, session_id: str,
+                                blueprint_hash: Optional[str] = None, turn_detection: Any = "vad",
+                                tracer=None, on_metrics: Optional[Callable] = None) -> OfflineSession:
+    """Start an AgentSession on a fake room, providers built from the blueprint"""
+    providers = create_provider_instances(metadata)
+    session_data = SessionData(metadata=metadata, blueprint_hash=blueprint_hash, tracer=tracer)
+    session = AgentSession(
+        userdata=session_data,
+        stt=providers['stt'],
+        llm=providers['llm'],
+        tts=providers['tts'],
+        turn_detection=turn_detection,
+        vad=vad,
+        preemptive_generation=True,
+    )
+    metrics = SessionMetrics(session_id, agent="offline")
+    session.on("metrics_collected", lambda ev: metrics.record(ev.metrics))
+    if on_metrics is not None:
+        session.on("metrics_collected", lambda ev: on_metrics(ev.metrics))
+    if tracer is not None:
+        tracer.attach(session)
+
+    caller, speaker = CallerInput(), SpeakerOutput()
+    session.input.audio = caller
+    session.output.audio = speaker
+    await session.start(agent=agent)
+    return OfflineSession(session, caller, speaker, metrics, providers)
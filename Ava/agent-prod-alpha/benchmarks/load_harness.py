@@ -0,0 +1,226 @@
+"""
+How many concurrent Ava sessions one worker process holds.
+
+Runs the real Assistant, its tools and AgentSession pipeline fully offline:
+the blueprint's STT, LLM and TTS are replaced by the local stand-in providers
+(benchmarks/standin_providers.py, registered through ProviderMappings) and
+callers speak synthetic audio through a fake room (benchmarks/fake_room.py).
+Sessions are started evenly over --ramp-seconds up to -n, then held for
+--hold-seconds; every caller keeps taking turns until the end.
+
+Every --interval the harness prints the active sessions, event loop lag
+(how late a 50ms timer fires), CPU use of the process, RSS and the turn
+latency of the turns finished in that interval: "perceived" is the end of
+caller speech to the first agent audio. "pipe p95" is EOU delay + LLM TTFT +
+TTS TTFB from the session metrics, over all turns so far. A node holds roughly cores x the session
+count at which lag or latency starts to climb.
+
+    python benchmarks/load_harness.py -n 50 --ramp-seconds 120 --hold-seconds 60 \\
+        --llm-ttft lognormal:0.45:1.2 --tts-ttfb lognormal:0.2:0.5 --stt-latency uniform:0.1:0.3
+
+The end-of-turn model runs in the worker's inference process, so sessions
+use VAD turn detection here. Tool calls (--tool-call) run the real tools and
+need the MongoDB they use.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+STANDIN_PROVIDER = 'standin'
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+
+def standin_blueprint(base: dict, args) -> dict:
+    """The blueprint with its providers replaced by the stand-ins"""
+    metadata = dict(base)
+    metadata['model'] = {
+        **{k: v for k, v in base['model'].items() if k in ('messages', 'toolIds')},
+        'provider': STANDIN_PROVIDER,
+        'model': 'standin-llm',
+        'ttft': args.llm_ttft,
+        'tokens_per_second': args.llm_tokens_per_second,
+        'tool_calls': [json.loads(call) for call in args.tool_call],
+    }
+    metadata['voice'] = {'provider': STANDIN_PROVIDER, 'voice_id': 'standin-voice', 'ttfb': args.tts_ttfb}
+    metadata['transcriber'] = {'provider': STANDIN_PROVIDER, 'model': 'standin-stt', 'latency': args.stt_latency}
+    # Nothing to preload or play offline
+    metadata['backgroundSound'] = 'off'
+    return metadata
+
+
+class LoadStats:
+    def __init__(self):
+        self.active = 0
+        self.started = 0
+        self.failed = 0
+        self.perceived: list[float] = []
+        self.missed = 0
+        self.loop_lag: list[float] = []
+
+    def take_interval(self):
+        perceived, lag, missed = self.perceived, self.loop_lag, self.missed
+        self.perceived, self.loop_lag, self.missed = [], [], 0
+        return perceived, lag, missed
+
+
+async def monitor_loop_lag(stats: LoadStats, period: float = 0.05):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + period
+        await asyncio.sleep(period)
+        stats.loop_lag.append(max(0.0, loop.time() - expected))
+
+
+async def run_caller(index: int, args, assistant_class, metadata: dict, vad, stats: LoadStats, sessions: list,
+                     stop: asyncio.Event):
+    from fake_room import caller_turn, start_offline_session, synthetic_speech
+
+    from agent_utils.agent_tools import build_raw_tools
+    from agent_utils.turn_tracing import TurnTracer
+
+    rng = random.Random(args.seed + index)
+    try:
+        assistant = assistant_class(metadata=metadata, tools=build_raw_tools(metadata.get('tools', [])))
+        tracer = TurnTracer(f"load-{index}-{int(time.time())}") if args.trace else None
+        offline = await start_offline_session(assistant, metadata, vad, session_id=f"load-{index}", tracer=tracer)
+    except Exception as e:
+        stats.failed += 1
+        print(f"[Radiance] ---> Session {index} failed to start", e)
+        return
+    sessions.append(offline)
+    stats.active += 1
+    stats.started += 1
+    try:
+        # Let the greeting play before the first turn
+        await offline.speaker.wait_quiet(quiet=0.5)
+        while not stop.is_set():
+            pcm = synthetic_speech(rng.uniform(args.utterance_min, args.utterance_max))
+            latency = await caller_turn(offline.caller, offline.speaker, pcm)
+            if latency is None:
+                stats.missed += 1
+            else:
+                stats.perceived.append(latency)
+            await asyncio.sleep(rng.uniform(args.think_min, args.think_max))
+    finally:
+        stats.active -= 1
+
+
+def pipeline_latency(sessions: list) -> Optional[float]:
+    """p95 (bucket upper bound) of the pipeline turn latency over all sessions so far"""
+    from agent_utils.session_metrics import Histogram
+
+    merged = Histogram()
+    for offline in sessions:
+        merged.merge(offline.metrics.histograms["turn_latency"])
+    p95 = merged.quantile(0.95)
+    return None if p95 == float('inf') else p95
+
+
+async def run(args) -> int:
+    from standin_providers import VAD
+
+    # Boots like a job process: blueprint registry and plugin preload
+    from agent import Assistant
+    from agent_utils.default_agent import default_bp
+    from agent_utils.model_providers import ProviderMappings, rss_mb
+    from agent_utils.percentiles import percentile
+
+    ProviderMappings.register(STANDIN_PROVIDER, 'standin_providers')
+    metadata = standin_blueprint(default_bp, args)
+    if args.vad == 'silero':
+        from livekit.plugins import silero
+
+        vad = silero.VAD.load()
+    else:
+        vad = VAD()
+
+    stats = LoadStats()
+    stop = asyncio.Event()
+    sessions: list = []
+    callers: list[asyncio.Task] = []
+    monitor = asyncio.create_task(monitor_loop_lag(stats))
+
+    print(f"{'t':>6} {'sessions':>8} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'CPU %':>6} {'RSS MB':>7} "
+          f"{'turns':>6} {'miss':>5} {'perc p50':>9} {'perc p95':>9} {'pipe p95':>9}")
+    started = time.perf_counter()
+    cpu_mark, wall_mark = time.process_time(), started
+    next_report = started + args.interval
+    ramp_step = args.ramp_seconds / max(1, args.n)
+    all_perceived: list[float] = []
+
+    while True:
+        now = time.perf_counter()
+        elapsed = now - started
+        while len(callers) < args.n and len(callers) * ramp_step <= elapsed:
+            callers.append(asyncio.create_task(
+                run_caller(len(callers), args, Assistant, metadata, vad, stats, sessions, stop)))
+        if now >= next_report:
+            perceived, lag, missed = stats.take_interval()
+            all_perceived += perceived
+            cpu = (time.process_time() - cpu_mark) / (now - wall_mark) * 100
+            cpu_mark, wall_mark = time.process_time(), now
+            print(f"{elapsed:6.0f} {stats.active:>8} {_ms(percentile(lag, 0.5)):>8} {_ms(percentile(lag, 0.99)):>8} "
+                  f"{_ms(max(lag) if lag else None):>8} {cpu:6.0f} {rss_mb():7.0f} {len(perceived):>6} {missed:>5} "
+                  f"{_ms(percentile(perceived, 0.5)):>9} {_ms(percentile(perceived, 0.95)):>9} "
+                  f"{_ms(pipeline_latency(sessions)):>9}", flush=True)
+            next_report += args.interval
+        if elapsed >= args.ramp_seconds + args.hold_seconds:
+            break
+        await asyncio.sleep(0.1)
+
+    stop.set()
+    await asyncio.gather(*callers, return_exceptions=True)
+    monitor.cancel()
+    for offline in sessions:
+        try:
+            await offline.aclose()
+            tracer = offline.session.userdata.tracer
+            if tracer is not None:
+                await tracer.aclose()
+        except Exception as e:
+            print("[Radiance] ---> Error closing session", e)
+
+    print(f"\n{stats.started} sessions started, {stats.failed} failed, {len(all_perceived)} turns, "
+          f"perceived turn latency p50 {_ms(percentile(all_perceived, 0.5))}ms "
+          f"p95 {_ms(percentile(all_perceived, 0.95))}ms")
+    return 1 if stats.failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=20, help="Sessions to ramp up to")
+    parser.add_argument('--ramp-seconds', type=float, default=60.0)
+    parser.add_argument('--hold-seconds', type=float, default=60.0)
+    parser.add_argument('--interval', type=float, default=10.0, help="Report interval")
+    parser.add_argument('--llm-ttft', default='lognormal:0.45:1.2', help="Latency spec, see standin_providers")
+    parser.add_argument('--llm-tokens-per-second', type=float, default=50.0)
+    parser.add_argument('--tts-ttfb', default='lognormal:0.2:0.5')
+    parser.add_argument('--stt-latency', default='uniform:0.1:0.3')
+    parser.add_argument('--tool-call', action='append', default=[],
+                        help='Tool the LLM calls, JSON: {"name": ..., "arguments": {...}, "probability": 0.3}')
+    parser.add_argument('--utterance-min', type=float, default=1.0, help="Caller utterance seconds")
+    parser.add_argument('--utterance-max', type=float, default=3.0)
+    parser.add_argument('--think-min', type=float, default=0.5, help="Caller pause after a reply, seconds")
+    parser.add_argument('--think-max', type=float, default=2.0)
+    parser.add_argument('--vad', choices=['energy', 'silero'], default='energy',
+                        help="silero costs real CPU but may not detect the synthetic speech")
+    parser.add_argument('--trace', action='store_true',
+                        help="Write per-turn traces to TRACE_DIR, see python -m agent_utils.turn_tracing report")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
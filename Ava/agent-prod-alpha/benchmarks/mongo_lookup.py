@@ -0,0 +1,79 @@
+"""
+Patient lookup latency in a cold vs a prewarmed job process.
+
+Each sample runs in a fresh interpreter, like a new JobProcess:
+  cold - the client is created on the first lookup (the old behaviour)
+  warm - prewarm_mongodb() runs first, then the lookup is timed
+
+    MONGODB_CONNECTION_STRING=mongodb://localhost:27017 python benchmarks/mongo_lookup.py -n 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+BENCH_PATIENT_ID = 'bench-0001'
+
+
+def _lookup_once(scenario: str) -> float:
+    from agent_utils import mongodb
+    from agent_utils.function_tools import PATIENT_PROJECTION, patient_id_filter
+
+    if scenario == 'warm':
+        mongodb.prewarm_mongodb()
+
+    async def lookup():
+        started = time.perf_counter()
+        db = await mongodb.get_mongodb_connection()
+        await db.patient_data.find_one(patient_id_filter(BENCH_PATIENT_ID), PATIENT_PROJECTION)
+        return time.perf_counter() - started
+
+    return asyncio.run(lookup())
+
+
+def _seed():
+    from pymongo import MongoClient
+
+    client = MongoClient(os.environ['MONGODB_CONNECTION_STRING'])
+    db = client[os.getenv('MONGODB_DATABASE_NAME', 'medical_db')]
+    db.patient_data.update_one(
+        {"patient_id": BENCH_PATIENT_ID},
+        {"$set": {"full_name": "Benchmark Patient", "date_of_birth": "1990-01-01"}},
+        upsert=True,
+    )
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=10, help="Processes per scenario")
+    args = parser.parse_args()
+
+    from agent_utils.percentiles import percentile
+
+    os.environ.setdefault('MONGODB_CONNECTION_STRING', 'mongodb://localhost:27017')
+    _seed()
+
+    context = multiprocessing.get_context('spawn')
+    for scenario in ('cold', 'warm'):
+        samples = []
+        for _ in range(args.n):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                samples.append(pool.submit(_lookup_once, scenario).result())
+        samples.sort()
+        print(
+            f"{scenario:>5}: first lookup p50 {statistics.median(samples) * 1000:.1f}ms "
+            f"p95 {percentile(samples, 0.95) * 1000:.1f}ms "
+            f"max {samples[-1] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Compare STT/LLM/TTS provider combinations on recorded calls, fully offline.
+
+Provider timings are recorded in production (agent_utils.provider_timings,
+PROVIDER_TIMINGS_PATH). For every combination of recorded LLM, TTS and STT
+providers, each recorded call of the corpus is replayed through the real
+Assistant and AgentSession: the caller's recorded utterances are played into
+a fake room and the providers are stand-ins replaying that provider's
+recorded TTFT/TTFB/STT latency, streaming rate and completion sizes.
+
+The corpus holds one directory per call with the caller's utterances in order
+and, optionally, their transcripts next to them:
+
+    corpus/<call id>/01.wav  01.txt  02.wav  02.txt ...
+
+    python benchmarks/provider_ab.py corpus/ --llm openai/gpt-4o-mini --llm groq/llama-3.3-70b-versatile
+
+Without --llm/--tts/--stt every recorded provider of that kind is compared.
+"turn" is the caller-perceived latency, end of caller speech to first agent
+audio; tokens are per LLM request.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+AUDIO_EXTENSIONS = ('.wav', '.ogg', '.mp3', '.flac', '.m4a', '.opus')
+KINDS = ['llm', 'tts', 'stt']
+SECTIONS = {'llm': 'model', 'tts': 'voice', 'stt': 'transcriber'}
+
+
+def load_corpus(directory: str, limit: Optional[int] = None) -> list[dict]:
+    """[{"id", "utterances": [audio paths], "transcripts": [text or None]}]"""
+    calls = []
+    for call_id in sorted(os.listdir(directory)):
+        path = os.path.join(directory, call_id)
+        if not os.path.isdir(path):
+            continue
+        audio = sorted(f for f in os.listdir(path) if f.lower().endswith(AUDIO_EXTENSIONS))
+        if not audio:
+            continue
+        transcripts = []
+        for name in audio:
+            text_path = os.path.join(path, os.path.splitext(name)[0] + '.txt')
+            if os.path.exists(text_path):
+                with open(text_path, encoding='utf-8') as f:
+                    transcripts.append(f.read().strip())
+            else:
+                transcripts.append(None)
+        calls.append({"id": call_id, "utterances": [os.path.join(path, f) for f in audio],
+                      "transcripts": transcripts})
+    return calls[:limit] if limit else calls
+
+
+def rotated(config: dict, offset: int) -> dict:
+    """The replayed samples start at `offset`, so calls don't all replay the same requests"""
+    config = dict(config)
+    for key, value in config.items():
+        if isinstance(value, dict) and value.get('dist') == 'replay':
+            samples = value['samples']
+            shift = offset % len(samples)
+            config[key] = {**value, 'samples': samples[shift:] + samples[:shift]}
+    return config
+
+
+class ComboResult:
+    def __init__(self, combo: dict[str, str]):
+        self.combo = combo
+        self.values: dict[str, list[float]] = {
+            "llm_ttft": [], "tts_ttfb": [], "stt_duration": [], "turn": [],
+            "prompt_tokens": [], "completion_tokens": [],
+        }
+        self.missed = 0
+
+    def on_metrics(self, metrics):
+        v = self.values
+        if metrics.type == 'llm_metrics' and metrics.ttft >= 0:
+            v["llm_ttft"].append(metrics.ttft)
+            v["prompt_tokens"].append(metrics.prompt_tokens)
+            v["completion_tokens"].append(metrics.completion_tokens)
+        elif metrics.type == 'tts_metrics' and metrics.ttfb >= 0:
+            v["tts_ttfb"].append(metrics.ttfb)
+        elif metrics.type == 'stt_metrics' and not metrics.streamed:
+            v["stt_duration"].append(metrics.duration)
+
+    def summary(self) -> dict:
+        from agent_utils.percentiles import percentile
+
+        out = {"combo": self.combo, "turns": len(self.values["turn"]), "missed": self.missed}
+        for name, values in self.values.items():
+            if name.endswith("_tokens"):
+                out[name] = statistics.mean(values) if values else None
+            else:
+                out[name] = {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+        return out
+
+
+async def replay_call(call: dict, offset: int, combo_configs: dict[str, dict], base: dict, assistant_class,
+                      vad, result: ComboResult):
+    from fake_room import caller_turn, load_utterance, start_offline_session
+    from standin_providers import DEFAULT_TRANSCRIPT
+
+    from agent_utils.agent_tools import build_raw_tools
+
+    metadata = dict(base)
+    for kind, config in combo_configs.items():
+        section = rotated(config, offset)
+        if kind == 'llm':
+            section.update({k: v for k, v in base['model'].items() if k in ('messages', 'toolIds')})
+        if kind == 'stt':
+            section['transcripts'] = [t or DEFAULT_TRANSCRIPT for t in call['transcripts']]
+        metadata[SECTIONS[kind]] = section
+    metadata['backgroundSound'] = 'off'
+
+    utterances = await asyncio.gather(*(asyncio.to_thread(load_utterance, path) for path in call['utterances']))
+    assistant = assistant_class(metadata=metadata, tools=build_raw_tools(metadata.get('tools', [])))
+    offline = await start_offline_session(assistant, metadata, vad, session_id=f"ab-{call['id']}",
+                                          on_metrics=result.on_metrics)
+    try:
+        await offline.speaker.wait_quiet(quiet=0.5)
+        for pcm in utterances:
+            latency = await caller_turn(offline.caller, offline.speaker, pcm)
+            if latency is None:
+                result.missed += 1
+            else:
+                result.values["turn"].append(latency)
+    finally:
+        await offline.aclose()
+
+
+def _ms(stat: Optional[dict]) -> str:
+    if not stat or stat["p50"] is None:
+        return "-"
+    return f"{stat['p50'] * 1000:.0f}/{stat['p95'] * 1000:.0f}"
+
+
+def print_table(summaries: list[dict]):
+    header = f"{'llm':<28} {'tts':<28} {'stt':<24} {'turns':>5} {'TTFT ms':>11} {'TTFB ms':>11} " \
+             f"{'STT ms':>11} {'turn ms':>11} {'prompt':>7} {'compl':>6}"
+    print("p50/p95 per column\n" + header)
+    for s in sorted(summaries, key=lambda s: (s["turn"]["p50"] is None, s["turn"]["p50"] or 0)):
+        combo = s["combo"]
+        tokens = [f"{s[k]:.0f}" if s[k] is not None else "-" for k in ("prompt_tokens", "completion_tokens")]
+        print(f"{combo['llm']:<28} {combo['tts']:<28} {combo['stt']:<24} {s['turns']:>5} {_ms(s['llm_ttft']):>11} "
+              f"{_ms(s['tts_ttfb']):>11} {_ms(s['stt_duration']):>11} {_ms(s['turn']):>11} "
+              f"{tokens[0]:>7} {tokens[1]:>6}" + (f"  ({s['missed']} missed)" if s['missed'] else ""))
+
+
+async def run(args) -> int:
+    # Boots like a job process: blueprint registry and plugin preload
+    from agent import Assistant, blueprint_registry
+    from agent_utils.blueprint_registry import thaw
+    from agent_utils.default_agent import default_bp
+    from agent_utils.model_providers import ProviderMappings
+    from agent_utils.provider_timings import (
+        STANDIN_PROVIDER,
+        load_timings,
+        replay_config,
+    )
+
+    ProviderMappings.register(STANDIN_PROVIDER, 'standin_providers')
+    calls = load_corpus(args.corpus, args.calls)
+    if not calls:
+        print(f"No recorded calls in {args.corpus}")
+        return 1
+    timings = load_timings(args.timings)
+    recorded = {kind: sorted(label for k, label in timings if k == kind) for kind in KINDS}
+    chosen = {'llm': args.llm or recorded['llm'], 'tts': args.tts or recorded['tts'], 'stt': args.stt or recorded['stt']}
+    for kind, labels in chosen.items():
+        missing = [label for label in labels if (kind, label) not in timings]
+        if missing or not labels:
+            print(f"No recorded {kind} timings for {', '.join(missing) or 'any provider'}")
+            return 1
+
+    blueprint = blueprint_registry.get(args.agent_id) if args.agent_id else None
+    base = thaw(blueprint.data) if blueprint is not None else default_bp
+    if args.vad == 'silero':
+        from livekit.plugins import silero
+
+        vad = silero.VAD.load()
+    else:
+        from standin_providers import VAD
+
+        vad = VAD()
+
+    summaries = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    for llm_label, tts_label, stt_label in itertools.product(chosen['llm'], chosen['tts'], chosen['stt']):
+        combo = {'llm': llm_label, 'tts': tts_label, 'stt': stt_label}
+        configs = {kind: replay_config(kind, label, timings[(kind, label)]) for kind, label in combo.items()}
+        result = ComboResult(combo)
+
+        async def replay(index: int, call: dict, configs: dict, result: ComboResult):
+            async with semaphore:
+                try:
+                    await replay_call(call, index * 7, configs, base, Assistant, vad, result)
+                except Exception as e:
+                    print(f"[Radiance] ---> Replay of {call['id']} failed", e)
+                    result.missed += len(call['utterances'])
+
+        await asyncio.gather(*(replay(i, call, configs, result) for i, call in enumerate(calls)))
+        summary = result.summary()
+        summaries.append(summary)
+        print(f"{llm_label} + {tts_label} + {stt_label}: {summary['turns']} turns", flush=True)
+
+    print()
+    print_table(summaries)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+    return 0
+
+
+def main() -> int:
+    from agent_utils.provider_timings import PROVIDER_TIMINGS_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', help="Directory of recorded calls")
+    parser.add_argument('--timings', default=PROVIDER_TIMINGS_PATH, help="Recorded provider timings (JSONL)")
+    parser.add_argument('--llm', action='append', help="LLM provider label to compare, e.g. openai/gpt-4o-mini")
+    parser.add_argument('--tts', action='append', help="TTS provider label to compare")
+    parser.add_argument('--stt', action='append', help="STT provider label to compare")
+    parser.add_argument('--agent-id', help="Blueprint whose prompt and tools are used, default blueprint otherwise")
+    parser.add_argument('--calls', type=int, help="Replay only the first N calls")
+    parser.add_argument('--concurrency', type=int, default=4, help="Calls replayed at once")
+    parser.add_argument('--vad', choices=['silero', 'energy'], default='silero')
+    parser.add_argument('--json', help="Also write the summaries to this file")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Local stand-in STT, LLM and TTS providers with configurable latency, used by
+the offline benchmarks.
+
+Registered under a provider name with ProviderMappings.register(), e.g.
+
+    ProviderMappings.register('standin', 'standin_providers')
+
+so a blueprint can use them like any plugin and the whole session pipeline
+(provider chains, hedging, metrics, tools) runs without network access:
+
+    "model":       {"provider": "standin", "model": "standin-llm", "ttft": {"dist": "lognormal", "p50": 0.4, "p95": 1.2}}
+    "voice":       {"provider": "standin", "voice_id": "standin-voice", "ttfb": 0.25}
+    "transcriber": {"provider": "standin", "model": "standin-stt", "latency": {"dist": "uniform", "low": 0.1, "high": 0.3}}
+
+A latency is a number of seconds or a distribution: constant (value),
+uniform (low, high), lognormal (p50, p95) or replay (samples, recorded values
+used in order); the LLM's completion_tokens takes one too. The STT is not
+streamed, so sessions need a VAD; the energy VAD below detects the synthetic
+caller audio of the load harness reliably.
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectionError,
+    APIConnectOptions,
+    llm,
+    stt,
+    tts,
+    utils,
+    vad,
+)
+from livekit.agents.llm import ChatContext, LLMStream
+
+from agent_utils.context_compaction import context_tokens
+
+DistributionSpec = Union[float, int, str, Mapping[str, Any], None]
+
+
+class Distribution:
+    """A latency (seconds) or size distribution"""
+
+    def __init__(self, spec: DistributionSpec = 0.0, rng: Optional[random.Random] = None):
+        self.spec = parse_distribution(spec)
+        self.rng = rng or random.Random()
+        self._replayed = 0
+
+    def sample(self) -> float:
+        spec = self.spec
+        dist = spec['dist']
+        if dist == 'constant':
+            return spec['value']
+        if dist == 'uniform':
+            return self.rng.uniform(spec['low'], spec['high'])
+        if dist == 'lognormal':
+            # p95 of a lognormal is p50 * exp(1.645 sigma)
+            sigma = max(0.0, math.log(spec['p95'] / spec['p50']) / 1.645)
+            return self.rng.lognormvariate(math.log(spec['p50']), sigma)
+        samples = spec['samples']
+        value = samples[self._replayed % len(samples)]
+        self._replayed += 1
+        return value
+
+    def __repr__(self) -> str:
+        return f"Distribution({self.spec})"
+
+
+def parse_distribution(spec: DistributionSpec) -> dict[str, Any]:
+    """Normalize a distribution spec; strings are CLI shorthands like 'lognormal:0.4:1.2'"""
+    if spec is None:
+        return {'dist': 'constant', 'value': 0.0}
+    if isinstance(spec, (int, float)):
+        return {'dist': 'constant', 'value': float(spec)}
+    if isinstance(spec, str):
+        if spec.lstrip().startswith('{'):
+            return parse_distribution(json.loads(spec))
+        dist, *values = spec.split(':')
+        keys = {'constant': ['value'], 'uniform': ['low', 'high'], 'lognormal': ['p50', 'p95']}.get(dist)
+        if keys is None or len(values) != len(keys):
+            if not values:
+                return parse_distribution(float(dist))
+            raise ValueError(f"Invalid distribution '{spec}', use constant:S, uniform:LOW:HIGH or lognormal:P50:P95")
+        return parse_distribution({'dist': dist, **dict(zip(keys, map(float, values)))})
+
+    spec = dict(spec)
+    dist = spec.get('dist', 'constant')
+    required = {'constant': ['value'], 'uniform': ['low', 'high'], 'lognormal': ['p50', 'p95'],
+                'replay': ['samples']}.get(dist)
+    if required is None:
+        raise ValueError(f"Unknown distribution '{dist}'")
+    missing = [key for key in required if key not in spec]
+    if missing:
+        raise ValueError(f"Distribution '{dist}' needs {', '.join(missing)}")
+    if dist == 'lognormal' and spec['p50'] <= 0:
+        raise ValueError("Lognormal distribution needs p50 > 0")
+    if dist == 'replay':
+        spec['samples'] = [float(s) for s in spec['samples']]
+        if not spec['samples']:
+            raise ValueError("Replay distribution needs at least one sample")
+    return spec
+
+
+def _fails(rng: random.Random, error_rate: float) -> bool:
+    return error_rate > 0 and rng.random() < error_rate
+
+
+# ---- LLM ----
+
+DEFAULT_REPLY = "Sure, I can help you with that. Could you please tell me your patient ID so I can look you up?"
+
+
+class LLM(llm.LLM):
+    """Streams a canned reply after a sampled time to first token"""
+
+    def __init__(self, *, model: str = "standin-llm", ttft: DistributionSpec = 0.4, tokens_per_second: float = 50.0,
+                 replies: Optional[list[str]] = None, completion_tokens: DistributionSpec = None,
+                 tool_calls: Optional[list[Mapping[str, Any]]] = None, error_rate: float = 0.0,
+                 seed: Optional[int] = None, **kwargs):
+        super().__init__()
+        self._model = model
+        self._rng = random.Random(seed)
+        self.ttft = Distribution(ttft, self._rng)
+        self.tokens_per_second = tokens_per_second
+        self.replies = list(replies or [DEFAULT_REPLY])
+        # Reply length in words (~tokens), the canned reply's own length when not set
+        self.completion_tokens = Distribution(completion_tokens, self._rng) if completion_tokens is not None else None
+        # [{"name": ..., "arguments": {...}, "probability": 0.3}], only answered to user messages
+        self.tool_calls = list(tool_calls or [])
+        self.error_rate = error_rate
+        self._replied = 0
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    def next_reply(self) -> str:
+        reply = self.replies[self._replied % len(self.replies)]
+        self._replied += 1
+        if self.completion_tokens is None:
+            return reply
+        words = reply.split(' ')
+        length = max(1, round(self.completion_tokens.sample()))
+        return ' '.join(words[i % len(words)] for i in range(length))
+
+    def pick_tool_call(self, chat_ctx: ChatContext, tools) -> Optional[Mapping[str, Any]]:
+        last = chat_ctx.items[-1] if chat_ctx.items else None
+        if last is None or last.type != "message" or last.role != "user" or not self.tool_calls:
+            return None
+        available = llm.ToolContext(list(tools or [])).function_tools
+        for call in self.tool_calls:
+            if call['name'] in available and self._rng.random() < call.get('probability', 1.0):
+                return call
+        return None
+
+    def chat(self, *, chat_ctx: ChatContext, tools=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+             **kwargs) -> "StandinLLMStream":
+        return StandinLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class StandinLLMStream(LLMStream):
+    async def _run(self) -> None:
+        standin: LLM = self._llm
+        request_id = utils.shortuuid("standin_")
+        await asyncio.sleep(standin.ttft.sample())
+        if _fails(standin._rng, standin.error_rate):
+            raise APIConnectionError("stand-in LLM failure", retryable=False)
+
+        prompt_tokens = context_tokens(self._chat_ctx.items)
+        call = standin.pick_tool_call(self._chat_ctx, self._tools)
+        if call is not None:
+            self._event_ch.send_nowait(llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(
+                role="assistant",
+                tool_calls=[llm.FunctionToolCall(name=call['name'], arguments=json.dumps(call.get('arguments') or {}),
+                                                 call_id=utils.shortuuid("call_"))],
+            )))
+            completion_tokens = 20
+        else:
+            words = standin.next_reply().split(' ')
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(1.0 / standin.tokens_per_second)
+                self._event_ch.send_nowait(llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(
+                    role="assistant", content=word if i == len(words) - 1 else word + ' ')))
+            completion_tokens = len(words)
+
+        self._event_ch.send_nowait(llm.ChatChunk(id=request_id, usage=llm.CompletionUsage(
+            completion_tokens=completion_tokens, prompt_tokens=prompt_tokens,
+            total_tokens=prompt_tokens + completion_tokens)))
+
+
+# ---- TTS ----
+
+TTS_SAMPLE_RATE = 24000
+TTS_CHUNK_SECONDS = 0.1
+
+
+class TTS(tts.TTS):
+    """Synthesizes silence of a plausible duration after a sampled time to first byte"""
+
+    def __init__(self, *, voice_id: str = "standin-voice", model: Optional[str] = None, ttfb: DistributionSpec = 0.25,
+                 chars_per_second: float = 15.0, realtime_factor: float = 0.1, error_rate: float = 0.0,
+                 seed: Optional[int] = None, **kwargs):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=TTS_SAMPLE_RATE,
+                         num_channels=1)
+        self.voice_id = voice_id
+        self._rng = random.Random(seed)
+        self.ttfb = Distribution(ttfb, self._rng)
+        self.chars_per_second = chars_per_second
+        # Synthesis time per second of audio after the first chunk
+        self.realtime_factor = realtime_factor
+        self.error_rate = error_rate
+        self._chunk = bytes(int(TTS_SAMPLE_RATE * TTS_CHUNK_SECONDS) * 2)
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+                   ) -> "StandinChunkedStream":
+        return StandinChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class StandinChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        standin: TTS = self._tts
+        output_emitter.initialize(request_id=utils.shortuuid("standin_"), sample_rate=TTS_SAMPLE_RATE,
+                                  num_channels=1, mime_type="audio/pcm")
+        await asyncio.sleep(standin.ttfb.sample())
+        if _fails(standin._rng, standin.error_rate):
+            raise APIConnectionError("stand-in TTS failure", retryable=False)
+
+        chunks = max(1, round(len(self._input_text) / standin.chars_per_second / TTS_CHUNK_SECONDS))
+        for i in range(chunks):
+            if i:
+                await asyncio.sleep(TTS_CHUNK_SECONDS * standin.realtime_factor)
+            output_emitter.push(standin._chunk)
+        output_emitter.flush()
+
+
+# ---- STT ----
+
+DEFAULT_TRANSCRIPT = "Hi, I would like to book an appointment with a cardiologist next week."
+
+
+class STT(stt.STT):
+    """Returns scripted transcripts after a sampled recognition latency"""
+
+    def __init__(self, *, model: str = "standin-stt", latency: DistributionSpec = 0.2, transcripts: Optional[list[str]] = None,
+                 language: str = "en", error_rate: float = 0.0, seed: Optional[int] = None, **kwargs):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self._model = model
+        self._rng = random.Random(seed)
+        self.latency = Distribution(latency, self._rng)
+        self.transcripts = list(transcripts or [DEFAULT_TRANSCRIPT])
+        self.language = language
+        self.error_rate = error_rate
+        self._recognized = 0
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options: APIConnectOptions) -> stt.SpeechEvent:
+        await asyncio.sleep(self.latency.sample())
+        if _fails(self._rng, self.error_rate):
+            raise APIConnectionError("stand-in STT failure", retryable=False)
+        text = self.transcripts[self._recognized % len(self.transcripts)]
+        self._recognized += 1
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            request_id=utils.shortuuid("standin_"),
+            alternatives=[stt.SpeechData(language=self.language, text=text, confidence=1.0)],
+        )
+
+
+# ---- VAD ----
+
+@dataclass
+class EnergyVADOptions:
+    threshold: float = 0.02
+    min_speech_duration: float = 0.05
+    min_silence_duration: float = 0.55
+
+
+class VAD(vad.VAD):
+    """RMS energy VAD, cheap and deterministic for synthetic caller audio"""
+
+    def __init__(self, *, threshold: float = 0.02, min_speech_duration: float = 0.05,
+                 min_silence_duration: float = 0.55):
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=0.02))
+        self._opts = EnergyVADOptions(threshold, min_speech_duration, min_silence_duration)
+
+    def stream(self) -> "EnergyVADStream":
+        return EnergyVADStream(self, self._opts)
+
+
+class EnergyVADStream(vad.VADStream):
+    def __init__(self, energy_vad: VAD, opts: EnergyVADOptions):
+        self._opts = opts
+        super().__init__(energy_vad)
+
+    async def _main_task(self) -> None:
+        opts = self._opts
+        speaking = False
+        speech_run = silence_run = 0.0
+        speech_duration = silence_duration = 0.0
+        pending: list[rtc.AudioFrame] = []
+        frames: list[rtc.AudioFrame] = []
+        samples_index = 0
+
+        async for item in self._input_ch:
+            if isinstance(item, self._FlushSentinel):
+                continue
+            started = time.perf_counter()
+            duration = item.samples_per_channel / item.sample_rate
+            samples_index += item.samples_per_channel
+            pcm = np.frombuffer(item.data, dtype=np.int16).astype(np.float32)
+            level = float(np.sqrt(np.mean(pcm * pcm))) / 32768.0 if pcm.size else 0.0
+            active = level >= opts.threshold
+
+            if active:
+                speech_run += duration
+                silence_run = 0.0
+            else:
+                silence_run += duration
+                if not speaking:
+                    speech_run = 0.0
+
+            event = None
+            if not speaking:
+                silence_duration += duration
+                pending = [*pending, item] if active else []
+                if speech_run >= opts.min_speech_duration:
+                    speaking = True
+                    speech_duration, silence_duration = speech_run, 0.0
+                    frames = pending
+                    event = vad.VADEvent(type=vad.VADEventType.START_OF_SPEECH, samples_index=samples_index,
+                                         timestamp=time.time(), speech_duration=speech_duration,
+                                         silence_duration=0.0, frames=list(frames), speaking=True)
+            else:
+                frames.append(item)
+                speech_duration += duration
+                if silence_run >= opts.min_silence_duration:
+                    speaking = False
+                    event = vad.VADEvent(type=vad.VADEventType.END_OF_SPEECH, samples_index=samples_index,
+                                         timestamp=time.time(), speech_duration=speech_duration,
+                                         silence_duration=silence_run, frames=frames, speaking=False)
+                    silence_duration, speech_duration, speech_run = silence_run, 0.0, 0.0
+                    frames, pending = [], []
+
+            self._event_ch.send_nowait(vad.VADEvent(
+                type=vad.VADEventType.INFERENCE_DONE, samples_index=samples_index, timestamp=time.time(),
+                speech_duration=speech_duration, silence_duration=silence_duration, frames=[item],
+                probability=1.0 if active else 0.0, inference_duration=time.perf_counter() - started,
+                speaking=speaking, raw_accumulated_silence=silence_run, raw_accumulated_speech=speech_run,
+            ))
+            if event is not None:
+                self._event_ch.send_nowait(event)
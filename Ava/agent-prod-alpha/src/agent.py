@@ -1,68 +1,161 @@
 import uuid
+import time
 
 from livekit import agents
 from dotenv import load_dotenv
 from livekit.agents import (
-    Agent, AgentSession, RoomInputOptions, WorkerOptions)
+    Agent, AgentSession, RoomInputOptions, WorkerOptions, MetricsCollectedEvent)
 from livekit.agents.llm import RawFunctionTool, FunctionTool
-from livekit.plugins import (noise_cancellation, silero)
+from livekit.plugins import silero
 from livekit.plugins.turn_detector.english import EnglishModel  
 
 from agent_utils.default_agent import default_bp
 from agent_utils.agent_tools import build_raw_tools
+from agent_utils.http_pool import close_http_pool
+from agent_utils.background_tasks import spawn
 from agent_utils.background_audio import play_background_audio
-from agent_utils.first_message_config import first_message_mode
-from agent_utils.system_messages import setup_agent_context
-from agent_utils.provider_instances import create_provider_instances
-from agent_utils.agent_blueprint_loader import load_agent_metadata
-from agent_utils.function_tools import patient_lookup, book_appointment
+from agent_utils.audio_pipeline import (
+    BACKGROUND_VOLUME, background_source, noise_cancellation_for, describe_pipeline, preload_background_sounds)
+from agent_utils.first_message_config import first_message_mode, MODEL_GENERATED_MODE
+from agent_utils.system_messages import build_agent_context
+from agent_utils.context_compaction import ContextCompactor
+from agent_utils.provider_instances import ProviderInstanceCache, chain_configs
+from agent_utils.model_providers import ProviderMappings, boot_providers, provider_label
+from agent_utils.hedged_llm import log_provider_health
+from agent_utils.provider_router import get_provider_router
+from agent_utils.session_metrics import get_metrics_exporter, metrics_worker_options
+from agent_utils.provider_timings import PROVIDER_TIMINGS, get_timing_recorder
+from agent_utils.connection_warmup import wait_for_participant_warm
+from agent_utils.utterance_cache import UtteranceCache
+from agent_utils.greeting_pool import GreetingPool
+from agent_utils.session_data import SessionData
+from agent_utils.turn_tracing import TURN_TRACING, TurnTracer
+from agent_utils.agent_blueprint_loader import load_agent_blueprint, create_blueprint_registry
+from agent_utils.function_tools import (
+    patient_lookup, book_appointment, check_appointment_availability, list_appointments)
+from agent_utils.mongodb import prewarm_mongodb, log_pool_stats, get_mongodb_connection
+from agent_utils.slot_index import get_slot_index
+from agent_utils.caller_prefetch import start_caller_prefetch
+from agent_utils.appointment_journal import APPOINTMENT_WRITE_BEHIND, get_appointment_journal
 
 
 load_dotenv()
 
+# Load and validate the blueprints once per process, and import only the
+# provider plugins they use and PRELOAD_PROVIDERS (plugins must be imported
+# on the main thread, jobs can't import the others later)
+blueprint_registry = create_blueprint_registry()
+ProviderMappings.preload(boot_providers(bp.data for bp in blueprint_registry.blueprints()))
 
 
 class Assistant(Agent):
-    def __init__(self, metadata: dict = None, tools: list[FunctionTool | RawFunctionTool] | None = None) -> None:
-        # Add patient lookup and appointment booking tools to any existing tools
+    def __init__(self, metadata: dict = None, tools: list[FunctionTool | RawFunctionTool] | None = None,
+                 blueprint_hash: str | None = None) -> None:
+        # Add patient lookup and appointment tools to any existing tools
         if tools:
-            all_tools = [patient_lookup, book_appointment] + tools
+            all_tools = [patient_lookup, book_appointment, check_appointment_availability, list_appointments] + tools
         else:
-            all_tools = [patient_lookup, book_appointment]
+            all_tools = [patient_lookup, book_appointment, check_appointment_availability, list_appointments]
             
-        super().__init__(instructions="You are a helpful voice AI medical assistant." , tools=all_tools)
         self.metadata = metadata or {}
+        # Blueprint messages compiled once per blueprint hash into a stable prefix
+        instructions, chat_ctx = build_agent_context(self.metadata, blueprint_hash)
+        super().__init__(instructions=instructions, chat_ctx=chat_ctx, tools=all_tools)
+        self.compactor = ContextCompactor()
 
     async def on_enter(self) -> None:
-        # Setup agent context with role and content messages
-        await setup_agent_context(self, self.metadata)
         # Execute first message behavior
         await first_message_mode(self.session, self.metadata)
 
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        # Send the prefix, a summary of older turns and the recent turns only
+        async for chunk in Agent.default.llm_node(self, self.compactor.compact(chat_ctx), tools, model_settings):
+            yield chunk
+        # Fold turns that left the window into the summary before the next turn
+        self.compactor.schedule(self.chat_ctx, self.session.llm)
+
 
 def prewarm(proc: agents.JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
     proc.userdata["metadata"] = default_bp
+    proc.userdata["blueprint_registry"] = blueprint_registry
+    # Build the default blueprint providers once so jobs start on warm instances
+    proc.userdata["provider_cache"] = ProviderInstanceCache()
+    proc.userdata["provider_cache"].get_or_create(default_bp)
+    # Load pre-rendered greetings and fillers from the on-disk cache
+    proc.userdata["utterance_cache"] = UtteranceCache()
+    proc.userdata["utterance_cache"].preload(default_bp)
+    proc.userdata["greeting_pool"] = GreetingPool(proc.userdata["utterance_cache"])
+    # Decode the blueprints' ambience once, sessions of this process share the PCM buffer
+    preload_background_sounds(bp.data for bp in proc.userdata["blueprint_registry"].blueprints())
+    # Connect to MongoDB before the first patient lookup needs it
+    prewarm_mongodb()
     # Generate a conversation id
     proc.userdata["conversation_id"] = str(uuid.uuid4())
 
 async def entrypoint(ctx: agents.JobContext):
 
-    metadata = load_agent_metadata()
+    blueprint = load_agent_blueprint(registry=ctx.proc.userdata["blueprint_registry"])
+    # Pick the fastest healthy provider among the blueprint's candidates
+    provider_router = get_provider_router()
+    metadata = await provider_router.route(blueprint.data, room=ctx.job.room.name)
     # Connect to the room
     await ctx.connect()
 
-    # Wait for a SIP participant
-    participant = await ctx.wait_for_participant()
+    # Wait for a SIP participant while providers are built and warmed up
+    provider_cache = ctx.proc.userdata["provider_cache"]
+    utterance_cache = ctx.proc.userdata["utterance_cache"]
+    greeting_pool = ctx.proc.userdata["greeting_pool"]
+
+    def prepare_audio(providers):
+        # Render missing static utterances in the background, misses use live TTS
+        spawn(utterance_cache.warm(providers['tts'], metadata))
+        if metadata.get('firstMessageMode') == MODEL_GENERATED_MODE:
+            greeting_pool.fill(blueprint.content_hash, metadata, providers['llm'], providers['tts'])
 
-    # Create provider instances
-    Providers = create_provider_instances(metadata)
+    participant, provider_key, Providers = await wait_for_participant_warm(
+        ctx, provider_cache, metadata, on_ready=prepare_audio)
     if not Providers:
         raise RuntimeError(
             "[Randiance][Error] ---> Failed to create provider instances")
 
+    async def release_providers():
+        provider_cache.release(provider_key)
+
+    ctx.add_shutdown_callback(release_providers)
+    ctx.add_shutdown_callback(close_http_pool)
+    ctx.add_shutdown_callback(log_pool_stats)
+    ctx.add_shutdown_callback(log_provider_health)
+    ctx.add_shutdown_callback(provider_router.flush)
+    get_slot_index().start_refresh(get_mongodb_connection)
+    if APPOINTMENT_WRITE_BEHIND:
+        # Also flushes bookings a previous process journaled but never pushed
+        appointment_journal = get_appointment_journal()
+        appointment_journal.start()
+        ctx.add_shutdown_callback(appointment_journal.drain)
+
+    session_data = SessionData(
+        metadata=metadata,
+        blueprint_hash=blueprint.content_hash,
+        utterance_cache=utterance_cache,
+        greeting_pool=greeting_pool,
+    )
+    if TURN_TRACING:
+        session_data.tracer = TurnTracer(f"{ctx.job.room.name or ctx.job.id}-{int(time.time())}")
+        ctx.add_shutdown_callback(session_data.tracer.aclose)
+
+    async def log_render_stats():
+        if session_data.render_stats.rendered:
+            print(f"[Radiance] ---> Patient record rendering: {session_data.render_stats.report()}")
+
+    ctx.add_shutdown_callback(log_render_stats)
+
+    # Resolve the caller's number to a patient record while the greeting plays
+    start_caller_prefetch(participant, session_data.patient_cache)
+
     # Create agent session
     session = AgentSession(
+        userdata=session_data,
         stt=Providers['stt'],
         llm=Providers['llm'],
         tts=Providers['tts'],
@@ -70,23 +163,61 @@ async def entrypoint(ctx: agents.JobContext):
         vad=ctx.proc.userdata["vad"],
         preemptive_generation=True,
     )
+    # Turn latency, token usage and prompt cache hits, exported periodically
+    metrics_exporter = get_metrics_exporter()
+    session_metrics = metrics_exporter.session(ctx.job.room.name or ctx.job.id, agent="ava")
+
+    @session.on("metrics_collected")
+    def _on_metrics_collected(ev: MetricsCollectedEvent):
+        session_metrics.record(ev.metrics)
+
+    async def log_session_metrics():
+        print(f"[Radiance] ---> Session metrics: {session_metrics.report()}")
+        await metrics_exporter.close_session(session_metrics.session_id)
+
+    ctx.add_shutdown_callback(log_session_metrics)
+    stt_labels = [provider_label(c) for c in chain_configs(metadata['transcriber'])]
+    # Streamed STT latency for routing between transcriber candidates
+    provider_router.attach_session(session, stt_labels)
+    if PROVIDER_TIMINGS:
+        # Per-provider request timings, replayed by benchmarks/provider_ab.py
+        get_timing_recorder().attach_session(session, stt_labels)
+        ctx.add_shutdown_callback(get_timing_recorder().flush)
+    if session_data.tracer is not None:
+        # Spans of VAD, STT, EOU, LLM, tools and TTS linked by turn id
+        session_data.tracer.attach(session)
+
+    assistant = Assistant(
+        metadata=metadata,
+        tools=build_raw_tools(metadata.get('tools', [])),
+        blueprint_hash=blueprint.content_hash,
+    )
+
+    async def close_compactor():
+        print(f"[Radiance] ---> Chat context: {assistant.compactor.stats.report()}")
+        await assistant.compactor.aclose()
+
+    ctx.add_shutdown_callback(close_compactor)
+
     # Start agent session
     await session.start(
         room=ctx.room,
-        agent=Assistant(
-            metadata=metadata,
-            tools=build_raw_tools(metadata.get('tools', [])),
-        ),
+        agent=assistant,
         room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
+            noise_cancellation=noise_cancellation_for(metadata, participant),
         ),
     )
-     # Play background audio
-    await play_background_audio(session)
+    print(f"[Radiance] ---> Audio pipeline: {describe_pipeline(metadata, participant)}")
+    # Play background audio unless the blueprint turns it off
+    background = background_source(metadata)
+    if background is not None:
+        await play_background_audio(session, background, BACKGROUND_VOLUME)
 # Worker options
 options = WorkerOptions(
     prewarm_fnc=prewarm,
     entrypoint_fnc=entrypoint,
+    # Session metrics of all job processes are served by this process
+    **metrics_worker_options(),
 )
 if __name__ == "__main__":
     agents.cli.run_app(options)
\ No newline at end of file
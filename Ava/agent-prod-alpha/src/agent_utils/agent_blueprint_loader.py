@@ -1,18 +1,34 @@
-import json
 from livekit.agents import get_job_context
+from .blueprint_registry import BlueprintRegistry, DEFAULT_AGENT_ID
 
-def load_agent_metadata(ctx=None):
+_registry = None
+
+
+def create_blueprint_registry():
+    from .default_agent import default_bp
+
+    registry = BlueprintRegistry()
+    registry.register(default_bp, agent_id=DEFAULT_AGENT_ID)
+    registry.reload()
+    return registry
+
+
+def get_blueprint_registry():
+    global _registry
+    if _registry is None:
+        _registry = create_blueprint_registry()
+    return _registry
+
+
+def load_agent_blueprint(ctx=None, registry=None):
     if ctx is None:
         ctx = get_job_context()
+    if registry is None:
+        registry = get_blueprint_registry()
+
+    # Metadata may be {"agentId": ...}, {"blueprintHash": ...} or a full blueprint
+    return registry.resolve(ctx.job.metadata)
 
-    from .default_agent import default_bp
 
-    try:
-        if ctx.job.metadata and ctx.job.metadata.strip():
-            return json.loads(ctx.job.metadata)
-        else:
-            # If default_bp is already a dict, return it directly
-            return default_bp if isinstance(default_bp, dict) else json.loads(default_bp)
-    except json.JSONDecodeError:
-        # If metadata is invalid JSON, return default_bp safely
-        return default_bp if isinstance(default_bp, dict) else json.loads(default_bp)
+def load_agent_metadata(ctx=None, registry=None):
+    return load_agent_blueprint(ctx, registry).data
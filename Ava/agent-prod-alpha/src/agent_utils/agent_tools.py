@@ -1,8 +1,10 @@
-import httpx
 from datetime import datetime
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 from livekit.agents import RunContext, function_tool
+from agent_utils.blueprint_registry import thaw
+from agent_utils.http_pool import get_http_pool
+from agent_utils.tool_execution import run_with_filler
 
 
 @dataclass
@@ -37,10 +39,6 @@ def build_raw_tools(raw_tools: list | None):
         # Create HTTP tool handler function
         async def http_tool_handler(raw_arguments: dict[str, object], context: RunContext):
             try:
-                await context.session.generate_reply(
-                    instructions=f'You are about to  call a tool for {tool.get("description")} let the user know it will take a moment to process the request.'
-                )
-
                 url = tool.get("server").get("url")
                 headers = tool.get("server").get("headers") or {}
 
@@ -50,8 +48,13 @@ def build_raw_tools(raw_tools: list | None):
                     }
                 }
 
-                async with httpx.AsyncClient(timeout=15.0) as client:
-                    response = await client.post(url, json=data, headers=headers)
+                # Start the request at once, tell the user to wait only if it is slow
+                response = await run_with_filler(
+                    context,
+                    get_http_pool().post(url, json=data, headers=headers),
+                    f'You are about to  call a tool for {tool.get("description")} let the user know it will take a moment to process the request.',
+                    filler_key=(tool.get('function') or {}).get('name'),
+                )
 
                 return response.json()
             except Exception as e:
@@ -61,5 +64,5 @@ def build_raw_tools(raw_tools: list | None):
         # Return the function tool
         return function_tool(http_tool_handler, raw_schema=tool.get('function'))
 
-    # Add dynamic tools to the agent
-    return [create_http_tool(tool) for tool in raw_tools if tool.get('type') == 'function']
\ No newline at end of file
+    # Add dynamic tools to the agent (blueprints are frozen, plugins expect plain dicts)
+    return [create_http_tool(thaw(tool)) for tool in raw_tools if tool.get('type') == 'function']
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+Write-behind journal for appointment bookings.
+
+book_appointment appends the booking to a local SQLite journal (WAL mode) and
+confirms to the caller straight away. A background flusher upserts pending
+entries into MongoDB in batches, retrying with backoff. Every booking carries
+an idempotency key derived from patient, specialty, date and time, so a
+retried or duplicated tool call collapses into one appointment both in the
+journal and in MongoDB.
+
+Flushed entries are deleted once they are older than APPOINTMENT_RETENTION
+seconds. An entry MongoDB rejects APPOINTMENT_MAX_ATTEMPTS times is
+dead-lettered: it stays in the journal but is no longer retried, see
+dead_letters(). Connection errors retry the whole batch and don't count as
+attempts. Off unless APPOINTMENT_WRITE_BEHIND is set.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from agent_utils.mongodb import get_mongodb_connection
+
+APPOINTMENT_WRITE_BEHIND = os.getenv('APPOINTMENT_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+APPOINTMENT_JOURNAL_PATH = os.getenv(
+    'APPOINTMENT_JOURNAL_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'data', 'appointment_journal.sqlite3'))
+APPOINTMENT_FLUSH_INTERVAL = float(os.getenv('APPOINTMENT_FLUSH_INTERVAL', '1.0'))
+APPOINTMENT_FLUSH_BATCH = int(os.getenv('APPOINTMENT_FLUSH_BATCH', '50'))
+APPOINTMENT_FLUSH_MAX_BACKOFF = float(os.getenv('APPOINTMENT_FLUSH_MAX_BACKOFF', '30.0'))
+# Flushed entries are kept this long, duplicate tool calls within it are dropped locally
+APPOINTMENT_RETENTION = float(os.getenv('APPOINTMENT_RETENTION', str(24 * 3600)))
+APPOINTMENT_PURGE_INTERVAL = float(os.getenv('APPOINTMENT_PURGE_INTERVAL', '3600'))
+APPOINTMENT_MAX_ATTEMPTS = int(os.getenv('APPOINTMENT_MAX_ATTEMPTS', '5'))
+
+
+def idempotency_key(patient_id: str, doctor_specialty: str, appointment_date: str,
+                    appointment_time: str) -> str:
+    parts = [str(patient_id), doctor_specialty, appointment_date, appointment_time]
+    normalized = '\x1f'.join(p.strip().lower() for p in parts)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class AppointmentJournal:
+    def __init__(self, path: str = APPOINTMENT_JOURNAL_PATH, max_attempts: int = APPOINTMENT_MAX_ATTEMPTS,
+                 retention: float = APPOINTMENT_RETENTION):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retention = retention
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Accessed from worker threads via asyncio.to_thread, serialized by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS appointment_journal (
+                idempotency_key TEXT PRIMARY KEY,
+                patient_id TEXT NOT NULL,
+                document TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                flushed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS appointment_journal_pending "
+            "ON appointment_journal (flushed_at, created_at)")
+        self._wake: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_purge = float("-inf")
+
+    def append(self, document: dict[str, Any]) -> bool:
+        """Durably journal a booking, returns False if the key was already journaled"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO appointment_journal "
+                "(idempotency_key, patient_id, document, created_at) VALUES (?, ?, ?, ?)",
+                (document['idempotency_key'], str(document['patient_id']),
+                 json.dumps(document, ensure_ascii=False), time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def pending(self, limit: int = APPOINTMENT_FLUSH_BATCH) -> list[tuple[str, dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, document FROM appointment_journal "
+                "WHERE flushed_at IS NULL AND attempts < ? ORDER BY created_at LIMIT ?",
+                (self.max_attempts, limit),
+            ).fetchall()
+        return [(key, json.loads(document)) for key, document in rows]
+
+    def pending_for_patient(self, patient_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document FROM appointment_journal "
+                "WHERE flushed_at IS NULL AND attempts < ? AND patient_id = ?",
+                (self.max_attempts, str(patient_id)),
+            ).fetchall()
+        return [json.loads(document) for (document,) in rows]
+
+    def dead_letters(self) -> list[dict[str, Any]]:
+        """Bookings MongoDB rejected max_attempts times, they need a manual fix"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document, attempts, last_error FROM appointment_journal "
+                "WHERE flushed_at IS NULL AND attempts >= ? ORDER BY created_at",
+                (self.max_attempts,),
+            ).fetchall()
+        return [{"document": json.loads(document), "attempts": attempts, "last_error": error}
+                for document, attempts, error in rows]
+
+    def mark_flushed(self, keys: list[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE appointment_journal SET flushed_at = ? WHERE idempotency_key = ?",
+                [(now, key) for key in keys],
+            )
+
+    def mark_failed(self, errors: dict[str, str]) -> int:
+        """Count a rejected attempt per key, returns how many got dead-lettered"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE appointment_journal SET attempts = attempts + 1, last_error = ? "
+                "WHERE idempotency_key = ?",
+                [(error, key) for key, error in errors.items()],
+            )
+            placeholders = ','.join('?' * len(errors))
+            (dead,) = self._conn.execute(
+                f"SELECT COUNT(*) FROM appointment_journal WHERE attempts = ? "
+                f"AND idempotency_key IN ({placeholders})",
+                (self.max_attempts, *errors),
+            ).fetchone()
+        return dead
+
+    def purge(self, older_than: float) -> int:
+        """Delete entries flushed before `older_than` (epoch seconds)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM appointment_journal WHERE flushed_at IS NOT NULL AND flushed_at < ?",
+                (older_than,),
+            )
+            return cursor.rowcount
+
+    async def record(self, document: dict[str, Any]) -> bool:
+        created = await asyncio.to_thread(self.append, document)
+        self.start()
+        self._wake.set()
+        return created
+
+    async def flush(self) -> int:
+        """Upsert one batch of pending bookings into MongoDB, returns how many"""
+        batch = await asyncio.to_thread(self.pending)
+        if not batch:
+            return 0
+        keys = [key for key, _ in batch]
+        try:
+            db = await get_mongodb_connection()
+            await db.appointments.bulk_write(
+                [UpdateOne({"idempotency_key": key}, {"$setOnInsert": document}, upsert=True)
+                 for key, document in batch],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            # Documents MongoDB rejected count as attempts, the rest of the batch was written
+            errors = {keys[err['index']]: err.get('errmsg', 'write error')
+                      for err in e.details.get('writeErrors', [])}
+            if not errors:
+                raise
+            dead = await asyncio.to_thread(self.mark_failed, errors)
+            if dead:
+                print(f"[Radiance][Error] ---> {dead} appointments dead-lettered in {self.path}")
+            await asyncio.to_thread(self.mark_flushed, [key for key in keys if key not in errors])
+            return len(batch)
+        await asyncio.to_thread(self.mark_flushed, keys)
+        return len(batch)
+
+    def start(self):
+        """Start the background flusher on the running loop, once per process"""
+        if self._flusher is not None and not self._flusher.done():
+            return
+        self._wake = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        backoff = APPOINTMENT_FLUSH_INTERVAL
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout=backoff)
+            self._wake.clear()
+            try:
+                # Drain everything pending, batch by batch
+                while await self.flush() == APPOINTMENT_FLUSH_BATCH:
+                    pass
+                backoff = APPOINTMENT_FLUSH_INTERVAL
+                await self._maybe_purge()
+            except Exception as e:
+                backoff = min(backoff * 2, APPOINTMENT_FLUSH_MAX_BACKOFF)
+                print(f"[Radiance] ---> Appointment flush failed, retrying in {backoff:.0f}s", e)
+
+    async def _maybe_purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < APPOINTMENT_PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        purged = await asyncio.to_thread(self.purge, time.time() - self.retention)
+        if purged:
+            print(f"[Radiance] ---> Purged {purged} flushed appointments from the journal")
+
+    async def drain(self, timeout: float = 5.0):
+        """Job shutdown callback, pushes what is pending without blocking shutdown for long"""
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except Exception as e:
+            print("[Radiance] ---> Appointments left in the journal for the next flush", e)
+
+    async def _drain(self):
+        while await self.flush() == APPOINTMENT_FLUSH_BATCH:
+            pass
+
+
+_journal = None
+
+
+def get_appointment_journal() -> AppointmentJournal:
+    global _journal
+    if _journal is None:
+        _journal = AppointmentJournal()
+    return _journal
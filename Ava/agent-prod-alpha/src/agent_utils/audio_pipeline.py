@@ -0,0 +1,70 @@
+"""
+Per-session audio processing assembled from the blueprint.
+
+  backgroundSound            - "off", a built-in clip name ("office") or a URL/path
+  backgroundDenoisingEnabled - False skips noise cancellation on the caller's audio
+
+SIP callers get the telephony-tuned BVC model, other participants the regular one.
+"""
+
+import os
+from collections.abc import Iterable, Mapping
+from typing import Any, Optional
+
+from livekit import rtc
+from livekit.agents import BuiltinAudioClip
+from livekit.plugins import noise_cancellation
+
+from agent_utils.background_audio import ClipSource, decode_clip
+
+BACKGROUND_VOLUME = float(os.getenv('BACKGROUND_VOLUME', '0.8'))
+
+# Only some of these clips ship with older livekit-agents 1.x releases
+BACKGROUND_SOUNDS = {
+    name: getattr(BuiltinAudioClip, clip)
+    for name, clip in [("office", "OFFICE_AMBIENCE"), ("city", "CITY_AMBIENCE"),
+                       ("forest", "FOREST_AMBIENCE"), ("crowded-room", "CROWDED_ROOM")]
+    if hasattr(BuiltinAudioClip, clip)
+}
+
+
+def background_source(metadata: Mapping[str, Any]) -> Optional[ClipSource]:
+    """Clip to loop behind the agent, None when background sound is off"""
+    sound = metadata.get('backgroundSound')
+    if not sound or not isinstance(sound, str) or sound.lower() == 'off':
+        return None
+    return BACKGROUND_SOUNDS.get(sound.lower(), sound)
+
+
+def is_sip(participant: Optional[rtc.RemoteParticipant]) -> bool:
+    return participant is not None and participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
+
+
+def noise_cancellation_for(metadata: Mapping[str, Any], participant: Optional[rtc.RemoteParticipant]):
+    """Noise cancellation for the caller's audio, None when the blueprint disables it"""
+    if not metadata.get('backgroundDenoisingEnabled', True):
+        return None
+    if is_sip(participant):
+        return noise_cancellation.BVCTelephony()
+    return noise_cancellation.BVC()
+
+
+def describe_pipeline(metadata: Mapping[str, Any], participant: Optional[rtc.RemoteParticipant]) -> str:
+    denoise = "off"
+    if metadata.get('backgroundDenoisingEnabled', True):
+        denoise = "BVCTelephony" if is_sip(participant) else "BVC"
+    source = background_source(metadata)
+    background = "off" if source is None else getattr(source, 'name', source)
+    return f"denoising {denoise}, background {background}"
+
+
+def preload_background_sounds(blueprints: Iterable[Mapping[str, Any]]):
+    """Decode the clips the blueprints use (from prewarm), others are decoded on first use"""
+    for metadata in blueprints:
+        source = background_source(metadata)
+        if source is None:
+            continue
+        try:
+            decode_clip(source)
+        except Exception as e:
+            print("[Radiance] ---> Failed to decode background sound", source, e)
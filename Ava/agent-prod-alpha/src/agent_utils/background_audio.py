@@ -1,3 +1,16 @@
+"""
+Background ambience decoded once per process.
+
+BackgroundAudioPlayer decodes and resamples its clip file for every session
+and again on every loop. Clips are decoded here once into a list of 20ms
+frames instead, and each session loops over those same frame objects (the
+mixer only reads them); the volume is still applied by the player's mixer.
+"""
+
+import asyncio
+from typing import Union
+from collections.abc import Sequence
+from livekit import rtc
 from livekit.agents.job import get_job_context
 from livekit.agents import (
     AgentSession,
@@ -5,16 +18,81 @@ from livekit.agents import (
     BackgroundAudioPlayer,
     BuiltinAudioClip,
 )
+from agent_utils.utterance_cache import FRAME_DURATION_MS
+
+# BackgroundAudioPlayer mixes at 48kHz mono
+BACKGROUND_SAMPLE_RATE = 48000
+BACKGROUND_NUM_CHANNELS = 1
+
+ClipSource = Union[BuiltinAudioClip, str]
+
+_clips: dict[str, list[rtc.AudioFrame]] = {}
+
+
+def _clip_path(source: ClipSource) -> str:
+    return source.path() if isinstance(source, BuiltinAudioClip) else source
+
+
+def decode_clip(source: ClipSource) -> list[rtc.AudioFrame]:
+    """Decoded frames of a clip, shared by every session of the process"""
+    path = _clip_path(source)
+    clip = _clips.get(path)
+    if clip is not None:
+        return clip
 
+    import av
 
-async def play_background_audio(session: AgentSession):
+    chunks = []
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=BACKGROUND_SAMPLE_RATE)
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().tobytes())
+    for resampled in resampler.resample(None):
+        chunks.append(resampled.to_ndarray().tobytes())
+
+    pcm = b''.join(chunks)
+    frame_bytes = BACKGROUND_SAMPLE_RATE * FRAME_DURATION_MS // 1000 * BACKGROUND_NUM_CHANNELS * 2
+    clip = []
+    for offset in range(0, len(pcm), frame_bytes):
+        data = pcm[offset:offset + frame_bytes]
+        clip.append(rtc.AudioFrame(
+            data=data,
+            sample_rate=BACKGROUND_SAMPLE_RATE,
+            num_channels=BACKGROUND_NUM_CHANNELS,
+            samples_per_channel=len(data) // (2 * BACKGROUND_NUM_CHANNELS),
+        ))
+    _clips[path] = clip
+    return clip
+
+
+async def load_clip(source: ClipSource) -> list[rtc.AudioFrame]:
+    path = _clip_path(source)
+    if path in _clips:
+        return _clips[path]
+    return await asyncio.to_thread(decode_clip, source)
+
+
+async def looped_frames(clip: Sequence[rtc.AudioFrame]):
+    """Endless iteration over the shared frames, nothing is decoded, copied or allocated per loop"""
+    while True:
+        for frame in clip:
+            yield frame
+        await asyncio.sleep(0)
+
+
+async def play_background_audio(session: AgentSession, source: ClipSource = BuiltinAudioClip.OFFICE_AMBIENCE,
+                                volume: float = 0.8) -> BackgroundAudioPlayer:
     # Get the job context
     ctx = get_job_context()
 
+    clip = await load_clip(source)
+
     # Initialize the background audio player
-    background_audio = BackgroundAudioPlayer(
-        ambient_sound=AudioConfig(BuiltinAudioClip.OFFICE_AMBIENCE, volume=0.8)
-    )
+    background_audio = BackgroundAudioPlayer()
 
-    # Start the background audio player
-    await background_audio.start(room=ctx.room, agent_session=session)
\ No newline at end of file
+    # Start the background audio player, the ambience loops over the shared clip
+    await background_audio.start(room=ctx.room, agent_session=session)
+    background_audio.play(AudioConfig(looped_frames(clip), volume=volume))
+    ctx.add_shutdown_callback(background_audio.aclose)
+    return background_audio
@@ -0,0 +1,20 @@
+"""
+Fire-and-forget tasks that are kept referenced until they finish.
+
+The event loop only holds weak references to tasks, so a task nobody keeps
+can be garbage collected before it is done (e.g. halfway through closing a
+provider). spawn() keeps every task in a set until its done callback runs.
+"""
+
+import asyncio
+from collections.abc import Awaitable
+
+_tasks: set[asyncio.Future] = set()
+
+
+def spawn(aw: Awaitable) -> asyncio.Future:
+    """Schedule `aw` on the running loop and keep it referenced until it finishes"""
+    task = asyncio.ensure_future(aw)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
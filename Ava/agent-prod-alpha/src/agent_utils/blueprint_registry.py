@@ -0,0 +1,268 @@
+"""
+Registry of validated, immutable agent blueprints.
+
+Blueprints are loaded from BLUEPRINTS_DIR (one JSON file per agent), validated
+once and frozen. Job metadata can then reference a blueprint by
+{"agentId": ...} or {"blueprintHash": ...} instead of carrying the full JSON.
+Full inline blueprints are still accepted and cached by the hash of the raw
+metadata, so re-dispatching the same payload skips parsing and validation.
+An inline blueprint using a provider whose plugin was not preloaded at boot
+can't be served from a job thread and falls back to the default blueprint.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Optional
+
+from agent_utils.model_providers import ProviderMappings, referenced_providers
+
+BLUEPRINTS_DIR = os.getenv(
+    'BLUEPRINTS_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'blueprints'))
+DEFAULT_AGENT_ID = 'default'
+
+REQUIRED_PROVIDER_SECTIONS = ['model', 'voice', 'transcriber']
+
+
+class BlueprintValidationError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Blueprint:
+    agent_id: str
+    content_hash: str
+    data: Mapping[str, Any]
+    source: Optional[str] = None
+
+
+def freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Inverse of freeze, for code that needs plain mutable dicts and lists"""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+def blueprint_hash(raw: Mapping[str, Any]) -> str:
+    encoded = json.dumps(thaw(raw), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def validate_blueprint(raw: Any):
+    if not isinstance(raw, Mapping):
+        raise BlueprintValidationError("Blueprint must be a JSON object")
+
+    for section in REQUIRED_PROVIDER_SECTIONS:
+        config = raw.get(section)
+        if not isinstance(config, Mapping):
+            raise BlueprintValidationError(f"Blueprint is missing the '{section}' section")
+        if not isinstance(config.get('provider'), str) or not config['provider']:
+            raise BlueprintValidationError(f"Blueprint '{section}' section has no provider")
+        # Alternative provider configs: failover chain and routing candidates
+        for key in ('fallbacks', 'candidates'):
+            alternatives = config.get(key, [])
+            if not isinstance(alternatives, (list, tuple)):
+                raise BlueprintValidationError(f"Blueprint '{section}.{key}' must be a list")
+            for alternative in alternatives:
+                if not isinstance(alternative, Mapping) or not isinstance(alternative.get('provider'), str) \
+                        or not alternative['provider']:
+                    raise BlueprintValidationError(f"Blueprint '{section}.{key}' entry has no provider")
+                if section == 'model' and not alternative.get('model'):
+                    raise BlueprintValidationError(f"Blueprint 'model.{key}' entry has no model name")
+
+    if not raw['model'].get('model'):
+        raise BlueprintValidationError("Blueprint 'model' section has no model name")
+
+    messages = raw['model'].get('messages', [])
+    if not isinstance(messages, (list, tuple)):
+        raise BlueprintValidationError("Blueprint 'model.messages' must be a list")
+
+    tools = raw.get('tools', [])
+    if tools is not None and not isinstance(tools, (list, tuple)):
+        raise BlueprintValidationError("Blueprint 'tools' must be a list")
+
+
+def build_blueprint(raw: Mapping[str, Any], agent_id: Optional[str] = None,
+                    source: Optional[str] = None) -> Blueprint:
+    validate_blueprint(raw)
+    return Blueprint(
+        agent_id=agent_id or raw.get('id') or raw.get('name') or DEFAULT_AGENT_ID,
+        content_hash=blueprint_hash(raw),
+        data=freeze(raw),
+        source=source,
+    )
+
+
+class BlueprintRegistry:
+    """Loads blueprints from a directory and resolves job metadata to them.
+
+    Hot reload polls: there is no file watcher, the directory is re-scanned
+    (mtime and size of every file) at most every `reload_interval` seconds
+    when a blueprint is looked up, so edited, added and removed files are
+    picked up without a restart, at most `reload_interval` seconds late.
+    """
+
+    def __init__(self, directory: str = BLUEPRINTS_DIR, reload_interval: Optional[float] = None,
+                 cache_size: Optional[int] = None):
+        self.directory = directory
+        self.reload_interval = reload_interval if reload_interval is not None else float(
+            os.getenv('BLUEPRINTS_RELOAD_INTERVAL', '5'))
+        self.cache_size = cache_size or int(os.getenv('BLUEPRINTS_CACHE_SIZE', '32'))
+        self._by_id: dict[str, Blueprint] = {}
+        self._by_hash: dict[str, Blueprint] = {}
+        self._files: dict[str, tuple] = {}
+        self._inline: OrderedDict[str, Blueprint] = OrderedDict()
+        self._last_scan = 0.0
+
+    def register(self, raw: Mapping[str, Any], agent_id: str,
+                 source: Optional[str] = None) -> Blueprint:
+        blueprint = build_blueprint(raw, agent_id=agent_id, source=source)
+        previous = self._by_id.get(agent_id)
+        if previous is not None and self._by_hash.get(previous.content_hash) is previous:
+            del self._by_hash[previous.content_hash]
+        self._by_id[agent_id] = blueprint
+        self._by_hash[blueprint.content_hash] = blueprint
+        return blueprint
+
+    def get(self, agent_id: str) -> Optional[Blueprint]:
+        self.maybe_reload()
+        return self._by_id.get(agent_id)
+
+    def get_by_hash(self, content_hash: str) -> Optional[Blueprint]:
+        self.maybe_reload()
+        return self._find_hash(content_hash)
+
+    def _find_hash(self, content_hash: str) -> Optional[Blueprint]:
+        blueprint = self._by_hash.get(content_hash)
+        if blueprint is None:
+            # Inline blueprints dispatched earlier can be referenced by hash too
+            blueprint = next(
+                (b for b in self._inline.values() if b.content_hash == content_hash), None)
+        return blueprint
+
+    def blueprints(self):
+        self.maybe_reload()
+        return list(self._by_id.values())
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_scan < self.reload_interval:
+            return
+        self._last_scan = now
+        self.reload()
+
+    def reload(self):
+        """Re-read blueprint files whose mtime or size changed since the last scan"""
+        try:
+            entries = [e for e in os.scandir(self.directory)
+                       if e.is_file() and e.name.endswith('.json')]
+        except FileNotFoundError:
+            entries = []
+
+        seen = set()
+        for entry in entries:
+            seen.add(entry.path)
+            stat = entry.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._files.get(entry.path, (None, None))[0] == signature:
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    raw = json.load(f)
+                agent_id = (raw.get('id') if isinstance(raw, dict) else None) or os.path.splitext(entry.name)[0]
+                blueprint = self.register(raw, agent_id=agent_id, source=entry.path)
+            except (OSError, ValueError) as e:
+                # Keep serving the last good version of the file
+                print(f"[Radiance] ---> Invalid blueprint {entry.path}: {e}")
+                self._files[entry.path] = (signature, self._files.get(entry.path, (None, None))[1])
+                continue
+            previous_id = self._files.get(entry.path, (None, None))[1]
+            if previous_id is not None and previous_id != blueprint.agent_id:
+                # The file's id changed, its old id must stop resolving
+                self._unregister(previous_id, entry.path)
+            self._files[entry.path] = (signature, blueprint.agent_id)
+            print(f"[Radiance] ---> Loaded blueprint '{blueprint.agent_id}' from {entry.path}")
+
+        for path in list(self._files):
+            if path not in seen:
+                _, agent_id = self._files.pop(path)
+                if agent_id is not None:
+                    self._unregister(agent_id, path)
+
+    def _unregister(self, agent_id: str, source: str):
+        """Drop agent_id if it is still registered from the file `source`"""
+        blueprint = self._by_id.get(agent_id)
+        if blueprint is None or blueprint.source != source:
+            return
+        del self._by_id[agent_id]
+        if self._by_hash.get(blueprint.content_hash) is blueprint:
+            del self._by_hash[blueprint.content_hash]
+        print(f"[Radiance] ---> Removed blueprint '{agent_id}'")
+
+    def resolve(self, job_metadata: Optional[str]) -> Blueprint:
+        """Resolve raw job metadata to a blueprint, falling back to the default one"""
+        default = self._by_id.get(DEFAULT_AGENT_ID)
+        if not job_metadata or not job_metadata.strip():
+            return default
+
+        self.maybe_reload()
+        raw_key = hashlib.sha256(job_metadata.encode('utf-8')).hexdigest()
+        cached = self._inline.get(raw_key)
+        if cached is not None:
+            self._inline.move_to_end(raw_key)
+            return cached
+
+        try:
+            payload = json.loads(job_metadata)
+            reference = self._resolve_reference(payload)
+            if reference is not None:
+                # References are plain lookups, never cached, so reloads apply at once
+                return reference
+            blueprint = build_blueprint(payload, source='job-metadata')
+        except (ValueError, KeyError) as e:
+            print(f"[Radiance][Error] ---> Falling back to the default blueprint: {e}")
+            return default
+        missing = [name for name in referenced_providers([blueprint.data])
+                   if not ProviderMappings.importable(name)]
+        if missing:
+            print(f"[Radiance][Error] ---> Falling back to the default blueprint: providers "
+                  f"{', '.join(missing)} were not preloaded, add them to PRELOAD_PROVIDERS")
+            return default
+
+        # Inline copies of a registered blueprint share the registered object
+        blueprint = self._by_hash.get(blueprint.content_hash, blueprint)
+        self._inline[raw_key] = blueprint
+        while len(self._inline) > self.cache_size:
+            self._inline.popitem(last=False)
+        return blueprint
+
+    def _resolve_reference(self, payload: Any) -> Optional[Blueprint]:
+        if not isinstance(payload, Mapping) or 'model' in payload:
+            return None
+        if payload.get('blueprintHash'):
+            blueprint = self._find_hash(payload['blueprintHash'])
+            if blueprint is None:
+                raise KeyError(f"unknown blueprint hash {payload['blueprintHash']}")
+            return blueprint
+        if payload.get('agentId'):
+            blueprint = self._by_id.get(payload['agentId'])
+            if blueprint is None:
+                raise KeyError(f"unknown agent id {payload['agentId']}")
+            return blueprint
+        return None
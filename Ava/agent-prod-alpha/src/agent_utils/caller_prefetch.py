@@ -0,0 +1,62 @@
+"""
+Resolve a SIP caller's phone number to patient records while the greeting plays.
+
+Enabled with CALLER_ID_PREFETCH=true. Matches are stored in the session's
+PatientCache, which patient_lookup consults before querying MongoDB.
+"""
+
+import asyncio
+import os
+import re
+from typing import Optional
+
+from livekit import rtc
+
+from agent_utils.function_tools import PATIENT_PROJECTION
+from agent_utils.mongo_indexes import PATIENT_PHONE_FIELD
+from agent_utils.mongodb import get_mongodb_connection
+from agent_utils.patient_cache import PatientCache
+
+CALLER_ID_PREFETCH = os.getenv('CALLER_ID_PREFETCH', 'false').lower() in ('1', 'true', 'yes')
+# Several family members may share one phone, prefetch at most this many
+CALLER_ID_MAX_PATIENTS = int(os.getenv('CALLER_ID_MAX_PATIENTS', '3'))
+
+
+def caller_number(participant: rtc.RemoteParticipant) -> Optional[str]:
+    if participant.kind != rtc.ParticipantKind.PARTICIPANT_KIND_SIP:
+        return None
+    return participant.attributes.get('sip.phoneNumber') or None
+
+
+def phone_variants(number: str) -> list[str]:
+    """Forms the number may be stored in: as dialed, digits only and +digits"""
+    digits = re.sub(r'\D', '', number)
+    variants = [number, digits, f"+{digits}"]
+    return list(dict.fromkeys(v for v in variants if v and v != '+'))
+
+
+async def prefetch_patients(number: str, cache: PatientCache):
+    try:
+        db = await get_mongodb_connection()
+        cursor = db.patient_data.find(
+            {PATIENT_PHONE_FIELD: {"$in": phone_variants(number)}},
+            PATIENT_PROJECTION,
+        ).limit(CALLER_ID_MAX_PATIENTS)
+        patients = await cursor.to_list(length=CALLER_ID_MAX_PATIENTS)
+    except Exception as e:
+        print("[Radiance] ---> Caller ID prefetch failed", e)
+        return
+    for patient in patients:
+        cache.put(patient)
+    print(f"[Radiance] ---> Caller ID prefetch found {len(patients)} patient(s)")
+
+
+def start_caller_prefetch(participant: rtc.RemoteParticipant, cache: PatientCache):
+    """Start the prefetch in the background when enabled and the caller is on SIP"""
+    if not CALLER_ID_PREFETCH:
+        return None
+    number = caller_number(participant)
+    if not number:
+        return None
+    cache.prefetch_task = asyncio.create_task(prefetch_patients(number, cache))
+    return cache.prefetch_task
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Optional
+
+from livekit.agents.llm import ChatContext
+
+from agent_utils.background_tasks import spawn
+
+# Upper bound for the warm-up LLM request, it must never hold up the first turn
+WARMUP_LLM_TIMEOUT = float(os.getenv('WARMUP_LLM_TIMEOUT', '5.0'))
+
+
+def _prewarm_instance(instance):
+    # Plugins that support it open their HTTP/WebSocket connections here
+    prewarm = getattr(instance, 'prewarm', None)
+    if prewarm is None:
+        return
+    try:
+        prewarm()
+    except Exception as e:
+        print("[Radiance] ---> Provider prewarm failed", type(instance).__name__, e)
+
+
+async def _ping_llm(llm):
+    """Send a one-token request so the LLM client has a hot TLS connection"""
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="user", content="ping")
+    try:
+        async with llm.chat(chat_ctx=chat_ctx) as stream:
+            async for _ in stream:
+                break
+    except Exception as e:
+        print("[Radiance] ---> LLM warm-up request failed", e)
+
+
+async def warm_up_providers(providers: dict[str, Any]):
+    _prewarm_instance(providers['tts'])
+    _prewarm_instance(providers['stt'])
+    _prewarm_instance(providers['llm'])
+    try:
+        await asyncio.wait_for(_ping_llm(providers['llm']), timeout=WARMUP_LLM_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("[Radiance] ---> LLM warm-up request timed out")
+
+
+async def wait_for_participant_warm(ctx, provider_cache, metadata: dict[str, Any],
+                                    on_ready: Optional[Callable[[dict[str, Any]], None]] = None):
+    """Wait for the caller while the providers are built and their connections warmed.
+
+    Returns (participant, provider_key, providers) as soon as both the
+    participant and the provider instances are there; the warm-up requests
+    keep running in the background and never hold up the session start. The
+    part of the warm-up that overlapped with ctx.wait_for_participant() is
+    logged as hidden latency. `on_ready` is called with the providers as soon
+    as they exist, to start other background preparation.
+    """
+    started = time.perf_counter()
+    acquired = asyncio.get_running_loop().create_future()
+    waited: dict[str, float] = {}
+
+    async def prepare():
+        try:
+            provider_key, providers = provider_cache.acquire(metadata)
+        except Exception as e:
+            acquired.set_exception(e)
+            return
+        acquired.set_result((provider_key, providers))
+        if on_ready is not None:
+            on_ready(providers)
+        try:
+            await warm_up_providers(providers)
+        except Exception as e:
+            print("[Radiance] ---> Provider warm-up failed", e)
+        warmup_duration = time.perf_counter() - started
+        # Everything up to the participant's arrival was hidden behind the wait
+        hidden = min(warmup_duration, waited.get('participant', warmup_duration))
+        print(
+            f"[Radiance] ---> Warm-up took {warmup_duration * 1000:.0f}ms, "
+            f"hidden {hidden * 1000:.0f}ms behind the participant wait"
+        )
+
+    warmup_task = spawn(prepare())
+    try:
+        participant = await ctx.wait_for_participant()
+        waited['participant'] = time.perf_counter() - started
+        provider_key, providers = await acquired
+    except BaseException:
+        warmup_task.cancel()
+        # The providers may already be leased to this job
+        if acquired.done() and not acquired.cancelled() and acquired.exception() is None:
+            provider_cache.release(acquired.result()[0])
+        raise
+    print(f"[Radiance] ---> Participant wait {waited['participant'] * 1000:.0f}ms")
+    return participant, provider_key, providers
@@ -0,0 +1,208 @@
+"""
+Bounded chat context for long calls.
+
+The LLM sees the blueprint prefix, a running summary of older turns and the
+last CONTEXT_KEEP_TURNS turns verbatim. Turns that fall out of that window are
+folded into the summary by a background LLM request between turns, tool
+outputs of earlier turns are condensed, and CONTEXT_TOKEN_CEILING is enforced
+by dropping the oldest unsummarized turns if the summary is not ready yet.
+The session's own chat history is never modified.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+from livekit.agents.llm import ChatContext, ChatMessage
+
+from agent_utils.patient_renderer import estimate_tokens, truncate_to_tokens
+from agent_utils.system_messages import BLUEPRINT_ITEM_PREFIX, INSTRUCTION_ROLES
+
+CONTEXT_KEEP_TURNS = int(os.getenv('CONTEXT_KEEP_TURNS', '6'))
+CONTEXT_TOKEN_CEILING = int(os.getenv('CONTEXT_TOKEN_CEILING', '4000'))
+# Tool outputs of turns older than the last few are cut to this many tokens
+CONTEXT_TOOL_OUTPUT_TOKENS = int(os.getenv('CONTEXT_TOOL_OUTPUT_TOKENS', '60'))
+CONTEXT_TOOL_OUTPUT_KEEP_TURNS = int(os.getenv('CONTEXT_TOOL_OUTPUT_KEEP_TURNS', '2'))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv('CONTEXT_SUMMARY_TOKENS', '300'))
+CONTEXT_SUMMARY_TIMEOUT = float(os.getenv('CONTEXT_SUMMARY_TIMEOUT', '20.0'))
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation between a medical clinic voice assistant and a caller "
+    "for the assistant's own reference. Keep names, patient IDs, dates, times, booked "
+    "appointments, medications and open requests. Drop greetings and small talk. "
+    "Answer in at most {tokens} tokens of plain text."
+)
+
+
+def item_tokens(item) -> int:
+    if item.type == "message":
+        return estimate_tokens(item.text_content or "")
+    if item.type == "function_call":
+        return estimate_tokens(f"{item.name}{item.arguments}")
+    if item.type == "function_call_output":
+        return estimate_tokens(item.output or "")
+    return 0
+
+
+def context_tokens(items) -> int:
+    return sum(item_tokens(item) for item in items)
+
+
+def split_prefix(items):
+    """Leading instructions and blueprint example turns, sent unchanged on every request"""
+    for i, item in enumerate(items):
+        is_prefix = item.id.startswith(BLUEPRINT_ITEM_PREFIX) or (
+            item.type == "message" and item.role in INSTRUCTION_ROLES)
+        if not is_prefix:
+            return items[:i], items[i:]
+    return items, []
+
+
+def split_turns(items) -> list[list]:
+    """Group the conversation into turns, each starting at a user message"""
+    turns = []
+    for item in items:
+        if not turns or (item.type == "message" and item.role == "user"):
+            turns.append([])
+        turns[-1].append(item)
+    return turns
+
+
+def condense_tool_outputs(turn: list) -> list:
+    condensed = []
+    for item in turn:
+        if item.type == "function_call_output" and item_tokens(item) > CONTEXT_TOOL_OUTPUT_TOKENS:
+            item = item.model_copy(update={
+                "output": truncate_to_tokens(item.output, CONTEXT_TOOL_OUTPUT_TOKENS) + " [condensed]",
+            })
+        condensed.append(item)
+    return condensed
+
+
+def transcript(turns: list[list]) -> str:
+    lines = []
+    for turn in turns:
+        for item in turn:
+            if item.type == "message" and item.text_content:
+                lines.append(f"{item.role}: {item.text_content}")
+            elif item.type == "function_call":
+                lines.append(f"tool call {item.name}: {item.arguments}")
+            elif item.type == "function_call_output":
+                lines.append(f"tool result {item.name}: {item.output}")
+    return "\n".join(lines)
+
+
+@dataclass
+class CompactionStats:
+    # Estimated prompt tokens per LLM request, full history vs what was sent
+    full_tokens: list[int] = field(default_factory=list)
+    sent_tokens: list[int] = field(default_factory=list)
+    summaries: int = 0
+    trimmed_requests: int = 0
+
+    def record(self, full: int, sent: int):
+        self.full_tokens.append(full)
+        self.sent_tokens.append(sent)
+
+    def report(self) -> str:
+        if not self.sent_tokens:
+            return "no LLM requests"
+        full, sent = sum(self.full_tokens), sum(self.sent_tokens)
+        return (
+            f"{len(self.sent_tokens)} requests, ~{sent} prompt tokens sent of ~{full} "
+            f"({100 * (full - sent) / max(full, 1):.0f}% saved), last request ~{self.sent_tokens[-1]} tokens, "
+            f"{self.summaries} summaries, {self.trimmed_requests} requests trimmed to the ceiling"
+        )
+
+
+class ContextCompactor:
+    def __init__(self, keep_turns: int = CONTEXT_KEEP_TURNS, token_ceiling: int = CONTEXT_TOKEN_CEILING):
+        self.keep_turns = keep_turns
+        self.token_ceiling = token_ceiling
+        self.summary: Optional[str] = None
+        self.stats = CompactionStats()
+        # Id of the first item of the first turn not folded into the summary
+        self._summarized_until: Optional[str] = None
+        self._summary_version = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _unsummarized(self, turns: list[list]) -> list[list]:
+        if self._summarized_until is None:
+            return turns
+        for i, turn in enumerate(turns):
+            if turn[0].id == self._summarized_until:
+                return turns[i:]
+        # The boundary item is gone from the history, keep everything
+        return turns
+
+    def compact(self, chat_ctx: ChatContext) -> ChatContext:
+        """The chat context to send to the LLM for this request"""
+        prefix, conversation = split_prefix(chat_ctx.items)
+        turns = self._unsummarized(split_turns(conversation))
+
+        recent = [
+            turn if i >= len(turns) - CONTEXT_TOOL_OUTPUT_KEEP_TURNS else condense_tool_outputs(turn)
+            for i, turn in enumerate(turns)
+        ]
+        summary = []
+        if self.summary:
+            summary.append(ChatMessage(
+                id=f"context_summary_{self._summary_version}",
+                role="system",
+                content=[f"Summary of the earlier conversation: {self.summary}"],
+                created_at=0.0,
+            ))
+
+        # Summary still pending, stay under the ceiling by dropping the oldest turns
+        budget = self.token_ceiling - context_tokens(prefix) - context_tokens(summary)
+        trimmed = False
+        while len(recent) > 1 and sum(context_tokens(turn) for turn in recent) > budget:
+            recent.pop(0)
+            trimmed = True
+        self.stats.trimmed_requests += trimmed
+
+        items = prefix + summary + [item for turn in recent for item in turn]
+        self.stats.record(context_tokens(chat_ctx.items), context_tokens(items))
+        return ChatContext(items)
+
+    def schedule(self, chat_ctx: ChatContext, llm):
+        """Fold turns beyond the last `keep_turns` into the summary, in the background"""
+        if self._task is not None and not self._task.done():
+            return
+        _, conversation = split_prefix(chat_ctx.items)
+        turns = self._unsummarized(split_turns(conversation))
+        if len(turns) <= self.keep_turns:
+            return
+        self._task = asyncio.create_task(self._summarize(turns[:-self.keep_turns], turns[-self.keep_turns][0].id, llm))
+
+    async def _summarize(self, turns: list[list], summarized_until: str, llm):
+        request = ChatContext.empty()
+        request.add_message(role="system", content=SUMMARY_INSTRUCTIONS.format(tokens=CONTEXT_SUMMARY_TOKENS))
+        if self.summary:
+            request.add_message(role="user", content=f"Earlier summary:\n{self.summary}")
+        request.add_message(role="user", content=f"Conversation to add:\n{transcript(turns)}")
+
+        async def generate():
+            parts = []
+            async with llm.chat(chat_ctx=request) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        parts.append(chunk.delta.content)
+            return ''.join(parts).strip()
+
+        try:
+            summary = await asyncio.wait_for(generate(), CONTEXT_SUMMARY_TIMEOUT)
+        except Exception as e:
+            print("[Radiance] ---> Failed to summarize the chat context", e)
+            return
+        if not summary:
+            return
+        self.summary = truncate_to_tokens(summary, CONTEXT_SUMMARY_TOKENS)
+        self._summarized_until = summarized_until
+        self._summary_version += 1
+        self.stats.summaries += 1
+
+    async def aclose(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
@@ -38,6 +38,11 @@ default_bp = {
         "آپ بتائیں، آج آپ کو کیا پریشانی ہے؟"
     ),
     "endCallMessage": "اللہ حافظ۔ اپنی صحت کا خیال رکھیے گا۔",
+    "fillerMessages": {
+        "patient_lookup": "ایک لمحہ انتظار کیجیے، میں آپ کی طبی معلومات نکال رہی ہوں۔",  # noqa: RUF001
+        "book_appointment": "ایک لمحہ انتظار کیجیے، میں آپ کی اپائنٹمنٹ بک کر رہی ہوں۔",  # noqa: RUF001
+        "list_appointments": "ایک لمحہ انتظار کیجیے، میں آپ کی اپائنٹمنٹس دیکھ رہی ہوں۔"  # noqa: RUF001
+    },
     "transcriber": {
         "language_code": "urd",
         "provider": "elevenlabs"
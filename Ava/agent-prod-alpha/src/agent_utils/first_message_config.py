@@ -1,10 +1,37 @@
+from agent_utils.session_data import get_session_data
+from agent_utils.utterance_cache import audio_frames, say_cached
+
+MODEL_GENERATED_MODE = "assistant-speaks-first-with-model-generated-message"
+
+
 async def first_message_mode(session, config_data: dict):
     first_message_mode = config_data.get('firstMessageMode')
     first_message = config_data.get('firstMessage')
+    session_data = get_session_data(session)
+    utterance_cache = getattr(session_data, 'utterance_cache', None)
     
     # Execute first message behavior
     if first_message_mode != "assistant-waits-for-user":
         if first_message_mode == "assistant-speaks-first" and first_message:
-            await session.say(first_message)
-        else:
-            await session.generate_reply(allow_interruptions=True)
\ No newline at end of file
+            # Played from the pre-rendered cache when available
+            await say_cached(session, utterance_cache, first_message, config_data['voice'])
+        elif not await say_pooled_greeting(session, session_data, config_data):
+            await session.generate_reply(allow_interruptions=True)
+
+
+async def say_pooled_greeting(session, session_data, config_data: dict) -> bool:
+    """Play a pre-generated greeting variant, returns False when none is ready"""
+    greeting_pool = getattr(session_data, 'greeting_pool', None)
+    if greeting_pool is None or not session_data.blueprint_hash:
+        return False
+
+    greeting = greeting_pool.take(session_data.blueprint_hash, config_data['voice'])
+    # Replace the variant we are about to use
+    greeting_pool.fill(session_data.blueprint_hash, config_data, session.llm, session.tts)
+    if greeting is None:
+        return False
+
+    text, audio = greeting
+    # The text is added to the chat context so the conversation stays coherent
+    await session.say(text, audio=audio_frames(audio), allow_interruptions=True, add_to_chat_ctx=True)
+    return True
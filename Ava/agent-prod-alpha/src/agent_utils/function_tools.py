@@ -1,38 +1,61 @@
 import os
+import asyncio
+from datetime import date
 from typing import Annotated
 from pydantic import Field
 from livekit.agents.llm import function_tool
 from livekit.agents.voice import Agent, RunContext
-from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
+from agent_utils.tool_execution import run_with_filler
+from agent_utils.mongodb import get_mongodb_connection
+from agent_utils.slot_index import get_slot_index
+from agent_utils.session_data import get_session_data
+from agent_utils.patient_renderer import render_patient
+from agent_utils.appointment_journal import (
+    APPOINTMENT_WRITE_BEHIND, get_appointment_journal, idempotency_key)
 
-# MongoDB connection
-client = None
-database = None
+# Set once agent_utils.migrations normalize-patient-ids has run
+PATIENT_IDS_NORMALIZED = os.getenv('PATIENT_IDS_NORMALIZED', 'false').lower() in ('1', 'true', 'yes')
 
-async def get_mongodb_connection():
-    """Get MongoDB connection"""
-    global client, database
-    
-    if client is None:
-        # Get connection string from environment variable
-        connection_string = os.getenv('MONGODB_CONNECTION_STRING')
-        database_name = os.getenv('MONGODB_DATABASE_NAME', 'medical_db')
-        
-        if not connection_string:
-            raise ValueError("Missing MONGODB_CONNECTION_STRING environment variable")
-        
-        # Add database name to connection string if not already included
-        if f"/{database_name}" not in connection_string:
-            connection_string = connection_string.rstrip('/') + f"/{database_name}?retryWrites=true&w=majority"
-        
-        client = AsyncIOMotorClient(connection_string)
-        database = client[database_name]
-        
-        # Test connection
-        await client.admin.command('ping')
-    
-    return database
+# Only the fields patient_lookup renders are fetched
+PATIENT_PROJECTION = {
+    "_id": 0,
+    "full_name": 1,
+    "patient_id": 1,
+    "date_of_birth": 1,
+    "test_report": 1,
+    "doctors_prescription": 1,
+    "updated_at": 1,
+}
+
+
+def patient_id_candidates(patient_id: str) -> list:
+    """patient_id may be stored as a string or an int, match both in one query"""
+    candidates = [patient_id]
+    if not PATIENT_IDS_NORMALIZED:
+        try:
+            candidates.append(int(patient_id))
+        except ValueError:
+            pass
+    return candidates
+
+
+# Only the fields list_appointments reads out
+APPOINTMENT_LIST_PROJECTION = {
+    "_id": 0,
+    "doctor_specialty": 1,
+    "appointment_date": 1,
+    "appointment_time": 1,
+    "idempotency_key": 1,
+}
+APPOINTMENT_LIST_LIMIT = int(os.getenv('APPOINTMENT_LIST_LIMIT', '5'))
+
+
+def patient_id_filter(patient_id: str) -> dict:
+    candidates = patient_id_candidates(patient_id)
+    if len(candidates) == 1:
+        return {"patient_id": candidates[0]}
+    return {"patient_id": {"$in": candidates}}
 
 @function_tool()
 async def patient_lookup(
@@ -41,55 +64,39 @@ async def patient_lookup(
 ) -> str:
     """Call this tool ONLY when the user provides their patient ID to retrieve their medical reports, test results, and prescription information. You MUST ask for the patient ID first before calling this tool."""
     
-    try:
-        # Let user know we're processing
-        await context.session.generate_reply(
-            instructions="Tell the user that you are retrieving their medical information from the database. This may take a moment."
-        )
-        
+    session_data = get_session_data(context.session)
+    patient_cache = session_data.patient_cache if session_data is not None else None
+
+    async def find_patient():
+        # Records prefetched from the caller ID need no database round trip
+        if patient_cache is not None:
+            patient = await patient_cache.lookup(patient_id)
+            if patient is not None:
+                return patient
+
         # Get MongoDB connection
         db = await get_mongodb_connection()
         
-        # Find patient - try both string and int patient_id
-        patient = await db.patient_data.find_one({"patient_id": patient_id})
-        if not patient:
-            # Try with integer patient_id
-            try:
-                patient = await db.patient_data.find_one({"patient_id": int(patient_id)})
-            except ValueError:
-                pass
+        # Find patient - string and int patient_id in a single round trip
+        patient = await db.patient_data.find_one(patient_id_filter(patient_id), PATIENT_PROJECTION)
+        if patient is not None and patient_cache is not None:
+            patient_cache.put(patient)
+        return patient
+
+    try:
+        # Start the lookup at once, tell the user to wait only if it is slow
+        patient = await run_with_filler(
+            context,
+            find_patient(),
+            "Tell the user that you are retrieving their medical information from the database. This may take a moment.",
+            filler_key="patient_lookup",
+        )
         
         if not patient:
             return f"No patient found with ID: {patient_id}. Please verify your patient ID and try again."
         
-        # Format response based on your actual data structure
-        response = f"**Patient Information for {patient.get('full_name', 'Unknown')}:**\n"
-        response += f"Patient ID: {patient.get('patient_id')}\n"
-        response += f"Date of Birth: {patient.get('date_of_birth', 'N/A')}\n"
-        
-        # Test Report
-        if patient.get('test_report'):
-            response += f"\n**Latest Test Report:**\n{patient.get('test_report')}\n"
-        
-        # Doctor's Prescription
-        if patient.get('doctors_prescription'):
-            prescription = patient.get('doctors_prescription')
-            response += f"\n**Current Prescriptions:**\n"
-            
-            if prescription.get('medications'):
-                for i, med in enumerate(prescription['medications'], 1):
-                    response += f"{i}. **{med.get('medicine_name', 'Unknown')}**\n"
-                    response += f"   - Dosage: {med.get('dosage', 'N/A')}\n"
-                    response += f"   - Frequency: {med.get('frequency', 'N/A')}\n"
-                    response += f"   - Duration: {med.get('duration', 'N/A')}\n\n"
-            
-            if prescription.get('special_instructions'):
-                response += f"**Special Instructions:**\n{prescription.get('special_instructions')}\n"
-            
-            if prescription.get('lifestyle_recommendations'):
-                response += f"\n**Lifestyle Recommendations:**\n{prescription.get('lifestyle_recommendations')}\n"
-        
-        return response
+        # Compact plain-text rendering within a token budget, memoized per document version
+        return render_patient(patient, session_data.render_stats if session_data is not None else None)
         
     except Exception as e:
         return f"Sorry, I encountered an error while retrieving your medical information: {str(e)}. Please try again later."
@@ -115,33 +122,163 @@ async def book_appointment(
         appointment_time: The time for the appointment (format: HH:MM)
     """
     
+    # Create appointment document
+    appointment_data = {
+        "patient_full_name": patient_full_name,
+        "patient_id": patient_id,
+        "doctor_specialty": doctor_specialty,
+        "appointment_date": appointment_date,
+        "appointment_time": appointment_time,
+        "status": "scheduled",
+        "created_at": context.session.start_time.isoformat() if hasattr(context.session, 'start_time') else None,
+        # Retried or duplicated tool calls map to the same appointment
+        "idempotency_key": idempotency_key(patient_id, doctor_specialty, appointment_date, appointment_time),
+    }
+
+    session_data = get_session_data(context.session)
+
+    # Claim the slot in memory first, conflicts are answered without a DB call
+    slot_index = get_slot_index()
     try:
-        # Let user know we're processing
-        await context.session.generate_reply(
-            instructions="Tell the user that you are booking their appointment. This may take a moment."
-        )
-        
+        # A retried call finds the slot already held under its own key
+        if slot_index.is_past(appointment_date, appointment_time):
+            return f"That time has already passed. {describe_alternatives(slot_index, doctor_specialty, appointment_date, appointment_time)}"
+        retried = slot_index.holder(doctor_specialty, appointment_date, appointment_time) == appointment_data["idempotency_key"]
+        reserved = slot_index.reserve(
+            doctor_specialty, appointment_date, appointment_time, appointment_data["idempotency_key"])
+    except ValueError:
+        return "The date or time is not valid. Please give the date as YYYY-MM-DD and the time as HH:MM."
+    if not reserved:
+        return f"That slot is not available. {describe_alternatives(slot_index, doctor_specialty, appointment_date, appointment_time)}"
+
+    def release_slot():
+        if not retried:
+            slot_index.release(doctor_specialty, appointment_date, appointment_time)
+
+    async def insert_appointment():
+        if APPOINTMENT_WRITE_BEHIND:
+            # Journaled locally, flushed to MongoDB in the background
+            await get_appointment_journal().record(appointment_data)
+            return True
+
         # Get MongoDB connection
         db = await get_mongodb_connection()
         
-        # Create appointment document
-        appointment_data = {
-            "patient_full_name": patient_full_name,
-            "patient_id": patient_id,
-            "doctor_specialty": doctor_specialty,
-            "appointment_date": appointment_date,
-            "appointment_time": appointment_time,
-            "status": "scheduled",
-            "created_at": context.session.start_time.isoformat() if hasattr(context.session, 'start_time') else None
-        }
-        
         # Insert appointment into database
-        result = await db.appointments.insert_one(appointment_data)
+        result = await db.appointments.update_one(
+            {"idempotency_key": appointment_data["idempotency_key"]},
+            {"$setOnInsert": appointment_data},
+            upsert=True,
+        )
+        return result.acknowledged
+
+    booked = False
+    try:
+        # Start the insert at once, tell the user to wait only if it is slow
+        booked = await run_with_filler(
+            context,
+            insert_appointment(),
+            "Tell the user that you are booking their appointment. This may take a moment.",
+            filler_key="book_appointment",
+        )
         
-        if result.inserted_id:
+        if booked:
+            if session_data is not None:
+                session_data.appointments_cache.pop(str(patient_id).strip(), None)
             return f"✅ Appointment booked successfully!\n\n**Appointment Details:**\n- Patient: {patient_full_name} (ID: {patient_id})\n- Doctor: {doctor_specialty}\n- Date: {appointment_date}\n- Time: {appointment_time}\n- Status: Scheduled\n\nYour appointment has been confirmed. Please arrive 15 minutes early."
         else:
             return "❌ Failed to book appointment. Please try again later."
         
     except Exception as e:
         return f"Sorry, I encountered an error while booking your appointment: {str(e)}. Please try again later."
+    finally:
+        # Also when the tool call is interrupted, the CancelledError skips the except
+        if not booked:
+            release_slot()
+
+
+@function_tool()
+async def list_appointments(
+    patient_id: Annotated[str, Field(description="The patient's unique ID number")],
+    context: RunContext,
+) -> str:
+    """Call this tool when the user asks about their upcoming appointments, e.g. "when is my appointment". You MUST ask for the patient ID first before calling this tool."""
+    
+    session_data = get_session_data(context.session)
+    cache_key = str(patient_id).strip()
+    if session_data is not None and cache_key in session_data.appointments_cache:
+        appointments = session_data.appointments_cache[cache_key]
+    else:
+        async def find_appointments():
+            # Get MongoDB connection
+            db = await get_mongodb_connection()
+
+            # Upcoming appointments only, served by the (patient_id, appointment_date) index
+            query = {
+                **patient_id_filter(patient_id),
+                "appointment_date": {"$gte": date.today().isoformat()},
+                "status": "scheduled",
+            }
+            cursor = db.appointments.find(query, APPOINTMENT_LIST_PROJECTION) \
+                .sort([("appointment_date", 1), ("appointment_time", 1)]) \
+                .limit(APPOINTMENT_LIST_LIMIT)
+            return await cursor.to_list(length=APPOINTMENT_LIST_LIMIT)
+
+        try:
+            appointments = await run_with_filler(
+                context,
+                find_appointments(),
+                "Tell the user that you are checking their appointments. This may take a moment.",
+                filler_key="list_appointments",
+            )
+        except Exception as e:
+            return f"Sorry, I encountered an error while retrieving your appointments: {e!s}. Please try again later."
+
+        if APPOINTMENT_WRITE_BEHIND:
+            # Bookings still waiting in the journal are not in MongoDB yet
+            seen = {a.get("idempotency_key") for a in appointments}
+            pending = await asyncio.to_thread(get_appointment_journal().pending_for_patient, patient_id)
+            appointments += [a for a in pending if a["idempotency_key"] not in seen
+                             and a["appointment_date"] >= date.today().isoformat()]
+            appointments.sort(key=lambda a: (a["appointment_date"], a["appointment_time"]))
+            appointments = appointments[:APPOINTMENT_LIST_LIMIT]
+
+        if session_data is not None:
+            session_data.appointments_cache[cache_key] = appointments
+
+    if not appointments:
+        return f"No upcoming appointments found for patient ID: {patient_id}."
+
+    lines = [
+        f"- {a.get('doctor_specialty', 'Doctor')} on {a.get('appointment_date')} at {a.get('appointment_time')}"
+        for a in appointments
+    ]
+    return f"Upcoming appointments for patient ID {patient_id}:\n" + "\n".join(lines)
+
+
+def describe_alternatives(slot_index, doctor_specialty: str, appointment_date: str, appointment_time: str) -> str:
+    alternatives = slot_index.nearest_free(doctor_specialty, appointment_date, appointment_time)
+    if not alternatives:
+        return f"There are no free {doctor_specialty} slots in the coming days."
+    options = ", ".join(f"{day} at {time}" for day, time in alternatives)
+    return f"The nearest free {doctor_specialty} slots are: {options}."
+
+
+@function_tool()
+async def check_appointment_availability(
+    context: RunContext,
+    doctor_specialty: Annotated[str, Field(description="The type of doctor to meet (e.g., cardiologist, neurologist, general physician)")],
+    appointment_date: Annotated[str, Field(description="The requested date (format: YYYY-MM-DD)")],
+    appointment_time: Annotated[str, Field(description="The requested time (format: HH:MM)")],
+) -> str:
+    """Check whether an appointment slot is free before booking it, and get the nearest free alternatives if it is not. Use this to offer the caller other times."""
+    
+    slot_index = get_slot_index()
+    try:
+        if slot_index.is_past(appointment_date, appointment_time):
+            return f"That time has already passed. {describe_alternatives(slot_index, doctor_specialty, appointment_date, appointment_time)}"
+        if slot_index.is_free(doctor_specialty, appointment_date, appointment_time):
+            return f"The {doctor_specialty} slot on {appointment_date} at {appointment_time} is free."
+        return f"That slot is not available. {describe_alternatives(slot_index, doctor_specialty, appointment_date, appointment_time)}"
+    except ValueError:
+        return "The date or time is not valid. Please give the date as YYYY-MM-DD and the time as HH:MM."
@@ -0,0 +1,140 @@
+"""
+Pool of pre-generated greetings for the model-generated first message mode.
+
+The greeting only depends on the blueprint's system prompt, so a few variants
+are generated ahead of time per blueprint hash and voice, with their audio
+rendered into the utterance cache. A call takes the next variant, which is
+removed from the on-disk index too, and the pool is topped up in the
+background at most once every GREETING_REFILL_INTERVAL seconds.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from livekit.agents.llm import ChatMessage
+
+from agent_utils.background_tasks import spawn
+from agent_utils.system_messages import build_agent_context
+from agent_utils.utterance_cache import UtteranceCache, utterance_key, voice_signature
+
+GREETING_POOL_SIZE = int(os.getenv('GREETING_POOL_SIZE', '3'))
+GREETING_TIMEOUT = float(os.getenv('GREETING_TIMEOUT', '15.0'))
+# Minimum time between two refills of the same pool, bounds the LLM+TTS spend
+GREETING_REFILL_INTERVAL = float(os.getenv('GREETING_REFILL_INTERVAL', '60.0'))
+
+
+def pool_key(blueprint_hash: str, voice_config: Mapping[str, Any]) -> str:
+    """Variants are rendered for one voice, routing may pick another one per call"""
+    voice = hashlib.sha256('\x1f'.join(voice_signature(voice_config)).encode('utf-8')).hexdigest()
+    return f"{blueprint_hash}-{voice[:16]}"
+
+
+class GreetingPool:
+    def __init__(self, utterance_cache: UtteranceCache, size: int = GREETING_POOL_SIZE,
+                 refill_interval: float = GREETING_REFILL_INTERVAL):
+        self.utterance_cache = utterance_cache
+        self.size = size
+        self.refill_interval = refill_interval
+        self._greetings: dict[str, deque[str]] = {}
+        self._filling: dict[str, asyncio.Task] = {}
+        self._last_fill: dict[str, float] = {}
+        self._index_locks: dict[str, asyncio.Lock] = {}
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.utterance_cache.directory, f"greetings-{key}.json")
+
+    def _greetings_for(self, key: str) -> deque[str]:
+        greetings = self._greetings.get(key)
+        if greetings is None:
+            greetings = deque()
+            # Variants rendered by earlier processes are reused if their audio survived
+            try:
+                with open(self._index_path(key), encoding='utf-8') as f:
+                    greetings.extend(json.load(f))
+            except (OSError, ValueError):
+                pass
+            self._greetings[key] = greetings
+        return greetings
+
+    def _save_index(self, key: str, greetings: list):
+        path = self._index_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(greetings, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def _persist(self, key: str):
+        # Writes are serialized and snapshot the pool when they run, the last one wins
+        lock = self._index_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            await asyncio.to_thread(self._save_index, key, list(self._greetings_for(key)))
+
+    def take(self, blueprint_hash: str, voice_config: Mapping[str, Any]):
+        """Return (text, audio) of the next ready greeting, or None if the pool is empty"""
+        key = pool_key(blueprint_hash, voice_config)
+        greetings = self._greetings_for(key)
+        if not greetings:
+            return None
+        taken = None
+        while greetings and taken is None:
+            text = greetings.popleft()
+            audio = self.utterance_cache.load(utterance_key(text, voice_config))
+            # Variants whose audio was evicted from the cache are dropped
+            if audio is not None:
+                taken = text, audio
+        # Served variants must not come back after a restart
+        spawn(self._persist(key))
+        return taken
+
+    def fill(self, blueprint_hash: str, metadata: Mapping[str, Any], llm, tts):
+        """Top the pool up to `size` variants in the background, debounced per pool"""
+        key = pool_key(blueprint_hash, metadata['voice'])
+        task = self._filling.get(key)
+        if task is not None and not task.done():
+            return task
+        if len(self._greetings_for(key)) >= self.size:
+            return None
+        now = time.monotonic()
+        if now - self._last_fill.get(key, float('-inf')) < self.refill_interval:
+            return None
+        self._last_fill[key] = now
+        task = spawn(self._fill(key, metadata, llm, tts, blueprint_hash))
+        self._filling[key] = task
+        return task
+
+    async def _fill(self, key: str, metadata: Mapping[str, Any], llm, tts, blueprint_hash: str):
+        greetings = self._greetings_for(key)
+        attempts = 0
+        while len(greetings) < self.size and attempts < self.size * 2:
+            attempts += 1
+            try:
+                text = await asyncio.wait_for(generate_greeting(llm, metadata, blueprint_hash), GREETING_TIMEOUT)
+            except Exception as e:
+                print("[Radiance] ---> Failed to generate greeting", e)
+                return
+            if not text or text in greetings:
+                continue
+            audio = await self.utterance_cache.render(tts, text, metadata['voice'])
+            if audio is None:
+                return
+            greetings.append(text)
+            await self._persist(key)
+
+
+async def generate_greeting(llm, metadata: Mapping[str, Any], blueprint_hash: Optional[str] = None) -> Optional[str]:
+    """Ask the LLM for the opening line with the same prefix the live agent sends"""
+    instructions, chat_ctx = build_agent_context(metadata, blueprint_hash, include_volatile=False)
+    chat_ctx.items.insert(0, ChatMessage(role="system", content=[instructions]))
+
+    parts = []
+    async with llm.chat(chat_ctx=chat_ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                parts.append(chunk.delta.content)
+    return ''.join(parts).strip() or None
@@ -0,0 +1,219 @@
+"""
+LLM that hedges slow requests across an ordered chain of providers.
+
+The request goes to the first healthy provider. If no chunk arrives within
+that provider's hedge delay (a percentile of its recent time-to-first-token),
+the next provider is started as well and the first one to produce a chunk
+wins; the others are cancelled. Errors before the first chunk, and streams
+that end without any chunk, fail over to the next provider immediately.
+Once a chunk has been sent, an error of the winning stream is not retried,
+a retry would send the reply again.
+Health is tracked per provider and model for the whole process, so a
+provider that keeps failing is skipped for a while.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectionError,
+    APIConnectOptions,
+    APIError,
+    llm,
+)
+from livekit.agents.llm import ChatContext, LLMStream
+
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '0.95'))
+# Hedge delay used until a provider has enough TTFT samples
+HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', '2.0'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '0.3'))
+HEDGE_MAX_DELAY = float(os.getenv('HEDGE_MAX_DELAY', '5.0'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_WINDOW = int(os.getenv('HEDGE_WINDOW', '200'))
+# A provider failing this many times in a row is skipped for the cool-down
+PROVIDER_MAX_FAILURES = int(os.getenv('PROVIDER_MAX_FAILURES', '3'))
+PROVIDER_COOLDOWN = float(os.getenv('PROVIDER_COOLDOWN', '30.0'))
+
+
+@dataclass
+class ProviderHealth:
+    label: str
+    ttft: deque[float] = field(default_factory=lambda: deque(maxlen=HEDGE_WINDOW))
+    successes: int = 0
+    failures: int = 0
+    hedges_won: int = 0
+    consecutive_failures: int = 0
+    unhealthy_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def hedge_delay(self) -> float:
+        if len(self.ttft) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        samples = sorted(self.ttft)
+        delay = samples[int(HEDGE_PERCENTILE * (len(samples) - 1))]
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, delay))
+
+    def record_success(self, ttft: float):
+        self.ttft.append(ttft)
+        self.successes += 1
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= PROVIDER_MAX_FAILURES:
+            self.unhealthy_until = time.monotonic() + PROVIDER_COOLDOWN
+            print(f"[Radiance] ---> LLM provider {self.label} unhealthy for {PROVIDER_COOLDOWN:.0f}s")
+
+    def report(self) -> str:
+        return (
+            f"{self.label}: {self.successes} ok, {self.failures} failed, "
+            f"{self.hedges_won} won as hedge, hedge delay {self.hedge_delay() * 1000:.0f}ms"
+        )
+
+
+_health: dict[str, ProviderHealth] = {}
+
+
+def provider_health(label: str) -> ProviderHealth:
+    health = _health.get(label)
+    if health is None:
+        health = _health[label] = ProviderHealth(label)
+    return health
+
+
+def health_report() -> list[str]:
+    return [health.report() for health in _health.values()]
+
+
+class HedgedLLM(llm.LLM):
+    def __init__(self, providers: list[tuple[str, llm.LLM]]):
+        """`providers` are (label, instance) pairs in preference order"""
+        super().__init__()
+        self._providers = providers
+
+    @property
+    def model(self) -> str:
+        return self._providers[0][1].model
+
+    @property
+    def providers(self) -> list[tuple[str, llm.LLM]]:
+        return list(self._providers)
+
+    def ordered_providers(self) -> list[tuple[ProviderHealth, llm.LLM]]:
+        """Healthy providers in preference order, then the ones cooling down"""
+        chain = [(provider_health(label), instance) for label, instance in self._providers]
+        return [p for p in chain if p[0].healthy] + [p for p in chain if not p[0].healthy]
+
+    def chat(self, *, chat_ctx: ChatContext, tools=None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+             **kwargs) -> "HedgedLLMStream":
+        return HedgedLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options,
+                               chat_kwargs=kwargs)
+
+    def prewarm(self) -> None:
+        for _, instance in self._providers:
+            instance.prewarm()
+
+    async def aclose(self) -> None:
+        for _, instance in self._providers:
+            await instance.aclose()
+
+
+class HedgedLLMStream(LLMStream):
+    def __init__(self, hedged: HedgedLLM, *, chat_ctx: ChatContext, tools, conn_options: APIConnectOptions,
+                 chat_kwargs: dict[str, Any]):
+        super().__init__(hedged, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._chat_kwargs = chat_kwargs
+        # The chain is the retry mechanism, providers must not retry on their own
+        self._inner_conn_options = APIConnectOptions(
+            max_retry=0, retry_interval=conn_options.retry_interval, timeout=conn_options.timeout)
+
+    def _start(self, instance: llm.LLM) -> LLMStream:
+        return instance.chat(chat_ctx=self._chat_ctx, tools=self._tools,
+                             conn_options=self._inner_conn_options, **self._chat_kwargs)
+
+    async def _run(self) -> None:
+        chain = self._llm.ordered_providers()
+        # pending first-chunk task -> (health, stream, started)
+        attempts: dict[asyncio.Task, tuple[ProviderHealth, LLMStream, float]] = {}
+        winner: Optional[tuple[ProviderHealth, LLMStream]] = None
+        first_chunk = None
+        next_provider = 0
+
+        def start_next() -> bool:
+            nonlocal next_provider
+            if next_provider >= len(chain):
+                return False
+            health, instance = chain[next_provider]
+            next_provider += 1
+            stream = self._start(instance)
+            attempts[asyncio.ensure_future(stream.__anext__())] = (health, stream, time.perf_counter())
+            return True
+
+        start_next()
+        try:
+            while attempts and winner is None:
+                # Hedge after the delay of the most recently started provider
+                delay = chain[next_provider - 1][0].hedge_delay() if next_provider < len(chain) else None
+                done, _ = await asyncio.wait(attempts, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    start_next()
+                    continue
+                for task in done:
+                    health, stream, started = attempts.pop(task)
+                    try:
+                        chunk = task.result()
+                    except StopAsyncIteration:
+                        # An empty stream would leave the turn without a reply
+                        print(f"[Radiance] ---> LLM provider {health.label} returned an empty response")
+                        chunk = None
+                    except Exception as e:
+                        print(f"[Radiance] ---> LLM provider {health.label} failed", e)
+                        chunk = None
+                    if chunk is None:
+                        health.record_failure()
+                        await stream.aclose()
+                        if not attempts:
+                            start_next()
+                        continue
+                    if winner is None:
+                        health.record_success(time.perf_counter() - started)
+                        if health is not chain[0][0]:
+                            health.hedges_won += 1
+                        winner, first_chunk = (health, stream), chunk
+                    else:
+                        await stream.aclose()
+        finally:
+            # Cancel the losers
+            for task, (_, stream, _) in attempts.items():
+                task.cancel()
+                await stream.aclose()
+
+        if winner is None:
+            raise APIConnectionError("all LLM providers failed", retryable=False)
+
+        health, stream = winner
+        try:
+            self._event_ch.send_nowait(first_chunk)
+            async for chunk in stream:
+                self._event_ch.send_nowait(chunk)
+        except APIError as e:
+            # LLMStream would re-run _run and send the chunks again
+            health.record_failure()
+            raise APIConnectionError(f"LLM provider {health.label} failed mid-stream: {e}",
+                                     retryable=False) from e
+        finally:
+            await stream.aclose()
+
+
+async def log_provider_health():
+    for line in health_report():
+        print(f"[Radiance] ---> LLM provider {line}")
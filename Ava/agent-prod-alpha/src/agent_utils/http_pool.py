@@ -0,0 +1,127 @@
+"""
+Per-process pool of keep-alive HTTP clients for blueprint HTTP tools.
+
+One httpx.AsyncClient is kept per tool server origin so tool calls made during
+a voice turn reuse warm TCP/TLS connections instead of reconnecting each time.
+"""
+
+import importlib.util
+import os
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP_TOOL_TIMEOUT = float(os.getenv('HTTP_TOOL_TIMEOUT', '15.0'))
+HTTP_TOOL_MAX_CONNECTIONS = int(os.getenv('HTTP_TOOL_MAX_CONNECTIONS', '10'))
+HTTP_TOOL_MAX_KEEPALIVE = int(os.getenv('HTTP_TOOL_MAX_KEEPALIVE', '5'))
+HTTP_TOOL_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_TOOL_KEEPALIVE_EXPIRY', '60.0'))
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP_TOOL_HTTP2 = os.getenv('HTTP_TOOL_HTTP2', 'false').lower() in ('1', 'true', 'yes')
+
+
+@dataclass
+class OriginStats:
+    requests: int = 0
+    new_connections: int = 0
+    connect_seconds: float = 0.0
+
+    @property
+    def reused_connections(self) -> int:
+        return self.requests - self.new_connections
+
+    @property
+    def avg_connect_seconds(self) -> float:
+        return self.connect_seconds / self.new_connections if self.new_connections else 0.0
+
+    @property
+    def saved_seconds(self) -> float:
+        # Every reused connection skipped roughly one average DNS/TCP/TLS setup
+        return self.reused_connections * self.avg_connect_seconds
+
+
+def origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class HttpClientPool:
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self.stats: dict[str, OriginStats] = {}
+        self.http2 = HTTP_TOOL_HTTP2 and importlib.util.find_spec('h2') is not None
+        if HTTP_TOOL_HTTP2 and not self.http2:
+            print("[Radiance] ---> HTTP_TOOL_HTTP2 is set but `h2` is not installed, using HTTP/1.1")
+
+    def _client(self, origin: str) -> httpx.AsyncClient:
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=HTTP_TOOL_TIMEOUT,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=HTTP_TOOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_TOOL_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_TOOL_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._clients[origin] = client
+        return client
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        origin = origin_of(url)
+        stats = self.stats.setdefault(origin, OriginStats())
+        connect_started = None
+
+        async def trace(event_name: str, info: dict):
+            # httpcore only emits connect events when it opens a new connection
+            nonlocal connect_started
+            if event_name == 'connection.connect_tcp.started':
+                connect_started = time.perf_counter()
+                stats.new_connections += 1
+            elif event_name in ('connection.connect_tcp.complete', 'connection.start_tls.complete') \
+                    and connect_started is not None:
+                stats.connect_seconds += time.perf_counter() - connect_started
+                connect_started = time.perf_counter()
+
+        stats.requests += 1
+        extensions = {**kwargs.pop('extensions', {}), 'trace': trace}
+        return await self._client(origin).post(url, extensions=extensions, **kwargs)
+
+    def report(self) -> str:
+        lines = []
+        for origin, stats in self.stats.items():
+            lines.append(
+                f"{origin}: {stats.requests} requests, {stats.reused_connections} reused, "
+                f"{stats.new_connections} new, ~{stats.saved_seconds * 1000:.0f}ms setup saved "
+                f"(~{stats.saved_seconds * 1000 / stats.requests:.0f}ms per call)"
+            )
+        return "\n".join(lines)
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+_pool = None
+
+
+def get_http_pool() -> HttpClientPool:
+    global _pool
+    if _pool is None:
+        _pool = HttpClientPool()
+    return _pool
+
+
+async def close_http_pool():
+    """Job shutdown callback, closes pooled connections and logs reuse stats"""
+    if _pool is None:
+        return
+    report = _pool.report()
+    if report:
+        print(f"[Radiance] ---> HTTP tool pool stats\n{report}")
+    await _pool.aclose()
@@ -0,0 +1,53 @@
+"""
+Append-only JSONL files with size based rotation.
+
+Every job process of a worker appends to the same files, so the size check,
+the rotation and the append run under an exclusive lock on `<path>.lock`.
+A file that would grow past `max_bytes` is renamed to `<path>.1` (older
+backups move up to `<path>.<backups>`, the oldest one is dropped) and a new
+file is started. Call append_jsonl() from a worker thread, it blocks.
+"""
+
+import json
+import os
+from collections.abc import Iterable
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows, rotation is then only safe with a single process
+    fcntl = None
+
+JSONL_MAX_BYTES = int(os.getenv('JSONL_MAX_BYTES', str(50 * 1024 * 1024)))
+JSONL_BACKUPS = int(os.getenv('JSONL_BACKUPS', '3'))
+
+
+def rotate(path: str, backups: int = JSONL_BACKUPS):
+    """Shift `path` into the numbered backups, dropping the oldest"""
+    if backups <= 0:
+        os.remove(path)
+        return
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def append_jsonl(path: str, records: Iterable[dict[str, Any]], max_bytes: int = JSONL_MAX_BYTES,
+                 backups: int = JSONL_BACKUPS):
+    """Append one JSON line per record, rotating first if the file would exceed `max_bytes`"""
+    data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+    if not data:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if max_bytes > 0 and size and size + len(data) > max_bytes:
+            rotate(path, backups)
+        with open(path, 'ab') as f:
+            f.write(data)
@@ -0,0 +1,74 @@
+"""
+One-off MongoDB data migrations.
+
+    python -m agent_utils.migrations normalize-patient-ids [--dry-run]
+
+normalize-patient-ids rewrites numeric `patient_id` values as strings in
+patient_data and appointments, so patient lookups only need a single indexed
+equality match (set PATIENT_IDS_NORMALIZED=true once it has run). Doubles are
+only converted when they hold an exact integer; the others (e.g. 1234.5, NaN)
+are listed and left untouched, to be fixed by hand.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+NORMALIZED_COLLECTIONS = ['patient_data', 'appointments']
+# Non-integral ids listed per collection
+REPORTED_IDS = 20
+
+# ints and longs, and doubles holding an exact integer (NaN sorts below 0)
+INTEGRAL_PATIENT_ID = {"$or": [
+    {"$in": [{"$type": "$patient_id"}, ["int", "long"]]},
+    {"$and": [
+        {"$eq": ["$patient_id", {"$trunc": "$patient_id"}]},
+        {"$gte": [{"$abs": "$patient_id"}, 0]},
+        {"$lte": [{"$abs": "$patient_id"}, 2 ** 53]},
+    ]},
+]}
+
+
+async def normalize_patient_ids(db, dry_run: bool = False):
+    numeric = {"patient_id": {"$type": "number"}}
+    integral = {**numeric, "$expr": INTEGRAL_PATIENT_ID}
+    other = {**numeric, "$expr": {"$not": [INTEGRAL_PATIENT_ID]}}
+    for collection_name in NORMALIZED_COLLECTIONS:
+        collection = db[collection_name]
+        skipped = await collection.find(other, {"patient_id": 1}).to_list(REPORTED_IDS)
+        if skipped:
+            total = await collection.count_documents(other)
+            print(f"[Radiance] ---> {collection_name}: {total} non-integral patient_id values left as they are")
+            for doc in skipped:
+                print(f"[Radiance] --->   _id {doc['_id']}: patient_id {doc['patient_id']!r}")
+
+        count = await collection.count_documents(integral)
+        if dry_run or not count:
+            print(f"[Radiance] ---> {collection_name}: {count} numeric patient_id values")
+            continue
+        result = await collection.update_many(
+            integral,
+            # $toLong drops the trailing .0 of integral doubles before converting to a string
+            [{"$set": {"patient_id": {"$toString": {"$toLong": "$patient_id"}}}}],
+        )
+        print(f"[Radiance] ---> {collection_name}: normalized {result.modified_count} patient_id values")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('migration', choices=['normalize-patient-ids'])
+    parser.add_argument('--dry-run', action='store_true', help="Only count the documents to migrate")
+    args = parser.parse_args(argv)
+
+    from agent_utils.mongodb import get_mongodb_connection
+
+    db = await get_mongodb_connection()
+    if args.migration == 'normalize-patient-ids':
+        await normalize_patient_ids(db, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    sys.exit(asyncio.run(main()))
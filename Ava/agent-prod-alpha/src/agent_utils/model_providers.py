@@ -1,49 +1,151 @@
 """
-Centralized imports and mappings for all LiveKit providers
-Static imports required by LiveKit framework (must be on main thread)
+Registry of provider names and the LiveKit plugin modules that implement them.
+
+Plugins are imported on first use instead of all at once. LiveKit plugins must
+be registered on the main thread, so the plugins the configured blueprints use
+(and the ones listed in PRELOAD_PROVIDERS) are preloaded at boot with
+ProviderMappings.preload(), which also reports the import time and RSS growth
+of each plugin. A plugin that was not preloaded can't be imported later from
+a job thread: inline blueprints using such a provider fall back to the default
+blueprint (see BlueprintRegistry.resolve), direct use fails with a clear error.
 """
 
-# Import all available LiveKit providers at once
-from livekit.plugins import (
-    upliftai,
-     openai, 
-    # cartesia, 
-    deepgram, 
-    groq,
-    elevenlabs
-)
+import os
+import time
+import importlib
+import threading
+from typing import Any, ClassVar, Optional
+from collections.abc import Iterable, Mapping
+
+# Sections of a blueprint that name a provider
+PROVIDER_SECTIONS = ['model', 'voice', 'transcriber']
+# Providers imported at boot besides the ones the blueprints use, comma
+# separated names or "all" (e.g. for inline blueprints sent in job metadata)
+PRELOAD_PROVIDERS = os.getenv('PRELOAD_PROVIDERS', '')
+
+
+def rss_mb() -> float:
+    """Current resident set size of the process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak instead of current RSS where /proc is not available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
 
 class ProviderMappings:
     """Centralized mapping of provider names to their corresponding plugin modules"""
 
+    _modules: ClassVar[dict[str, str]] = {
+        'openai': 'livekit.plugins.openai',
+        'groq': 'livekit.plugins.groq',
+        'cartesia': 'livekit.plugins.cartesia',
+        'deepgram': 'livekit.plugins.deepgram',
+        'elevenlabs': 'livekit.plugins.elevenlabs',
+        'upliftai': 'livekit.plugins.upliftai',
+    }
+    _loaded: ClassVar[dict[str, Any]] = {}
+    # module path -> (import seconds, RSS growth in MB)
+    import_report: ClassVar[dict[str, tuple]] = {}
+
+    @classmethod
+    def register(cls, provider_name: str, module_path: str):
+        """Map a provider name to a module exposing LLM/TTS/STT classes"""
+        cls._modules[provider_name.lower()] = module_path
+
+    @classmethod
+    def providers(cls) -> list[str]:
+        return list(cls._modules)
+
+    @classmethod
+    def module_path(cls, provider_name: str) -> Optional[str]:
+        name = provider_name.lower()
+        # Special OpenAI providers, e.g. with_groq_openai
+        if name.startswith('with_') and name.endswith('_openai'):
+            name = 'openai'
+        return cls._modules.get(name)
+
+    @classmethod
+    def _import(cls, module_path: str):
+        module = cls._loaded.get(module_path)
+        if module is None:
+            if threading.current_thread() is not threading.main_thread():
+                raise RuntimeError(
+                    f"Provider plugin {module_path} was not preloaded at boot, plugins can only be "
+                    f"imported on the main thread. Use the provider in a blueprint of BLUEPRINTS_DIR "
+                    f"or add it to PRELOAD_PROVIDERS.")
+            rss_before = rss_mb()
+            started = time.perf_counter()
+            module = importlib.import_module(module_path)
+            cls.import_report[module_path] = (time.perf_counter() - started, rss_mb() - rss_before)
+            cls._loaded[module_path] = module
+        return module
+
+    @classmethod
+    def importable(cls, provider_name: str) -> bool:
+        """Whether the provider's plugin is loaded or can still be imported from this thread"""
+        module_path = cls.module_path(provider_name)
+        # Unknown providers are reported by whoever builds the instance
+        return (module_path is None or module_path in cls._loaded
+                or threading.current_thread() is threading.main_thread())
+
     @classmethod
     def get_provider(cls, provider_name: str):
-        """Get provider module by name"""
-        # Mapping for currently imported providers
-        provider_map = {
-            # Currently imported providers
-            'openai': openai,
-            'groq': groq,
-            # 'cartesia': cartesia,
-            'deepgram': deepgram,
-            'elevenlabs': elevenlabs,
-            'upliftai': upliftai,
-            # Special OpenAI providers
-            'with_cerebras_openai': openai,
-            'with_deepseek_openai': openai,
-            'with_fireworks_openai': openai,
-            'with_letta_openai': openai,
-            'with_ollama_openai': openai,
-            'with_azure_openai': openai,
-            'with_perplexity_openai': openai,
-            'with_telnyx_openai': openai,
-            'with_together_openai': openai,
-            'with_x_ai_openai': openai,
-        }
-        return provider_map.get(provider_name.lower())
+        """Get provider module by name, importing it on first use"""
+        module_path = cls.module_path(provider_name)
+        if module_path is None:
+            return None
+        return cls._import(module_path)
 
     @classmethod
     def get_openai_provider(cls):
         """Get OpenAI provider for special method calls"""
-        return openai
\ No newline at end of file
+        return cls.get_provider('openai')
+
+    @classmethod
+    def preload(cls, provider_names: Iterable[str]):
+        """Import the given providers' plugins now, must run on the main thread"""
+        for name in dict.fromkeys(n.lower() for n in provider_names):
+            module_path = cls.module_path(name)
+            if module_path is None:
+                print("[Radiance] ---> Unknown provider in blueprint", name)
+                continue
+            if module_path in cls._loaded:
+                continue
+            try:
+                cls._import(module_path)
+            except ImportError as e:
+                print("[Radiance] ---> Failed to import provider plugin", module_path, e)
+                continue
+            seconds, rss = cls.import_report[module_path]
+            print(f"[Radiance] ---> Imported {module_path} in {seconds * 1000:.0f}ms, RSS +{rss:.1f}MB")
+
+
+def provider_label(config: Mapping[str, Any]) -> str:
+    """Provider and model (or voice) of a provider config, e.g. openai/gpt-4o-mini"""
+    return f"{config['provider'].lower()}/{config.get('model') or config.get('voice_id') or ''}"
+
+
+def boot_providers(blueprints: Iterable[Mapping[str, Any]]) -> list[str]:
+    """Providers to preload at boot: the blueprints' ones and PRELOAD_PROVIDERS"""
+    names = referenced_providers(blueprints)
+    if PRELOAD_PROVIDERS.strip().lower() == 'all':
+        names += ProviderMappings.providers()
+    else:
+        names += [name.strip() for name in PRELOAD_PROVIDERS.split(',') if name.strip()]
+    return list(dict.fromkeys(names))
+
+
+def referenced_providers(blueprints: Iterable[Mapping[str, Any]]) -> list[str]:
+    """Provider names used by the blueprints' model, voice and transcriber, fallbacks and candidates included"""
+    names = []
+    for metadata in blueprints:
+        for section in PROVIDER_SECTIONS:
+            config = metadata.get(section) or {}
+            for provider in [config, *list(config.get('fallbacks') or []), *list(config.get('candidates') or [])]:
+                if provider.get('provider'):
+                    names.append(provider['provider'])
+    return list(dict.fromkeys(names))
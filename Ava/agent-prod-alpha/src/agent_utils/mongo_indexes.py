@@ -0,0 +1,68 @@
+"""
+Indexes the function tools rely on, created and verified once per process.
+"""
+
+import os
+
+PATIENT_PHONE_FIELD = os.getenv('PATIENT_PHONE_FIELD', 'phone_number')
+
+# collection -> [(index name, keys, index options)]
+REQUIRED_INDEXES: dict[str, list[tuple[str, list, dict]]] = {
+    'patient_data': [
+        ('patient_id_1', [('patient_id', 1)], {}),
+        # Caller ID prefetch
+        (f'{PATIENT_PHONE_FIELD}_1', [(PATIENT_PHONE_FIELD, 1)], {}),
+    ],
+    'appointments': [
+        # Also serves plain patient_id lookups through its prefix
+        ('patient_id_1_appointment_date_1', [('patient_id', 1), ('appointment_date', 1)], {}),
+        # Slot index loads
+        ('status_1_appointment_date_1', [('status', 1), ('appointment_date', 1)], {}),
+        # Collapses duplicated bookings, older documents have no key
+        ('idempotency_key_1', [('idempotency_key', 1)], {
+            'unique': True,
+            'partialFilterExpression': {'idempotency_key': {'$exists': True}},
+        }),
+    ],
+}
+
+
+def _missing_indexes(collection_name: str, indexes, existing: dict) -> list[str]:
+    return [
+        f"{collection_name}.{name}" for name, keys, _ in indexes
+        if not any(info.get('key') == keys for info in existing.values())
+    ]
+
+
+def _report(missing: list[str]) -> list[str]:
+    if missing:
+        print(f"[Radiance][Error] ---> Missing MongoDB indexes: {', '.join(missing)}")
+    return missing
+
+
+async def ensure_indexes(db):
+    """Create missing indexes and verify they exist, returns the missing ones"""
+    missing = []
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        for name, keys, options in indexes:
+            try:
+                await collection.create_index(keys, name=name, **options)
+            except Exception as e:
+                print(f"[Radiance] ---> Failed to create index {collection_name}.{name}", e)
+        missing += _missing_indexes(collection_name, indexes, await collection.index_information())
+    return _report(missing)
+
+
+def ensure_indexes_sync(db):
+    """ensure_indexes for a plain pymongo database"""
+    missing = []
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        for name, keys, options in indexes:
+            try:
+                collection.create_index(keys, name=name, **options)
+            except Exception as e:
+                print(f"[Radiance] ---> Failed to create index {collection_name}.{name}", e)
+        missing += _missing_indexes(collection_name, indexes, collection.index_information())
+    return _report(missing)
@@ -0,0 +1,186 @@
+"""
+Shared MongoDB client for the function tools.
+
+The client is created and pinged in `prewarm` so the first patient lookup of a
+job process does not pay SRV resolution, TLS setup and a ping mid-call. Pool
+settings come from the environment and connection checkout waits are recorded.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from agent_utils.mongo_indexes import ensure_indexes, ensure_indexes_sync
+from agent_utils.slot_index import get_slot_index
+
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '20'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '2'))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '300000'))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', '5000'))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+
+client = None
+database = None
+
+
+class PoolCheckoutStats(monitoring.ConnectionPoolListener):
+    """Records how long operations wait to check a connection out of the pool.
+
+    pymongo calls the listener from the threads Motor runs operations on, so the
+    start time is kept per thread and the counters are guarded by a lock.
+    """
+
+    def __init__(self, samples: int = 512):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._waits = deque(maxlen=samples)
+        self.checkouts = 0
+        self.failures = 0
+        self.connections_created = 0
+
+    def _record(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self._waits.append(wait)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        # pymongo >= 4.7 reports the duration itself
+        wait = getattr(event, 'duration', None)
+        if wait is None and started is not None:
+            wait = time.perf_counter() - started
+        if wait is not None:
+            self._record(wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.failures += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def report(self) -> str:
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts, failures, created = self.checkouts, self.failures, self.connections_created
+        if not waits:
+            return f"{checkouts} checkouts, {failures} failed, {created} connections created"
+        p50 = waits[len(waits) // 2]
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        return (
+            f"{checkouts} checkouts, {failures} failed, {created} connections created, "
+            f"wait p50 {p50 * 1000:.2f}ms p95 {p95 * 1000:.2f}ms max {waits[-1] * 1000:.2f}ms"
+        )
+
+
+pool_stats = PoolCheckoutStats()
+
+
+def create_mongodb_client():
+    """Create the global client without connecting, returns the database"""
+    global client, database
+
+    # Get connection string from environment variable
+    connection_string = os.getenv('MONGODB_CONNECTION_STRING')
+    database_name = os.getenv('MONGODB_DATABASE_NAME', 'medical_db')
+
+    if not connection_string:
+        raise ValueError("Missing MONGODB_CONNECTION_STRING environment variable")
+
+    # Add database name to connection string if not already included
+    if f"/{database_name}" not in connection_string:
+        connection_string = connection_string.rstrip('/') + f"/{database_name}?retryWrites=true&w=majority"
+
+    client = AsyncIOMotorClient(
+        connection_string,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[pool_stats],
+    )
+    database = client[database_name]
+    return database
+
+
+def prewarm_mongodb():
+    """Connect, ping and check indexes synchronously, for use in prewarm.
+
+    prewarm runs before the job event loop exists, so this goes through the
+    underlying pymongo client. The pooled connections are shared with Motor.
+    """
+    started = time.perf_counter()
+    try:
+        db = create_mongodb_client()
+        client.delegate.admin.command('ping')
+        ensure_indexes_sync(db.delegate)
+        # Booked slots for conflict checks, kept current by the job's refresher
+        get_slot_index().load_sync(db.delegate)
+    except Exception as e:
+        # The tools retry lazily on their first call
+        print("[Radiance] ---> MongoDB prewarm failed", e)
+        reset_mongodb_client()
+        return
+    print(f"[Radiance] ---> MongoDB prewarmed in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def reset_mongodb_client():
+    global client, database
+    if client is not None:
+        client.close()
+    client = None
+    database = None
+
+
+async def get_mongodb_connection():
+    """Get MongoDB connection"""
+    if client is None:
+        db = create_mongodb_client()
+        try:
+            # Test connection
+            await client.admin.command('ping')
+            # Make sure lookups are indexed point reads
+            await ensure_indexes(db)
+        except Exception:
+            reset_mongodb_client()
+            raise
+
+    return database
+
+
+async def log_pool_stats():
+    """Job shutdown callback"""
+    if client is not None:
+        print(f"[Radiance] ---> MongoDB pool stats: {pool_stats.report()}")
@@ -0,0 +1,49 @@
+import asyncio
+import contextlib
+import os
+import time
+from typing import Any, Optional
+
+PATIENT_CACHE_TTL = float(os.getenv('PATIENT_CACHE_TTL', '900'))
+
+
+class PatientCache:
+    """Per-session TTL cache of patient records, consulted before the database.
+
+    A background prefetch (e.g. from the caller's phone number) registers its
+    task so a lookup arriving while it is still running waits for it instead of
+    issuing a second query.
+    """
+
+    def __init__(self, ttl: float = PATIENT_CACHE_TTL):
+        self.ttl = ttl
+        self._patients: dict[str, tuple[float, dict[str, Any]]] = {}
+        self.prefetch_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, patient: dict[str, Any]):
+        self._patients[str(patient.get('patient_id'))] = (time.monotonic() + self.ttl, patient)
+
+    def get(self, patient_id: str) -> Optional[dict[str, Any]]:
+        entry = self._patients.get(str(patient_id).strip())
+        if entry is None:
+            return None
+        expires_at, patient = entry
+        if time.monotonic() > expires_at:
+            del self._patients[str(patient_id).strip()]
+            return None
+        return patient
+
+    async def lookup(self, patient_id: str, timeout: float = 1.0) -> Optional[dict[str, Any]]:
+        """Cached record for patient_id, waiting briefly for a running prefetch"""
+        patient = self.get(patient_id)
+        if patient is None and self.prefetch_task is not None and not self.prefetch_task.done():
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(asyncio.shield(self.prefetch_task), timeout)
+            patient = self.get(patient_id)
+        if patient is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return patient
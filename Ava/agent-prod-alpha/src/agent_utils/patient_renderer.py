@@ -0,0 +1,181 @@
+"""
+Compact, speech-friendly rendering of patient records for the LLM context.
+
+The tool output stays in the chat context for the rest of the call, so it is
+rendered as plain sentences within a token budget: identity first, then the
+most recent prescriptions, special instructions, the test report (cut at a
+sentence boundary) and lifestyle advice, in that order of priority.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Optional
+
+PATIENT_RENDER_TOKEN_BUDGET = int(os.getenv('PATIENT_RENDER_TOKEN_BUDGET', '300'))
+PATIENT_RENDER_CACHE_SIZE = int(os.getenv('PATIENT_RENDER_CACHE_SIZE', '256'))
+
+_encoding = None
+if importlib.util.find_spec('tiktoken') is not None:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding('o200k_base')
+
+
+def estimate_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # Roughly 4 UTF-8 bytes per token, which also holds up for Urdu text
+    return max(1, len(text.encode('utf-8')) // 4)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of whole sentences within the budget, or a hard cut of the text"""
+    text = ' '.join(text.split())
+    if estimate_tokens(text) <= budget:
+        return text
+    suffix = ' (shortened)'
+    budget -= estimate_tokens(suffix)
+    kept, used = [], 0
+    for sentence in re.split(r'(?<=[.!?۔])\s+', text):  # noqa: RUF001
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    if not kept and budget > 0:
+        # Not even the first sentence fits: longest prefix within the budget,
+        # at a word boundary when there is one (a long unbroken token is cut as is)
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(text[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        clipped = text[:low]
+        if ' ' in clipped and low < len(text) and text[low] != ' ':
+            clipped = clipped.rsplit(' ', 1)[0]
+        kept = [clipped.rstrip()] if clipped.strip() else []
+    return f"{' '.join(kept)}{suffix}" if kept else ''
+
+
+def _prescriptions(patient: Mapping[str, Any]) -> list[Mapping[str, Any]]:
+    """Prescriptions newest first, the field may hold one prescription or a list"""
+    prescriptions = patient.get('doctors_prescription') or []
+    if isinstance(prescriptions, Mapping):
+        prescriptions = [prescriptions]
+    dated = [p for p in prescriptions if isinstance(p, Mapping)]
+    return sorted(dated, key=lambda p: str(p.get('date') or p.get('prescribed_on') or ''), reverse=True)
+
+
+def _medication_sentence(med: Mapping[str, Any]) -> str:
+    parts = [str(med.get('medicine_name', 'Unknown medicine'))]
+    if med.get('dosage'):
+        parts.append(str(med['dosage']))
+    if med.get('frequency'):
+        parts.append(str(med['frequency']))
+    if med.get('duration'):
+        parts.append(f"for {med['duration']}")
+    return ', '.join(parts) + '.'
+
+
+def render_patient_for_voice(patient: Mapping[str, Any], budget: int = PATIENT_RENDER_TOKEN_BUDGET) -> str:
+    lines = [
+        f"Patient {patient.get('full_name', 'Unknown')}, ID {patient.get('patient_id')}, "
+        f"born {patient.get('date_of_birth', 'unknown')}."
+    ]
+    remaining = budget - estimate_tokens(lines[0])
+
+    def add(label: str, text: str):
+        nonlocal remaining
+        if not text or remaining <= 8:
+            return
+        line = truncate_to_tokens(f"{label}: {text}", remaining)
+        if line:
+            lines.append(line)
+            remaining -= estimate_tokens(line) + 1
+
+    prescriptions = _prescriptions(patient)
+    latest, older = prescriptions[:1], prescriptions[1:]
+    # Only the newest prescription is current, older medicines may have been stopped
+    add("Current medicines", ' '.join(_medication_sentence(m) for p in latest for m in (p.get('medications') or [])))
+    if latest:
+        add("Special instructions", str(latest[0].get('special_instructions') or ''))
+    add("Latest test report", str(patient.get('test_report') or ''))
+    if latest:
+        add("Lifestyle advice", str(latest[0].get('lifestyle_recommendations') or ''))
+    add("Previous medicines", ' '.join(_medication_sentence(m) for p in older for m in (p.get('medications') or [])))
+    return '\n'.join(lines)
+
+
+def render_patient_markdown(patient: Mapping[str, Any]) -> str:
+    """The previous full Markdown rendering, kept as the baseline for token savings"""
+    response = f"**Patient Information for {patient.get('full_name', 'Unknown')}:**\n"
+    response += f"Patient ID: {patient.get('patient_id')}\n"
+    response += f"Date of Birth: {patient.get('date_of_birth', 'N/A')}\n"
+    if patient.get('test_report'):
+        response += f"\n**Latest Test Report:**\n{patient.get('test_report')}\n"
+    for prescription in _prescriptions(patient):
+        response += "\n**Current Prescriptions:**\n"
+        for i, med in enumerate(prescription.get('medications') or [], 1):
+            response += f"{i}. **{med.get('medicine_name', 'Unknown')}**\n"
+            response += f"   - Dosage: {med.get('dosage', 'N/A')}\n"
+            response += f"   - Frequency: {med.get('frequency', 'N/A')}\n"
+            response += f"   - Duration: {med.get('duration', 'N/A')}\n\n"
+        if prescription.get('special_instructions'):
+            response += f"**Special Instructions:**\n{prescription.get('special_instructions')}\n"
+        if prescription.get('lifestyle_recommendations'):
+            response += f"\n**Lifestyle Recommendations:**\n{prescription.get('lifestyle_recommendations')}\n"
+    return response
+
+
+@dataclass
+class RenderStats:
+    rendered: int = 0
+    baseline_tokens: int = 0
+    compact_tokens: int = 0
+
+    def report(self) -> str:
+        saved = self.baseline_tokens - self.compact_tokens
+        percent = 100 * saved / self.baseline_tokens if self.baseline_tokens else 0
+        return (f"{self.rendered} patient records, {self.baseline_tokens} -> {self.compact_tokens} "
+                f"tokens ({saved} saved, {percent:.0f}%) per request that carries them")
+
+
+# (document version, budget) -> (rendered text, baseline tokens, compact tokens)
+_render_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def document_version(patient: Mapping[str, Any]) -> str:
+    if patient.get('updated_at'):
+        return f"{patient.get('patient_id')}@{patient['updated_at']}"
+    encoded = json.dumps(patient, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def render_patient(patient: Mapping[str, Any], stats: Optional[RenderStats] = None,
+                   budget: int = PATIENT_RENDER_TOKEN_BUDGET) -> str:
+    """Memoized render_patient_for_voice, records the saving against the Markdown baseline"""
+    key = (document_version(patient), budget)
+    cached = _render_cache.get(key)
+    if cached is None:
+        text = render_patient_for_voice(patient, budget)
+        cached = (text, estimate_tokens(render_patient_markdown(patient)), estimate_tokens(text))
+        _render_cache[key] = cached
+        while len(_render_cache) > PATIENT_RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    else:
+        _render_cache.move_to_end(key)
+
+    text, baseline_tokens, compact_tokens = cached
+    if stats is not None:
+        stats.rendered += 1
+        stats.baseline_tokens += baseline_tokens
+        stats.compact_tokens += compact_tokens
+    return text
@@ -0,0 +1,13 @@
+"""
+Nearest-rank percentiles shared by the trace report and the benchmarks.
+"""
+
+from typing import Optional
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    """The q-quantile (0..1) of `values`, None when there are none"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
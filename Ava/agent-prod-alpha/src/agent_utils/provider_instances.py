@@ -1,17 +1,32 @@
-from typing import Dict, Any
-from agent_utils.model_providers import ProviderMappings
+import os
+import json
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Optional
+from livekit.agents import stt, tts
+from agent_utils.background_tasks import spawn
+from agent_utils.model_providers import ProviderMappings, provider_label
+from agent_utils.blueprint_registry import thaw
+from agent_utils.hedged_llm import HedgedLLM
+from agent_utils.provider_router import get_provider_router
+from agent_utils.stt_availability import track_stt_fallback
+from agent_utils.provider_timings import PROVIDER_TIMINGS, STANDIN_PROVIDER, get_timing_recorder
 
+# Blueprint keys that configure the provider chain, not the plugin itself
+CHAIN_KEYS = ['fallbacks', 'candidates']
 
-def extract_provider_instance(config: Dict[str, Any], provider_type: str):
+
+def extract_provider_instance(config: dict[str, Any], provider_type: str):
     provider_name = config['provider'].lower()
-    
+
     if provider_type == 'llm':
         params = {'model': config['model']}
         for key, value in config.items():
-            if key not in ['provider', 'model'] and value is not None:
+            if key not in ['provider', 'model', *CHAIN_KEYS] and value is not None:
                 params[key] = value
     else:
-        params = {key: value for key, value in config.items() if key != 'provider'}
+        params = {key: value for key, value in config.items() if key not in ['provider', *CHAIN_KEYS]}
 
     if 'with_' in provider_name and '_openai' in provider_name:
         dynamic_method = provider_name.replace('with_', '').replace('_openai', '')
@@ -24,13 +39,146 @@ def extract_provider_instance(config: Dict[str, Any], provider_type: str):
         return getattr(provider, provider_type.upper())(**params)
 
 
-def create_provider_instances(metadata: Dict[str, Any]) -> Dict[str, Any]:
-    llm_config = {k: v for k, v in metadata['model'].items() if k not in ['messages', 'toolIds']}
-    tts_config = metadata['voice']
-    stt_config = metadata['transcriber']
-    
+def chain_configs(config: dict[str, Any]) -> list[dict[str, Any]]:
+    """The config followed by its `fallbacks`, in failover order"""
+    return [config, *list(config.get('fallbacks') or [])]
+
+
+def extract_provider_chain(config: dict[str, Any], provider_type: str):
+    """Provider instance for the config, wrapped with its `fallbacks` if it declares any.
+
+    LLM chains are hedged (see HedgedLLM); TTS and STT chains fail over in order
+    with the LiveKit FallbackAdapter. Transcriber fallbacks must be streaming STTs.
+    """
+    configs = chain_configs(config)
+    instances = [extract_provider_instance(c, provider_type) for c in configs]
+    for c, instance in zip(configs, instances):
+        get_provider_router().attach(provider_type, provider_label(c), instance)
+        if PROVIDER_TIMINGS and c['provider'].lower() != STANDIN_PROVIDER:
+            get_timing_recorder().attach(provider_type, provider_label(c), instance)
+    if len(instances) == 1:
+        return instances[0]
+    if provider_type == 'llm':
+        return HedgedLLM([(provider_label(c), instance) for c, instance in zip(configs, instances)])
+    if provider_type == 'tts':
+        return tts.FallbackAdapter(instances)
+    adapter = stt.FallbackAdapter(instances)
+    track_stt_fallback(adapter, [(provider_label(c), instance) for c, instance in zip(configs, instances)])
+    return adapter
+
+
+def normalize_provider_config(metadata: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Return the llm/tts/stt configs that actually shape the plugin instances"""
+    llm_config = {k: thaw(v) for k, v in metadata['model'].items() if k not in ['messages', 'toolIds']}
+    tts_config = thaw(metadata['voice'])
+    stt_config = thaw(metadata['transcriber'])
+
+    return {'llm': llm_config, 'tts': tts_config, 'stt': stt_config}
+
+
+def provider_fingerprint(metadata: dict[str, Any]) -> str:
+    """Stable hash of the provider configs, ignoring prompts, tools and key order"""
+    config = normalize_provider_config(metadata)
+    for section in config.values():
+        for provider in [section, *list(section.get('fallbacks') or [])]:
+            provider['provider'] = provider['provider'].lower()
+    encoded = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def create_provider_instances(metadata: dict[str, Any]) -> dict[str, Any]:
+    config = normalize_provider_config(metadata)
+
     return {
-        'llm': extract_provider_instance(llm_config, 'llm'),
-        'tts': extract_provider_instance(tts_config, 'tts'),
-        'stt': extract_provider_instance(stt_config, 'stt')
-    }
\ No newline at end of file
+        'llm': extract_provider_chain(config['llm'], 'llm'),
+        'tts': extract_provider_chain(config['tts'], 'tts'),
+        'stt': extract_provider_chain(config['stt'], 'stt')
+    }
+
+
+async def close_provider_instances(instances: dict[str, Any]):
+    for instance in instances.values():
+        aclose = getattr(instance, 'aclose', None)
+        if aclose is None:
+            continue
+        try:
+            await aclose()
+        except Exception as e:
+            print("[Radiance] ---> Error closing provider instance", e)
+
+
+class ProviderInstanceCache:
+    """Process-level LRU cache of warm provider instances keyed by provider fingerprint.
+
+    Jobs running in the same JobProcess reuse the STT/LLM/TTS objects (and the
+    HTTP/WebSocket clients they hold) instead of building cold ones per call.
+    Entries evicted while a job still holds them are closed once released.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max(1, max_size or int(os.getenv('PROVIDER_CACHE_SIZE', '4')))
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._leases: dict[str, int] = {}
+        # A key re-acquired after eviction can have several retired entries still leased
+        self._evicted: dict[str, list[dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, metadata: dict[str, Any]) -> dict[str, Any]:
+        """Return cached instances for the metadata, building them on a miss"""
+        return self._get_or_create(provider_fingerprint(metadata), metadata)
+
+    def _get_or_create(self, key: str, metadata: dict[str, Any]) -> dict[str, Any]:
+        instances = self._entries.get(key)
+        if instances is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return instances
+
+        self.misses += 1
+        instances = create_provider_instances(metadata)
+        self._entries[key] = instances
+        while len(self._entries) > self.max_size:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._retire(evicted_key, evicted)
+        return instances
+
+    def acquire(self, metadata: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        """Like get_or_create, but pins the entry until release() is called"""
+        key = provider_fingerprint(metadata)
+        instances = self._get_or_create(key, metadata)
+        self._leases[key] = self._leases.get(key, 0) + 1
+        return key, instances
+
+    def release(self, key: str):
+        remaining = self._leases.get(key, 0) - 1
+        if remaining > 0:
+            self._leases[key] = remaining
+            return
+        self._leases.pop(key, None)
+        for evicted in self._evicted.pop(key, []):
+            self._schedule_close(evicted)
+
+    def _retire(self, key: str, instances: dict[str, Any]):
+        if self._leases.get(key):
+            # Still used by a running session, close it when the lease is released
+            self._evicted.setdefault(key, []).append(instances)
+        else:
+            self._schedule_close(instances)
+
+    @staticmethod
+    def _schedule_close(instances: dict[str, Any]):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop yet (e.g. during prewarm), nothing has opened a connection
+            return
+        spawn(close_provider_instances(instances))
+
+    async def aclose(self):
+        entries = list(self._entries.values()) + [e for evicted in self._evicted.values() for e in evicted]
+        self._entries.clear()
+        self._evicted.clear()
+        self._leases.clear()
+        for instances in entries:
+            await close_provider_instances(instances)
@@ -0,0 +1,299 @@
+"""
+Latency-aware choice between equivalent providers.
+
+A blueprint section (model, voice or transcriber) may list `candidates`,
+provider configs it considers interchangeable with its own. Every provider
+instance reports its metrics_collected and error events here: LLM TTFT, TTS
+TTFB and non-streamed STT latency go into exponentially decayed histograms
+per provider and model (streamed STT is measured by the sessions' EOU
+transcription delay, credited to the STT serving the session), together with a decayed error count. When a session
+starts, each section is routed to the candidate with the lowest decayed
+ROUTER_PERCENTILE latency, penalized by its error rate; candidates with too
+few samples are explored now and then.
+
+Jobs run in their own processes, so the histograms are merged into a small
+SQLite store at shutdown and read back when routing. Every decision is
+appended to a JSONL log for later analysis, rotated at JSONL_MAX_BYTES.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from agent_utils.background_tasks import spawn
+from agent_utils.hedged_llm import provider_health
+from agent_utils.jsonl_log import append_jsonl
+from agent_utils.model_providers import provider_label
+from agent_utils.stt_availability import serving_stt
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+ROUTER_STATE_PATH = os.getenv('ROUTER_STATE_PATH', os.path.join(_DATA_DIR, 'provider_router.sqlite3'))
+ROUTER_DECISION_LOG = os.getenv('ROUTER_DECISION_LOG', os.path.join(_DATA_DIR, 'routing_decisions.jsonl'))
+ROUTER_HALF_LIFE = float(os.getenv('ROUTER_HALF_LIFE', '900'))
+ROUTER_PERCENTILE = float(os.getenv('ROUTER_PERCENTILE', '0.9'))
+ROUTER_MIN_SAMPLES = float(os.getenv('ROUTER_MIN_SAMPLES', '5'))
+ROUTER_EXPLORE = float(os.getenv('ROUTER_EXPLORE', '0.05'))
+# Score multiplier per unit of error rate, 0.2 errors -> 2x the latency score
+ROUTER_ERROR_PENALTY = float(os.getenv('ROUTER_ERROR_PENALTY', '5.0'))
+
+# blueprint section -> provider kind
+SECTION_KINDS = {'model': 'llm', 'voice': 'tts', 'transcriber': 'stt'}
+# Keys of a section that belong to the blueprint, not to the provider
+SECTION_SHARED_KEYS = ['messages', 'toolIds']
+
+# Log-spaced latency buckets from 10ms to ~33s
+BUCKET_BOUNDS = [0.01 * 1.25 ** i for i in range(37)]
+
+
+def _bucket(value: float) -> int:
+    for i, bound in enumerate(BUCKET_BOUNDS):
+        if value <= bound:
+            return i
+    return len(BUCKET_BOUNDS) - 1
+
+
+class DecayedHistogram:
+    """Latency histogram and error count whose weights halve every half-life"""
+
+    def __init__(self, half_life: float = ROUTER_HALF_LIFE, counts: Optional[list[float]] = None,
+                 errors: float = 0.0, updated: Optional[float] = None):
+        self.half_life = half_life
+        self.counts = counts or [0.0] * len(BUCKET_BOUNDS)
+        self.errors = errors
+        self.updated = updated if updated is not None else time.time()
+
+    def decay(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        if now <= self.updated:
+            return
+        factor = 0.5 ** ((now - self.updated) / self.half_life)
+        self.counts = [c * factor for c in self.counts]
+        self.errors *= factor
+        self.updated = now
+
+    def record(self, value: float):
+        self.decay()
+        self.counts[_bucket(value)] += 1.0
+
+    def record_error(self):
+        self.decay()
+        self.errors += 1.0
+
+    def merge(self, other: "DecayedHistogram"):
+        self.decay()
+        other.decay(self.updated)
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.errors += other.errors
+
+    def samples(self) -> float:
+        self.decay()
+        return sum(self.counts)
+
+    def error_rate(self) -> float:
+        total = self.samples() + self.errors
+        return self.errors / total if total else 0.0
+
+    def quantile(self, q: float) -> float:
+        total = self.samples()
+        if not total:
+            return math.inf
+        target = q * total
+        seen = 0.0
+        for count, bound in zip(self.counts, BUCKET_BOUNDS):
+            seen += count
+            if seen >= target:
+                return bound
+        return BUCKET_BOUNDS[-1]
+
+    def copy(self) -> "DecayedHistogram":
+        return DecayedHistogram(self.half_life, list(self.counts), self.errors, self.updated)
+
+    def to_json(self) -> str:
+        return json.dumps({"counts": self.counts, "errors": self.errors, "updated": self.updated})
+
+    @classmethod
+    def from_json(cls, encoded: str) -> "DecayedHistogram":
+        data = json.loads(encoded)
+        if len(data['counts']) != len(BUCKET_BOUNDS):
+            return cls()
+        return cls(counts=data['counts'], errors=data['errors'], updated=data['updated'])
+
+
+class ProviderRouter:
+    def __init__(self, state_path: str = ROUTER_STATE_PATH, decision_log: str = ROUTER_DECISION_LOG):
+        self.state_path = state_path
+        self.decision_log = decision_log
+        # key "<kind>:<provider>/<model>" -> stats of all processes as last loaded, plus local samples
+        self._stats: dict[str, DecayedHistogram] = {}
+        # Samples recorded by this process and not yet merged into the store
+        self._pending: dict[str, DecayedHistogram] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        conn = sqlite3.connect(self.state_path, isolation_level=None, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS provider_stats (key TEXT PRIMARY KEY, histogram TEXT NOT NULL)")
+        return conn
+
+    def stats(self, key: str) -> DecayedHistogram:
+        histogram = self._stats.get(key)
+        if histogram is None:
+            histogram = self._stats[key] = DecayedHistogram()
+        return histogram
+
+    def _record(self, key: str, value: Optional[float] = None):
+        for table in (self._stats, self._pending):
+            histogram = table.get(key)
+            if histogram is None:
+                histogram = table[key] = DecayedHistogram()
+            if value is None:
+                histogram.record_error()
+            else:
+                histogram.record(value)
+
+    def attach(self, kind: str, label: str, instance):
+        """Feed an STT/LLM/TTS instance's metrics and errors into the router"""
+        key = f"{kind}:{label}"
+
+        def on_metrics(metrics):
+            if kind == 'llm' and getattr(metrics, 'ttft', -1) >= 0:
+                self._record(key, metrics.ttft)
+            elif kind == 'tts' and getattr(metrics, 'ttfb', -1) >= 0:
+                self._record(key, metrics.ttfb)
+            elif kind == 'stt' and not getattr(metrics, 'streamed', True):
+                self._record(key, metrics.duration)
+
+        def on_error(error):
+            self._record(key)
+
+        instance.on("metrics_collected", on_metrics)
+        instance.on("error", on_error)
+
+    def attach_session(self, session, stt_labels: list[str]):
+        """Feed the transcription delay of a session's (streamed) STT chain into the router"""
+
+        def on_metrics(ev):
+            if ev.metrics.type == 'eou_metrics' and ev.metrics.transcription_delay > 0:
+                self._record(f"stt:{serving_stt(stt_labels)}", ev.metrics.transcription_delay)
+
+        session.on("metrics_collected", on_metrics)
+
+    def _snapshot(self) -> dict[str, DecayedHistogram]:
+        # Taken on the event loop, the metrics callbacks keep recording meanwhile
+        return {key: histogram.copy() for key, histogram in self._pending.items()}
+
+    def load_sync(self, pending: dict[str, DecayedHistogram]) -> dict[str, DecayedHistogram]:
+        """Stats of all processes merged with this process' unsaved samples"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT key, histogram FROM provider_stats").fetchall()
+        finally:
+            conn.close()
+        stats = {key: DecayedHistogram.from_json(encoded) for key, encoded in rows}
+        for key, histogram in pending.items():
+            stats.setdefault(key, DecayedHistogram()).merge(histogram)
+        return stats
+
+    def flush_sync(self, pending: dict[str, DecayedHistogram]):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for key, histogram in pending.items():
+                row = conn.execute("SELECT histogram FROM provider_stats WHERE key = ?", (key,)).fetchone()
+                stored = DecayedHistogram.from_json(row[0]) if row else DecayedHistogram()
+                stored.merge(histogram)
+                conn.execute("INSERT OR REPLACE INTO provider_stats (key, histogram) VALUES (?, ?)",
+                             (key, stored.to_json()))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    async def flush(self):
+        """Job shutdown callback"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await asyncio.to_thread(self.flush_sync, pending)
+        except Exception as e:
+            print("[Radiance] ---> Failed to save provider routing stats", e)
+
+    def _score(self, kind: str, config: Mapping[str, Any]) -> dict[str, Any]:
+        label = provider_label(config)
+        histogram = self.stats(f"{kind}:{label}")
+        latency = histogram.quantile(ROUTER_PERCENTILE)
+        error_rate = histogram.error_rate()
+        healthy = kind != 'llm' or provider_health(label).healthy
+        return {
+            "label": label,
+            "samples": round(histogram.samples(), 2),
+            "latency": None if math.isinf(latency) else latency,
+            "error_rate": round(error_rate, 4),
+            "healthy": healthy,
+            "score": latency * (1 + ROUTER_ERROR_PENALTY * error_rate) if healthy else math.inf,
+        }
+
+    def choose(self, kind: str, options: list[Mapping[str, Any]]):
+        """Return (index of the chosen option, reason, per-option scores)"""
+        scores = [self._score(kind, option) for option in options]
+        healthy = [i for i, s in enumerate(scores) if s['healthy']] or list(range(len(options)))
+        unexplored = [i for i in healthy if scores[i]['samples'] < ROUTER_MIN_SAMPLES]
+        explored = [i for i in healthy if i not in unexplored]
+        if unexplored and (not explored or random.random() < ROUTER_EXPLORE):
+            return random.choice(unexplored), "explore", scores
+        return min(explored, key=lambda i: scores[i]['score']), "fastest", scores
+
+    async def route(self, metadata: Mapping[str, Any], room: Optional[str] = None) -> Mapping[str, Any]:
+        """The blueprint with each section's candidates resolved to one provider"""
+        sections = [s for s in SECTION_KINDS if (metadata.get(s) or {}).get('candidates')]
+        if not sections:
+            return metadata
+        try:
+            self._stats = await asyncio.to_thread(self.load_sync, self._snapshot())
+        except Exception as e:
+            print("[Radiance] ---> Failed to load provider routing stats", e)
+
+        routed = dict(metadata)
+        decisions = []
+        for section in sections:
+            config = metadata[section]
+            primary = {k: v for k, v in config.items() if k != 'candidates'}
+            shared = {k: v for k, v in config.items() if k in SECTION_SHARED_KEYS}
+            options = [primary] + [{**shared, **candidate} for candidate in config['candidates']]
+
+            index, reason, scores = self.choose(SECTION_KINDS[section], options)
+            routed[section] = options[index]
+            decisions.append({
+                "ts": time.time(),
+                "room": room,
+                "section": section,
+                "chosen": scores[index]['label'],
+                "reason": reason,
+                "candidates": [{**s, "score": None if math.isinf(s['score']) else s['score']} for s in scores],
+            })
+            print(f"[Radiance] ---> Routed {section} to {scores[index]['label']} ({reason})")
+
+        spawn(asyncio.to_thread(self._log_decisions, decisions))
+        return routed
+
+    def _log_decisions(self, decisions: list[dict[str, Any]]):
+        try:
+            append_jsonl(self.decision_log, decisions)
+        except OSError as e:
+            print("[Radiance] ---> Failed to write routing decision log", e)
+
+
+router: Optional[ProviderRouter] = None
+
+
+def get_provider_router() -> ProviderRouter:
+    global router
+    if router is None:
+        router = ProviderRouter()
+    return router
@@ -0,0 +1,140 @@
+"""
+Recorded provider response timings, the input of provider A/B replays.
+
+Every STT/LLM/TTS instance built from a blueprint reports its requests here,
+keyed by provider label (e.g. openai/gpt-4o-mini): LLM TTFT, duration and
+token counts, TTS TTFB, duration and audio length, non-streamed STT request
+duration. For streamed STT the session's transcription delay is recorded
+instead, credited to the STT serving the session (see stt_availability). Only timings and counts are kept, never text or audio. Recording
+is off unless PROVIDER_TIMINGS is set; records are appended to
+PROVIDER_TIMINGS_PATH at job shutdown, rotated at JSONL_MAX_BYTES.
+
+replay_config() turns the recorded samples of one provider into a stand-in
+provider config (see benchmarks/standin_providers.py) that replays them offline.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from agent_utils.jsonl_log import JSONL_BACKUPS, append_jsonl
+from agent_utils.stt_availability import serving_stt
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+PROVIDER_TIMINGS = os.getenv('PROVIDER_TIMINGS', 'false').lower() in ('1', 'true', 'yes')
+PROVIDER_TIMINGS_PATH = os.getenv('PROVIDER_TIMINGS_PATH', os.path.join(_DATA_DIR, 'provider_timings.jsonl'))
+
+STANDIN_PROVIDER = 'standin'
+
+
+class TimingRecorder:
+    def __init__(self, path: str = PROVIDER_TIMINGS_PATH):
+        self.path = path
+        self._pending: list[dict[str, Any]] = []
+
+    def attach(self, kind: str, label: str, instance):
+        """Record an STT/LLM/TTS instance's requests"""
+
+        def on_metrics(metrics):
+            record = {"ts": time.time(), "kind": kind, "label": label}
+            if kind == 'llm' and metrics.type == 'llm_metrics':
+                if metrics.ttft < 0 or metrics.cancelled:
+                    return
+                record.update(ttft=metrics.ttft, duration=metrics.duration, prompt_tokens=metrics.prompt_tokens,
+                              completion_tokens=metrics.completion_tokens)
+            elif kind == 'tts' and metrics.type == 'tts_metrics':
+                if metrics.ttfb < 0 or metrics.cancelled:
+                    return
+                record.update(ttfb=metrics.ttfb, duration=metrics.duration, audio_duration=metrics.audio_duration,
+                              characters=metrics.characters_count)
+            elif kind == 'stt' and metrics.type == 'stt_metrics' and not metrics.streamed:
+                record.update(duration=metrics.duration, audio_duration=metrics.audio_duration)
+            else:
+                return
+            self._pending.append(record)
+
+        instance.on("metrics_collected", on_metrics)
+
+    def attach_session(self, session, stt_labels: list[str]):
+        """Record the transcription delay of a session's (streamed) STT chain"""
+
+        def on_metrics(ev):
+            if ev.metrics.type == 'eou_metrics' and ev.metrics.transcription_delay > 0:
+                self._pending.append({"ts": time.time(), "kind": "stt", "label": serving_stt(stt_labels),
+                                      "transcription_delay": ev.metrics.transcription_delay})
+
+        session.on("metrics_collected", on_metrics)
+
+    def _append(self, records: list[dict[str, Any]]):
+        append_jsonl(self.path, records)
+
+    async def flush(self):
+        """Job shutdown callback"""
+        records, self._pending = self._pending, []
+        if not records:
+            return
+        try:
+            await asyncio.to_thread(self._append, records)
+        except OSError as e:
+            print("[Radiance] ---> Failed to write provider timings", e)
+
+
+recorder: Optional[TimingRecorder] = None
+
+
+def get_timing_recorder() -> TimingRecorder:
+    global recorder
+    if recorder is None:
+        recorder = TimingRecorder()
+    return recorder
+
+
+def load_timings(path: str = PROVIDER_TIMINGS_PATH) -> dict[tuple[str, str], list[dict[str, Any]]]:
+    """(kind, label) -> recorded requests of the file and its rotated backups, oldest first"""
+    timings: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    backups = [f"{path}.{i}" for i in range(JSONL_BACKUPS, 0, -1) if os.path.exists(f"{path}.{i}")]
+    for file_path in [*backups, path]:
+        with open(file_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    timings.setdefault((record['kind'], record['label']), []).append(record)
+    return timings
+
+
+def _replay(records: list[Mapping[str, Any]], key: str) -> Optional[dict[str, Any]]:
+    samples = [r[key] for r in records if r.get(key) is not None]
+    return {"dist": "replay", "samples": samples} if samples else None
+
+
+def replay_config(kind: str, label: str, records: list[Mapping[str, Any]]) -> dict[str, Any]:
+    """Stand-in provider config replaying the recorded timings of `label`"""
+    if kind == 'llm':
+        return {
+            'provider': STANDIN_PROVIDER,
+            'model': label,
+            'ttft': _replay(records, 'ttft'),
+            'completion_tokens': _replay(records, 'completion_tokens'),
+            # Streaming rate after the first token, from duration and completion size
+            'tokens_per_second': statistics.median(
+                [r['completion_tokens'] / (r['duration'] - r['ttft']) for r in records
+                 if r['completion_tokens'] and r['duration'] > r['ttft']] or [50.0]),
+        }
+    if kind == 'tts':
+        return {
+            'provider': STANDIN_PROVIDER,
+            'voice_id': label,
+            'ttfb': _replay(records, 'ttfb'),
+            'chars_per_second': statistics.median(
+                [r['characters'] / r['audio_duration'] for r in records if r['audio_duration']] or [15.0]),
+            'realtime_factor': statistics.median(
+                [(r['duration'] - r['ttfb']) / r['audio_duration'] for r in records
+                 if r['audio_duration'] and r['duration'] > r['ttfb']] or [0.1]),
+        }
+    # Non-streamed request duration, or the transcription delay of streamed STT
+    latency = _replay(records, 'duration') or _replay(records, 'transcription_delay')
+    return {'provider': STANDIN_PROVIDER, 'model': label, 'latency': latency}
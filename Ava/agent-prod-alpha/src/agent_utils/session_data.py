@@ -0,0 +1,32 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from agent_utils.greeting_pool import GreetingPool
+from agent_utils.patient_cache import PatientCache
+from agent_utils.patient_renderer import RenderStats
+from agent_utils.turn_tracing import TurnTracer
+from agent_utils.utterance_cache import UtteranceCache
+
+
+@dataclass
+class SessionData:
+    """Per-call state shared with the function tools through RunContext.userdata"""
+    metadata: Mapping[str, Any] = field(default_factory=dict)
+    blueprint_hash: Optional[str] = None
+    utterance_cache: Optional[UtteranceCache] = None
+    greeting_pool: Optional[GreetingPool] = None
+    patient_cache: PatientCache = field(default_factory=PatientCache)
+    # patient_id -> upcoming appointments, invalidated by book_appointment
+    appointments_cache: dict[str, list[dict]] = field(default_factory=dict)
+    render_stats: RenderStats = field(default_factory=RenderStats)
+    # Per-turn critical path spans, None when TURN_TRACING is off
+    tracer: Optional[TurnTracer] = None
+
+
+def get_session_data(session) -> Optional[SessionData]:
+    try:
+        return session.userdata
+    except ValueError:
+        # Session started without userdata
+        return None
@@ -0,0 +1,271 @@
+"""
+Per-session voice pipeline metrics with periodic, non-blocking export.
+
+`SessionMetrics.record()` is meant to be called straight from a
+metrics_collected handler: it only bumps counters in histograms allocated
+when the session starts, no task is spawned and nothing is printed. LLM, TTS
+and EOU metrics of the same speech_id are combined into the end-to-end turn
+latency (EOU delay + LLM TTFT + TTS TTFB).
+
+Latencies are also observed into prometheus_client histograms and the
+counters are pushed to prometheus_client counters at every flush. Jobs run in
+their own processes, so with METRICS_PORT set the worker's main process serves
+/metrics (see metrics_worker_options()) and collects the values every job
+process writes to PROMETHEUS_MULTIPROC_DIR.
+
+`MetricsExporter` snapshots all sessions every METRICS_FLUSH_INTERVAL seconds
+and appends per-session summaries to METRICS_JSONL_PATH from a worker thread,
+rotated at JSONL_MAX_BYTES.
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Optional
+
+import prometheus_client
+
+from agent_utils.jsonl_log import append_jsonl
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '10.0'))
+METRICS_JSONL_PATH = os.getenv('METRICS_JSONL_PATH', os.path.join(_DATA_DIR, 'session_metrics.jsonl'))
+# Port of the worker's /metrics endpoint, disabled when 0
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', os.path.join(_DATA_DIR, 'prometheus'))
+
+# Upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = [0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0,
+                   1.5, 2.0, 3.0, 5.0, 7.5, 10.0, float('inf')]
+
+HISTOGRAMS = {
+    "eou_delay": "End of speech to end-of-turn decision",
+    "transcription_delay": "End of speech to final transcript",
+    "llm_ttft": "LLM time to first token",
+    "llm_duration": "LLM request duration",
+    "tts_ttfb": "TTS time to first byte",
+    "stt_duration": "Non-streamed STT request duration",
+    "turn_latency": "End-to-end turn latency, EOU delay + LLM TTFT + TTS TTFB",
+}
+COUNTERS = ["llm_requests", "llm_prompt_tokens", "llm_prompt_cached_tokens", "llm_completion_tokens",
+            "tts_requests", "tts_characters", "tts_audio_seconds", "stt_audio_seconds", "turns"]
+
+# Turns still waiting for one of their three metrics, oldest dropped first
+PENDING_TURNS = 16
+
+EXPORTED_HISTOGRAMS = {
+    name: prometheus_client.Histogram(f"voice_{name}_seconds", description, ["agent"], buckets=LATENCY_BUCKETS)
+    for name, description in HISTOGRAMS.items()
+}
+EXPORTED_COUNTERS = {name: prometheus_client.Counter(f"voice_{name}", f"Total {name.replace('_', ' ')}", ["agent"])
+                     for name in COUNTERS}
+ACTIVE_SESSIONS = prometheus_client.Gauge("voice_active_sessions", "Sessions in progress", ["agent"],
+                                          multiprocess_mode="livesum")
+
+
+def metrics_worker_options() -> dict[str, Any]:
+    """WorkerOptions serving the metrics of every job process from the main process"""
+    if not METRICS_PORT:
+        return {}
+    return {"prometheus_port": METRICS_PORT, "prometheus_multiproc_dir": METRICS_MULTIPROC_DIR}
+
+
+class Histogram:
+    __slots__ = ("count", "counts", "exported", "total")
+
+    def __init__(self, exported=None):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        # Labelled prometheus_client histogram also observing every value
+        self.exported = exported
+
+    def record(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        if self.exported is not None:
+            self.exported.observe(value)
+
+    def merge(self, other: "Histogram"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.total += other.total
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, c in zip(LATENCY_BUCKETS, self.counts):
+            seen += c
+            if seen >= target:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+    def summary(self) -> dict[str, Any]:
+        p95 = self.quantile(0.95)
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": None if p95 == float('inf') else p95,
+        }
+
+
+class SessionMetrics:
+    def __init__(self, session_id: str, agent: str = "agent"):
+        self.session_id = session_id
+        self.agent = agent
+        self.started = time.time()
+        self.histograms = {name: Histogram(EXPORTED_HISTOGRAMS[name].labels(agent=agent)) for name in HISTOGRAMS}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # Counter values already pushed to prometheus_client
+        self._exported_counters = dict.fromkeys(COUNTERS, 0)
+        # speech_id -> [eou delay, llm ttft, tts ttfb]
+        self._turns: OrderedDict[str, list[Optional[float]]] = OrderedDict()
+        self.closed = False
+
+    def _turn_part(self, speech_id: Optional[str], index: int, value: float):
+        if not speech_id or value < 0:
+            return
+        parts = self._turns.get(speech_id)
+        if parts is None:
+            parts = self._turns[speech_id] = [None, None, None]
+            if len(self._turns) > PENDING_TURNS:
+                self._turns.popitem(last=False)
+        if parts[index] is not None:
+            # Only the first LLM request / TTS segment of a turn is on the critical path
+            return
+        parts[index] = value
+        if None not in parts:
+            del self._turns[speech_id]
+            self.histograms["turn_latency"].record(sum(parts))
+            self.counters["turns"] += 1
+
+    def record(self, metrics):
+        """Synchronous, call it directly from the metrics_collected handler"""
+        kind = metrics.type
+        h, c = self.histograms, self.counters
+        if kind == "llm_metrics":
+            c["llm_requests"] += 1
+            c["llm_prompt_tokens"] += metrics.prompt_tokens
+            c["llm_prompt_cached_tokens"] += metrics.prompt_cached_tokens
+            c["llm_completion_tokens"] += metrics.completion_tokens
+            h["llm_duration"].record(metrics.duration)
+            if metrics.ttft >= 0:
+                h["llm_ttft"].record(metrics.ttft)
+            self._turn_part(metrics.speech_id, 1, metrics.ttft)
+        elif kind == "tts_metrics":
+            c["tts_requests"] += 1
+            c["tts_characters"] += metrics.characters_count
+            c["tts_audio_seconds"] += metrics.audio_duration
+            if metrics.ttfb >= 0:
+                h["tts_ttfb"].record(metrics.ttfb)
+            self._turn_part(metrics.speech_id, 2, metrics.ttfb)
+        elif kind == "eou_metrics":
+            h["eou_delay"].record(metrics.end_of_utterance_delay)
+            h["transcription_delay"].record(metrics.transcription_delay)
+            self._turn_part(metrics.speech_id, 0, metrics.end_of_utterance_delay)
+        elif kind == "stt_metrics":
+            c["stt_audio_seconds"] += metrics.audio_duration
+            if not metrics.streamed:
+                h["stt_duration"].record(metrics.duration)
+
+    def export_counters(self):
+        """Push the counter increments since the last call to prometheus_client"""
+        for name, value in self.counters.items():
+            delta = value - self._exported_counters[name]
+            if delta:
+                EXPORTED_COUNTERS[name].labels(agent=self.agent).inc(delta)
+                self._exported_counters[name] = value
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "ts": time.time(),
+            "session": self.session_id,
+            "agent": self.agent,
+            "duration": time.time() - self.started,
+            "counters": dict(self.counters),
+            "histograms": {name: h.summary() for name, h in self.histograms.items() if h.count},
+        }
+
+    def report(self) -> str:
+        turn = self.histograms["turn_latency"].summary()
+        c = self.counters
+        latency = f"p50 {turn['p50'] * 1000:.0f}ms p95 {turn['p95'] * 1000:.0f}ms" if turn['count'] and turn['p95'] \
+            else "n/a"
+        return (
+            f"{c['turns']} turns, turn latency {latency}, {c['llm_prompt_tokens']} prompt tokens "
+            f"({c['llm_prompt_cached_tokens']} cached), {c['llm_completion_tokens']} completion tokens, "
+            f"{c['tts_characters']} TTS characters"
+        )
+
+
+class MetricsExporter:
+    def __init__(self, jsonl_path: str = METRICS_JSONL_PATH, interval: float = METRICS_FLUSH_INTERVAL):
+        self.jsonl_path = jsonl_path
+        self.interval = interval
+        self.sessions: dict[str, SessionMetrics] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def session(self, session_id: str, agent: str = "agent") -> SessionMetrics:
+        metrics = self.sessions.get(session_id)
+        if metrics is None:
+            metrics = self.sessions[session_id] = SessionMetrics(session_id, agent)
+            ACTIVE_SESSIONS.labels(agent=agent).inc()
+        self.start()
+        return metrics
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        sessions = list(self.sessions.values())
+        # Summaries are built on the loop (a few dict copies), the file I/O runs in a thread
+        summaries = [s.summary() for s in sessions]
+        for session in sessions:
+            session.export_counters()
+            if session.closed:
+                self.sessions.pop(session.session_id, None)
+        if summaries:
+            try:
+                await asyncio.to_thread(self._append, summaries)
+            except OSError as e:
+                print("[Radiance] ---> Failed to write session metrics", e)
+
+    def _append(self, summaries: list[dict[str, Any]]):
+        append_jsonl(self.jsonl_path, summaries)
+
+    async def close_session(self, session_id: str):
+        """Mark the session finished and write its final summary"""
+        metrics = self.sessions.get(session_id)
+        if metrics is not None and not metrics.closed:
+            metrics.closed = True
+            ACTIVE_SESSIONS.labels(agent=metrics.agent).dec()
+            await self.flush()
+
+    async def aclose(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+
+
+exporter: Optional[MetricsExporter] = None
+
+
+def get_metrics_exporter() -> MetricsExporter:
+    global exporter
+    if exporter is None:
+        exporter = MetricsExporter()
+    return exporter
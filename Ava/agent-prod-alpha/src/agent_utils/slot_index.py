@@ -0,0 +1,237 @@
+"""
+In-memory appointment slot index with conflict detection.
+
+Booked slots are kept as sorted start minutes per (specialty, date), loaded
+from the appointments collection and refreshed in the background. Checking a
+slot, suggesting the nearest free ones and reserving are pure in-memory
+operations; a reservation has no await between check and insert, so it is
+atomic for every session running on the process event loop. Slots that have
+already started (clinic time, CLINIC_TIMEZONE) are never free.
+
+Opening hours and the spacing of bookings are only enforced when CLINIC_OPEN
+and CLINIC_CLOSE are set: then a slot must lie within the hours and no two
+bookings of a specialty may start less than APPOINTMENT_SLOT_MINUTES apart.
+Without them any time can be booked and only the exact same slot conflicts.
+"""
+
+import asyncio
+import bisect
+import os
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+APPOINTMENT_SLOT_MINUTES = int(os.getenv('APPOINTMENT_SLOT_MINUTES', '30'))
+# Opening hours as HH:MM, e.g. 09:00 and 17:00, unset means no hours are enforced
+CLINIC_OPEN = os.getenv('CLINIC_OPEN')
+CLINIC_CLOSE = os.getenv('CLINIC_CLOSE')
+SLOT_INDEX_REFRESH_INTERVAL = float(os.getenv('SLOT_INDEX_REFRESH_INTERVAL', '60'))
+# How many days ahead alternatives are searched for
+SLOT_SEARCH_DAYS = int(os.getenv('SLOT_SEARCH_DAYS', '7'))
+# IANA zone of the clinic (e.g. Asia/Karachi), the server's local time otherwise
+CLINIC_TIMEZONE = os.getenv('CLINIC_TIMEZONE')
+
+SlotKey = tuple[str, str]  # normalized specialty, YYYY-MM-DD
+DAY_MINUTES = 24 * 60
+
+APPOINTMENT_PROJECTION = {
+    "_id": 0,
+    "doctor_specialty": 1,
+    "appointment_date": 1,
+    "appointment_time": 1,
+    "idempotency_key": 1,
+}
+
+
+def parse_minutes(value: str) -> int:
+    parsed = datetime.strptime(value.strip(), '%H:%M')
+    return parsed.hour * 60 + parsed.minute
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_specialty(specialty: str) -> str:
+    return ' '.join(specialty.lower().split())
+
+
+def normalize_date(value: str) -> str:
+    return datetime.strptime(value.strip(), '%Y-%m-%d').date().isoformat()
+
+
+def clinic_now() -> datetime:
+    """Current wall-clock time at the clinic, naive like the booked slots"""
+    if CLINIC_TIMEZONE:
+        return datetime.now(ZoneInfo(CLINIC_TIMEZONE)).replace(tzinfo=None)
+    return datetime.now()
+
+
+class SlotIndex:
+    def __init__(self, slot_minutes: int = APPOINTMENT_SLOT_MINUTES,
+                 opens: Optional[str] = CLINIC_OPEN, closes: Optional[str] = CLINIC_CLOSE):
+        self.slot_minutes = slot_minutes
+        self.enforce_hours = bool(opens and closes)
+        self.opens = parse_minutes(opens) if self.enforce_hours else 0
+        self.closes = parse_minutes(closes) if self.enforce_hours else DAY_MINUTES
+        self._booked: dict[SlotKey, list[int]] = {}
+        # slot -> idempotency key of the booking holding it
+        self._holders: dict[tuple[str, str, int], Optional[str]] = {}
+        # Reserved by this process but not yet seen in MongoDB
+        self._local: dict[tuple[str, str, int], Optional[str]] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    def _conflicts(self, key: SlotKey, start: int) -> bool:
+        starts = self._booked.get(key)
+        if not starts:
+            return False
+        if not self.enforce_hours:
+            i = bisect.bisect_left(starts, start)
+            return i < len(starts) and starts[i] == start
+        # Any booking starting less than one slot before or after overlaps
+        i = bisect.bisect_left(starts, start - self.slot_minutes + 1)
+        return i < len(starts) and starts[i] < start + self.slot_minutes
+
+    def _in_hours(self, start: int) -> bool:
+        if not self.enforce_hours:
+            return True
+        return self.opens <= start and start + self.slot_minutes <= self.closes
+
+    @staticmethod
+    def _started(day: str, start: int, now: datetime) -> bool:
+        return (day, start) <= (now.date().isoformat(), now.hour * 60 + now.minute)
+
+    def is_past(self, day: str, time: str, now: Optional[datetime] = None) -> bool:
+        """True if the slot starts now or earlier"""
+        return self._started(normalize_date(day), parse_minutes(time), now or clinic_now())
+
+    def is_free(self, specialty: str, day: str, time: str, now: Optional[datetime] = None) -> bool:
+        start = parse_minutes(time)
+        key = (normalize_specialty(specialty), normalize_date(day))
+        return self._in_hours(start) and not self._started(key[1], start, now or clinic_now()) \
+            and not self._conflicts(key, start)
+
+    def holder(self, specialty: str, day: str, time: str) -> Optional[str]:
+        """Idempotency key of the booking holding exactly this slot, if known"""
+        slot = (normalize_specialty(specialty), normalize_date(day), parse_minutes(time))
+        return self._holders.get(slot)
+
+    def reserve(self, specialty: str, day: str, time: str,
+                idempotency_key: Optional[str] = None, now: Optional[datetime] = None) -> bool:
+        """Atomically claim a slot, re-reserving with the same key succeeds"""
+        start = parse_minutes(time)
+        key = (normalize_specialty(specialty), normalize_date(day))
+        slot = (*key, start)
+        if idempotency_key is not None and self._holders.get(slot) == idempotency_key:
+            return True
+        if not self._in_hours(start) or self._started(key[1], start, now or clinic_now()) \
+                or self._conflicts(key, start):
+            return False
+        self._insert(slot, idempotency_key)
+        self._local[slot] = idempotency_key
+        return True
+
+    def release(self, specialty: str, day: str, time: str):
+        slot = (normalize_specialty(specialty), normalize_date(day), parse_minutes(time))
+        starts = self._booked.get(slot[:2], [])
+        i = bisect.bisect_left(starts, slot[2])
+        if i < len(starts) and starts[i] == slot[2]:
+            starts.pop(i)
+        self._holders.pop(slot, None)
+        self._local.pop(slot, None)
+
+    def _insert(self, slot: tuple[str, str, int], holder: Optional[str]):
+        bisect.insort(self._booked.setdefault(slot[:2], []), slot[2])
+        self._holders[slot] = holder
+
+    def nearest_free(self, specialty: str, day: str, time: str, count: int = 3,
+                     now: Optional[datetime] = None) -> list[tuple[str, str]]:
+        """Up to `count` free (date, time) slots closest to the requested one, none in the past"""
+        now = now or clinic_now()
+        requested = parse_minutes(time)
+        normalized = normalize_specialty(specialty)
+        first_day = max(date.fromisoformat(normalize_date(day)), now.date())
+        if self.enforce_hours:
+            grid = range(self.opens, self.closes - self.slot_minutes + 1, self.slot_minutes)
+        else:
+            # No hours, slots every slot_minutes around the requested time
+            grid = range(requested % self.slot_minutes, DAY_MINUTES, self.slot_minutes)
+        nearest = sorted(grid, key=lambda m: abs(m - requested))
+        found = []
+        for offset in range(SLOT_SEARCH_DAYS + 1):
+            current = (first_day + timedelta(days=offset)).isoformat()
+            key = (normalized, current)
+            # Same day (or any day without hours): closest to the requested time first,
+            # later days within opening hours: earliest first
+            candidates = nearest if offset == 0 or not self.enforce_hours else grid
+            for start in candidates:
+                if not self._started(current, start, now) and not self._conflicts(key, start):
+                    found.append((current, format_minutes(start)))
+                    if len(found) == count:
+                        return found
+        return found
+
+    def rebuild(self, appointments: Iterable[dict]):
+        """Replace the index with `appointments`, keeping local reservations not seen yet"""
+        booked: dict[SlotKey, list[int]] = {}
+        holders: dict[tuple[str, str, int], Optional[str]] = {}
+        for appointment in appointments:
+            try:
+                slot = (
+                    normalize_specialty(appointment['doctor_specialty']),
+                    normalize_date(appointment['appointment_date']),
+                    parse_minutes(appointment['appointment_time']),
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+            booked.setdefault(slot[:2], []).append(slot[2])
+            holders[slot] = appointment.get('idempotency_key')
+
+        for slot in list(self._local):
+            if slot in holders:
+                del self._local[slot]
+            else:
+                booked.setdefault(slot[:2], []).append(slot[2])
+                holders[slot] = self._local[slot]
+
+        for starts in booked.values():
+            starts.sort()
+        self._booked, self._holders = booked, holders
+        self.loaded = True
+
+    def _query(self):
+        return {"status": "scheduled", "appointment_date": {"$gte": date.today().isoformat()}}
+
+    def load_sync(self, db):
+        """Initial load through a plain pymongo database, for use in prewarm"""
+        self.rebuild(db.appointments.find(self._query(), APPOINTMENT_PROJECTION))
+
+    async def load(self, db):
+        cursor = db.appointments.find(self._query(), APPOINTMENT_PROJECTION)
+        self.rebuild(await cursor.to_list(length=None))
+
+    def start_refresh(self, get_db):
+        """Keep the index current with bookings made by other processes"""
+        if self._refresher is not None and not self._refresher.done():
+            return
+        self._refresher = asyncio.create_task(self._refresh_loop(get_db))
+
+    async def _refresh_loop(self, get_db):
+        while True:
+            try:
+                await self.load(await get_db())
+            except Exception as e:
+                print("[Radiance] ---> Slot index refresh failed", e)
+            await asyncio.sleep(SLOT_INDEX_REFRESH_INTERVAL)
+
+
+_slot_index = None
+
+
+def get_slot_index() -> SlotIndex:
+    global _slot_index
+    if _slot_index is None:
+        _slot_index = SlotIndex()
+    return _slot_index
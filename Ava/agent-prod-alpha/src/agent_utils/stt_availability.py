@@ -0,0 +1,35 @@
+"""
+Which STT of a fallback chain is serving a session.
+
+Streamed STT reports no per-request latency; its latency is the session's
+EOU transcription delay, which has to be credited to the STT that produced
+the transcript. The LiveKit FallbackAdapter streams from the first STT it
+considers available and emits stt_availability_changed when that changes,
+so the chains built from blueprints are followed here for the whole process.
+"""
+
+from typing import Any
+
+# Labels of fallback STTs currently marked unavailable by their adapter
+_unavailable: set[str] = set()
+
+
+def track_stt_fallback(adapter, chain: list[tuple[str, Any]]):
+    """Follow which (label, instance) of an STT FallbackAdapter's chain is available"""
+
+    def on_availability(ev):
+        for label, instance in chain:
+            if instance is ev.stt:
+                if ev.available:
+                    _unavailable.discard(label)
+                else:
+                    _unavailable.add(label)
+
+    adapter.on("stt_availability_changed", on_availability)
+
+
+def serving_stt(stt_labels: list[str]) -> str:
+    """The STT of a fallback chain serving the stream: the first available one"""
+    available = [label for label in stt_labels if label not in _unavailable]
+    # With all of them down the adapter starts over from the first one
+    return available[0] if available else stt_labels[0]
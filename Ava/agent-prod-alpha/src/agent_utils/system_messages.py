@@ -1,12 +1,73 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import date
+from typing import Any, Optional
+
+from livekit.agents.llm import ChatContext, ChatMessage
+
 VALID_CHAT_ROLES = ["developer", "system", "user", "assistant"]
+INSTRUCTION_ROLES = ["developer", "system"]
+# Id prefix of the blueprint example turns in the initial chat context
+BLUEPRINT_ITEM_PREFIX = "bp_"
+
+BASE_INSTRUCTIONS = "You are a helpful voice AI medical assistant."
+COMPILED_CONTEXT_CACHE_SIZE = 32
 
+# blueprint hash -> (instructions, example messages)
+_compiled: "OrderedDict[str, tuple[str, tuple[ChatMessage, ...]]]" = OrderedDict()
 
-async def setup_agent_context(session, config_data: dict):
-    chat_ctx = session.chat_ctx.copy()
-    
-    for message in config_data['model']['messages']:
+
+def _compile(config_data: Mapping[str, Any], blueprint_hash: str) -> tuple[str, tuple[ChatMessage, ...]]:
+    instructions = [BASE_INSTRUCTIONS]
+    examples = []
+    for message in config_data['model'].get('messages', []):
         role = message.get('role')
-        content = message.get('content')  
-        if role in VALID_CHAT_ROLES and content and isinstance(content, str):
-            chat_ctx.add_message(role=role, content=content)
-    await session.update_chat_ctx(chat_ctx)
\ No newline at end of file
+        content = message.get('content')
+        if role not in VALID_CHAT_ROLES or not content or not isinstance(content, str):
+            continue
+        if role in INSTRUCTION_ROLES:
+            instructions.append(content)
+        else:
+            # Stable ids and timestamps keep the serialized prefix byte-identical
+            examples.append(ChatMessage(
+                id=f"{BLUEPRINT_ITEM_PREFIX}{blueprint_hash[:16]}_{len(examples)}",
+                role=role,
+                content=[content],
+                created_at=0.0,
+            ))
+    return "\n\n".join(instructions), tuple(examples)
+
+
+def compiled_prefix(config_data: Mapping[str, Any], blueprint_hash: Optional[str]):
+    """Instructions and example turns of a blueprint, compiled once per blueprint hash"""
+    if not blueprint_hash:
+        return _compile(config_data, 'inline')
+    compiled = _compiled.get(blueprint_hash)
+    if compiled is None:
+        compiled = _compile(config_data, blueprint_hash)
+        _compiled[blueprint_hash] = compiled
+        while len(_compiled) > COMPILED_CONTEXT_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(blueprint_hash)
+    return compiled
+
+
+def volatile_context() -> str:
+    """Per-call facts, placed after the cacheable prefix"""
+    return f"Today's date is {date.today().isoformat()}."
+
+
+def build_agent_context(config_data: Mapping[str, Any], blueprint_hash: Optional[str],
+                        include_volatile: bool = True) -> tuple[str, ChatContext]:
+    """Agent instructions and initial chat context with a stable, cache-friendly prefix.
+
+    The agent's instructions become the first system message, followed by the
+    blueprint's example turns; both are identical for every call of a blueprint
+    so provider prompt caches can reuse them. Volatile content comes last.
+    """
+    instructions, examples = compiled_prefix(config_data, blueprint_hash)
+    items = [example.model_copy() for example in examples]
+    if include_volatile:
+        items.append(ChatMessage(role="system", content=[volatile_context()]))
+    return instructions, ChatContext(items)
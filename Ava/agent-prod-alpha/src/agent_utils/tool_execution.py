@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+from collections.abc import Awaitable
+from typing import Optional, TypeVar
+
+from livekit.agents import RunContext
+
+from agent_utils.session_data import get_session_data
+from agent_utils.utterance_cache import say_cached
+
+T = TypeVar('T')
+
+# How long tool I/O may run before the caller hears a "please wait" filler
+TOOL_FILLER_THRESHOLD = float(os.getenv('TOOL_FILLER_THRESHOLD', '0.8'))
+# A filler started less than this long before the result is interrupted,
+# its audio has most likely not reached the caller yet
+TOOL_FILLER_CANCEL_GRACE = float(os.getenv('TOOL_FILLER_CANCEL_GRACE', '0.3'))
+
+
+def _play_filler(context: RunContext, filler_instructions: str, filler_key: Optional[str]):
+    # Blueprint filler texts play from the pre-rendered utterance cache,
+    # otherwise the LLM is asked to phrase the filler
+    userdata = get_session_data(context.session)
+    metadata = getattr(userdata, 'metadata', None) or {}
+    filler_text = (metadata.get('fillerMessages') or {}).get(filler_key) if filler_key else None
+    if filler_text:
+        return say_cached(
+            context.session,
+            userdata.utterance_cache,
+            filler_text,
+            metadata['voice'],
+            allow_interruptions=True,
+        )
+    return context.session.generate_reply(
+        instructions=filler_instructions,
+        allow_interruptions=True,
+    )
+
+
+def _trace_io(context: RunContext, task: asyncio.Future, name: Optional[str]):
+    # The backend I/O becomes its own span inside the tool call span
+    userdata = get_session_data(context.session)
+    tracer = getattr(userdata, 'tracer', None)
+    if tracer is None:
+        return
+    started = time.time()
+    task.add_done_callback(lambda t: tracer.record_span(
+        f"io:{name or 'tool'}", started, time.time(),
+        is_error=t.cancelled() or t.exception() is not None))
+
+
+async def run_with_filler(context: RunContext, work: Awaitable[T], filler_instructions: str,
+                          threshold: Optional[float] = None, filler_key: Optional[str] = None) -> T:
+    """Run the tool's backend I/O right away and only speak a filler if it is slow.
+
+    The filler is skipped when `work` finishes within `threshold` seconds, so fast
+    lookups no longer pay an LLM+TTS round trip before the backend call starts.
+    `filler_key` selects a static text from the blueprint's `fillerMessages`.
+    """
+    threshold = TOOL_FILLER_THRESHOLD if threshold is None else threshold
+    task = asyncio.ensure_future(work)
+    _trace_io(context, task, filler_key)
+
+    try:
+        done, _ = await asyncio.wait({task}, timeout=threshold)
+        if done:
+            return task.result()
+
+        filler_started = time.perf_counter()
+        try:
+            filler = _play_filler(context, filler_instructions, filler_key)
+        except Exception as e:
+            print("[Radiance] ---> Failed to play tool filler", e)
+            filler = None
+
+        result = await task
+    except BaseException:
+        # Interrupted tool call (or failed work): don't leave the I/O running
+        task.cancel()
+        raise
+
+    if filler is not None and not filler.done() \
+            and time.perf_counter() - filler_started < TOOL_FILLER_CANCEL_GRACE:
+        filler.interrupt()
+    return result
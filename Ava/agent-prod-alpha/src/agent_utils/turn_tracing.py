@@ -0,0 +1,300 @@
+"""
+Per-turn tracing of the voice pipeline's critical path.
+
+Every user turn becomes one trace, identified by the speech id of the reply.
+Its spans are rebuilt from the session events (wall-clock times):
+
+  vad_end_of_speech  caller stops speaking -> VAD reports end of speech
+  stt_final          caller stops speaking -> final transcript
+  eou_decision       caller stops speaking -> turn detector ends the turn
+  turn_completed     on_user_turn_completed hook
+  llm_request        each LLM request, with llm_first_token as its first part
+  tool:<name>        each function tool call, io:<name> for its backend I/O
+  tts_first_frame    each TTS request until its first audio frame
+
+Finished turns are appended to TRACE_DIR/<session>.jsonl, one OTLP/JSON
+ExportTraceServiceRequest per line, so the files can also be sent to any
+OTLP collector. Tracing is off unless TURN_TRACING is set; at every job
+shutdown files older than TRACE_RETENTION seconds are deleted, then the oldest
+ones until the directory is under TRACE_DIR_MAX_BYTES. The CLI prints the
+critical path breakdown:
+
+    python -m agent_utils.turn_tracing report data/traces/*.jsonl [--turns]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from agent_utils.percentiles import percentile
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+TURN_TRACING = os.getenv('TURN_TRACING', 'false').lower() in ('1', 'true', 'yes')
+TRACE_DIR = os.getenv('TRACE_DIR', os.path.join(_DATA_DIR, 'traces'))
+SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'ava-agent')
+TRACE_RETENTION = float(os.getenv('TRACE_RETENTION', str(7 * 24 * 3600)))
+TRACE_DIR_MAX_BYTES = int(os.getenv('TRACE_DIR_MAX_BYTES', str(500 * 1024 * 1024)))
+
+
+def _id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: _id(8))
+
+    def otlp(self, trace_id: str, parent_id: Optional[str]) -> dict[str, Any]:
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(self.start * 1e9)),
+            "endTimeUnixNano": str(int(max(self.end, self.start) * 1e9)),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+        }
+        if parent_id:
+            span["parentSpanId"] = parent_id
+        return span
+
+
+def _attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def prune_traces(directory: str = TRACE_DIR, retention: float = TRACE_RETENTION,
+                 max_bytes: int = TRACE_DIR_MAX_BYTES) -> int:
+    """Delete expired trace files, then the oldest ones over the size cap; returns the number deleted"""
+    files = []
+    for path in glob.glob(os.path.join(directory, '*.jsonl')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    expired_before = time.time() - retention
+    kept = 0
+    removed = 0
+    # Newest first, so the size cap drops the oldest files
+    for mtime, size, path in sorted(files, reverse=True):
+        if mtime >= expired_before and kept + size <= max_bytes:
+            kept += size
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            # Another job process may have pruned it already
+            continue
+        removed += 1
+    return removed
+
+
+@dataclass
+class Turn:
+    turn_id: str
+    spans: list[Span] = field(default_factory=list)
+    trace_id: str = field(default_factory=lambda: _id(16))
+
+
+class TurnTracer:
+    def __init__(self, session_id: str, directory: str = TRACE_DIR):
+        self.session_id = session_id
+        self.path = os.path.join(directory, f"{session_id}.jsonl")
+        self._turn: Optional[Turn] = None
+        self._vad_end: Optional[float] = None
+        self._writes: list[asyncio.Task] = []
+
+    def attach(self, session):
+        session.on("metrics_collected", lambda ev: self.on_metrics(ev.metrics))
+        session.on("user_state_changed", self._on_user_state)
+        session.on("function_tools_executed", self._on_tools)
+
+    def _on_user_state(self, ev):
+        if ev.old_state == "speaking" and ev.new_state != "speaking":
+            self._vad_end = ev.created_at
+
+    def _on_tools(self, ev):
+        for call, output in ev.zipped():
+            end = output.created_at if output is not None else time.time()
+            self.record_span(f"tool:{call.name}", call.created_at, end,
+                             is_error=bool(output is not None and output.is_error))
+
+    def record_span(self, name: str, start: float, end: float, **attributes):
+        """Add a span to the current turn, e.g. a tool's backend I/O"""
+        if self._turn is not None:
+            self._turn.spans.append(Span(name, start, end, attributes))
+
+    def on_metrics(self, metrics):
+        kind = metrics.type
+        if kind == "eou_metrics":
+            self._start_turn(metrics)
+        elif kind == "llm_metrics":
+            start = metrics.timestamp - metrics.duration
+            self.record_span("llm_request", start, metrics.timestamp, label=metrics.label,
+                             prompt_tokens=metrics.prompt_tokens, cancelled=metrics.cancelled)
+            if metrics.ttft >= 0:
+                self.record_span("llm_first_token", start, start + metrics.ttft, label=metrics.label)
+        elif kind == "tts_metrics" and metrics.ttfb >= 0:
+            start = metrics.timestamp - metrics.duration
+            self.record_span("tts_first_frame", start, start + metrics.ttfb, label=metrics.label,
+                             characters=metrics.characters_count)
+
+    def _start_turn(self, eou):
+        self.finish_turn()
+        self._turn = Turn(eou.speech_id or _id(8))
+        speech_end = eou.last_speaking_time
+        if not speech_end:
+            return
+        if self._vad_end is not None and self._vad_end >= speech_end:
+            self.record_span("vad_end_of_speech", speech_end, self._vad_end)
+        self.record_span("stt_final", speech_end, speech_end + eou.transcription_delay)
+        decided = speech_end + eou.end_of_utterance_delay
+        self.record_span("eou_decision", speech_end, decided)
+        self.record_span("turn_completed", decided, decided + eou.on_user_turn_completed_delay)
+
+    def finish_turn(self):
+        turn, self._turn = self._turn, None
+        if turn is None or not turn.spans:
+            return
+        request = self._otlp(turn)
+        self._writes = [t for t in self._writes if not t.done()]
+        self._writes.append(asyncio.ensure_future(asyncio.to_thread(self._append, request)))
+
+    def _otlp(self, turn: Turn) -> dict[str, Any]:
+        start = min(s.start for s in turn.spans)
+        # The turn ends when the reply's audio starts
+        audio = [s.end for s in turn.spans if s.name == "tts_first_frame"]
+        end = max(audio) if audio else max(s.end for s in turn.spans)
+        root = Span("turn", start, end, {"session.id": self.session_id, "turn.id": turn.turn_id})
+        spans = [root.otlp(turn.trace_id, None)]
+        for span in turn.spans:
+            span.attributes["turn.id"] = turn.turn_id
+            spans.append(span.otlp(turn.trace_id, root.span_id))
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "agent_utils.turn_tracing"}, "spans": spans}],
+        }]}
+
+    def _append(self, request: dict[str, Any]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(request) + '\n')
+
+    async def aclose(self):
+        """Job shutdown callback"""
+        self.finish_turn()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        removed = await asyncio.to_thread(prune_traces, os.path.dirname(self.path))
+        if removed:
+            print(f"[Radiance] ---> Pruned {removed} trace files")
+
+
+# ---- report CLI ----
+
+def load_turns(paths: list[str]) -> list[dict[str, Any]]:
+    """Turns of the OTLP files as {"root": span, "spans": [spans]} with times in seconds"""
+    turns: dict[str, dict[str, Any]] = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                for resource in json.loads(line).get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        for span in scope.get("spans", []):
+                            parsed = {
+                                "name": span["name"],
+                                "start": int(span["startTimeUnixNano"]) / 1e9,
+                                "end": int(span["endTimeUnixNano"]) / 1e9,
+                            }
+                            turn = turns.setdefault(span["traceId"], {"root": None, "spans": []})
+                            if "parentSpanId" in span:
+                                turn["spans"].append(parsed)
+                            else:
+                                turn["root"] = parsed
+    return [t for t in turns.values() if t["root"] is not None]
+
+
+def critical_path(turn: dict[str, Any]) -> list[dict[str, Any]]:
+    """Walk back from the end of the turn, always through the span that finished last"""
+    root = turn["root"]
+    # Requests contain their first-token part, the finer span is the one blocking
+    spans = [s for s in turn["spans"] if s["name"] != "llm_request"]
+    path, t = [], root["end"] + 1e-6
+    while True:
+        blocking = [s for s in spans if s["end"] <= t and s["start"] < t and s not in path]
+        if not blocking:
+            break
+        span = max(blocking, key=lambda s: s["end"])
+        path.append(span)
+        t = span["start"]
+    return list(reversed(path))
+
+
+def report(paths: list[str], show_turns: bool = False):
+    turns = load_turns(paths)
+    if not turns:
+        print("No turns found")
+        return
+    durations: dict[str, list[float]] = {}
+    on_path: dict[str, float] = {}
+    total = 0.0
+    for turn in turns:
+        root = turn["root"]
+        turn_duration = root["end"] - root["start"]
+        total += turn_duration
+        durations.setdefault("turn", []).append(turn_duration)
+        for span in turn["spans"]:
+            durations.setdefault(span["name"], []).append(span["end"] - span["start"])
+        path = critical_path(turn)
+        traced = 0.0
+        for span in path:
+            on_path[span["name"]] = on_path.get(span["name"], 0.0) + span["end"] - span["start"]
+            traced += span["end"] - span["start"]
+        on_path["(untraced)"] = on_path.get("(untraced)", 0.0) + max(0.0, turn_duration - traced)
+        if show_turns:
+            steps = " -> ".join(f"{s['name']} {(s['end'] - s['start']) * 1000:.0f}ms" for s in path)
+            print(f"{turn_duration * 1000:7.0f}ms  {steps}")
+
+    print(f"\n{len(turns)} turns from {len(paths)} files\n")
+    print(f"{'stage':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'critical path':>15}")
+    for name, values in sorted(durations.items(), key=lambda kv: (kv[0] != "turn", -on_path.get(kv[0], 0.0))):
+        share = f"{100 * on_path.get(name, 0.0) / total:.0f}%" if name != "turn" else ""
+        print(f"{name:<28}{len(values):>7}{statistics.median(values) * 1000:>10.0f}"
+              f"{percentile(values, 0.95) * 1000:>10.0f}{share:>15}")
+    print(f"{'(untraced)':<28}{'':>7}{'':>10}{'':>10}{100 * on_path['(untraced)'] / total:>14.0f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('paths', nargs='*', help="Trace files, defaults to TRACE_DIR/*.jsonl")
+    parser.add_argument('--turns', action='store_true', help="Print the critical path of every turn")
+    args = parser.parse_intermixed_args(argv)
+
+    paths = args.paths or sorted(glob.glob(os.path.join(TRACE_DIR, '*.jsonl')))
+    report(paths, show_turns=args.turns)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Content-addressed on-disk cache of synthesized static utterances.
+
+Greetings and tool fillers are fixed per blueprint and voice, so their
+PCM audio is synthesized once, stored under a hash of (text, provider, voice_id,
+model) and played back directly on later calls. On a miss the text is
+synthesized live and the same audio is stored as it plays, for next time.
+Files are written and evicted in a worker thread, the in-memory LRU of decoded
+utterances is only touched on the event loop.
+"""
+
+import asyncio
+import hashlib
+import os
+import struct
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from livekit import rtc
+
+from agent_utils.background_tasks import spawn
+
+UTTERANCE_CACHE_DIR = os.getenv(
+    'UTTERANCE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 '.cache', 'utterances'))
+UTTERANCE_CACHE_MAX_BYTES = int(os.getenv('UTTERANCE_CACHE_MAX_MB', '256')) * 1024 * 1024
+# Decoded utterances kept in memory, the on-disk cache is the source of truth
+UTTERANCE_MEMORY_ENTRIES = int(os.getenv('UTTERANCE_MEMORY_ENTRIES', '64'))
+
+_HEADER = struct.Struct('<4sIH')
+_MAGIC = b'RPCM'
+FRAME_DURATION_MS = 20
+
+CachedAudio = tuple[int, int, bytes]  # sample_rate, num_channels, int16 PCM
+
+
+def voice_signature(voice_config: Mapping[str, Any]) -> tuple[str, str, str]:
+    return (
+        str(voice_config.get('provider', '')).lower(),
+        str(voice_config.get('voice_id') or voice_config.get('voice') or ''),
+        str(voice_config.get('model') or ''),
+    )
+
+
+def utterance_key(text: str, voice_config: Mapping[str, Any]) -> str:
+    provider, voice_id, model = voice_signature(voice_config)
+    payload = '\x1f'.join([text, provider, voice_id, model])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def static_utterances(metadata: Mapping[str, Any]) -> list[str]:
+    """Fixed texts of a blueprint that are worth pre-rendering"""
+    texts = []
+    if metadata.get('firstMessage') and metadata.get('firstMessageMode') == 'assistant-speaks-first':
+        texts.append(metadata['firstMessage'])
+    texts.extend(t for t in (metadata.get('fillerMessages') or {}).values() if t)
+    return texts
+
+
+class UtteranceCache:
+    def __init__(self, directory: str = UTTERANCE_CACHE_DIR,
+                 max_bytes: int = UTTERANCE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict[str, CachedAudio] = OrderedDict()
+        self._rendering: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def contains(self, key: str) -> bool:
+        return key in self._memory or os.path.exists(self._path(key))
+
+    def load(self, key: str) -> Optional[CachedAudio]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            return audio
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                magic, sample_rate, num_channels = _HEADER.unpack(f.read(_HEADER.size))
+                pcm = f.read()
+            # Touch the file so eviction keeps recently played entries
+            os.utime(path)
+        except (OSError, struct.error):
+            return None
+        if magic != _MAGIC:
+            return None
+        audio = (sample_rate, num_channels, pcm)
+        self._remember(key, audio)
+        return audio
+
+    async def store(self, key: str, sample_rate: int, num_channels: int, pcm: bytes):
+        evicted = await asyncio.to_thread(self._write, key, sample_rate, num_channels, pcm)
+        # Back on the loop, which also reads the in-memory entries
+        self._remember(key, (sample_rate, num_channels, pcm))
+        for old in evicted:
+            self._memory.pop(old, None)
+
+    def _write(self, key: str, sample_rate: int, num_channels: int, pcm: bytes) -> list[str]:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, sample_rate, num_channels))
+            f.write(pcm)
+        os.replace(tmp_path, path)
+        return self._evict()
+
+    def _remember(self, key: str, audio: CachedAudio):
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > UTTERANCE_MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> list[str]:
+        """Drop least recently used files until the cache fits in max_bytes, returns their keys"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.pcm'):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name[:-4]))
+            total += stat.st_size
+        entries.sort()
+        evicted = []
+        for _, size, path, key in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            evicted.append(key)
+            total -= size
+        return evicted
+
+    async def render(self, tts, text: str, voice_config: Mapping[str, Any]) -> Optional[CachedAudio]:
+        """Synthesize `text` with `tts` and store it, concurrent renders are shared"""
+        key = utterance_key(text, voice_config)
+        task = self._rendering.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._render(tts, key, text))
+            self._rendering[key] = task
+            task.add_done_callback(lambda _: self._rendering.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _render(self, tts, key: str, text: str) -> Optional[CachedAudio]:
+        chunks = []
+        sample_rate = num_channels = None
+        try:
+            async with tts.synthesize(text) as stream:
+                async for ev in stream:
+                    sample_rate = ev.frame.sample_rate
+                    num_channels = ev.frame.num_channels
+                    chunks.append(bytes(ev.frame.data))
+        except Exception as e:
+            print("[Radiance] ---> Failed to pre-render utterance", e)
+            return None
+        if not chunks:
+            return None
+        pcm = b''.join(chunks)
+        await self.store(key, sample_rate, num_channels, pcm)
+        return sample_rate, num_channels, pcm
+
+    async def synthesize_live(self, tts, text: str, voice_config: Mapping[str, Any]):
+        """Live TTS frames of `text`, stored once all of them have been played.
+
+        An interrupted say() stops iterating early and nothing is stored.
+        """
+        key = utterance_key(text, voice_config)
+        chunks = []
+        sample_rate = num_channels = None
+        async with tts.synthesize(text) as stream:
+            async for ev in stream:
+                sample_rate = ev.frame.sample_rate
+                num_channels = ev.frame.num_channels
+                chunks.append(bytes(ev.frame.data))
+                yield ev.frame
+        if chunks:
+            spawn(self.store(key, sample_rate, num_channels, b''.join(chunks)))
+
+    async def warm(self, tts, metadata: Mapping[str, Any]):
+        """Render the blueprint's static utterances that are not cached yet"""
+        voice_config = metadata['voice']
+        started = time.perf_counter()
+        missing = [t for t in static_utterances(metadata)
+                   if not self.contains(utterance_key(t, voice_config))]
+        for text in missing:
+            await self.render(tts, text, voice_config)
+        if missing:
+            print(f"[Radiance] ---> Pre-rendered {len(missing)} utterances "
+                  f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def preload(self, metadata: Mapping[str, Any]):
+        """Read a blueprint's cached utterances into memory (used from prewarm)"""
+        for text in static_utterances(metadata):
+            self.load(utterance_key(text, metadata['voice']))
+
+
+async def audio_frames(audio: CachedAudio):
+    sample_rate, num_channels, pcm = audio
+    view = memoryview(pcm)
+    samples_per_frame = sample_rate * FRAME_DURATION_MS // 1000
+    frame_bytes = samples_per_frame * num_channels * 2
+    for offset in range(0, len(view), frame_bytes):
+        chunk = view[offset:offset + frame_bytes]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            samples_per_channel=len(chunk) // (2 * num_channels),
+        )
+
+
+def say_cached(session, cache: Optional[UtteranceCache], text: str,
+               voice_config: Mapping[str, Any], **kwargs):
+    """session.say() that plays pre-rendered audio when available.
+
+    On a miss the live TTS audio is teed into the cache while it plays, so the
+    next call with the same text and voice is a cache hit without a second
+    synthesis.
+    """
+    if cache is None:
+        return session.say(text, **kwargs)
+
+    audio = cache.load(utterance_key(text, voice_config))
+    if audio is not None:
+        cache.hits += 1
+        return session.say(text, audio=audio_frames(audio), **kwargs)
+
+    cache.misses += 1
+    if session.tts is None or utterance_key(text, voice_config) in cache._rendering:
+        # Being pre-rendered already, plain live TTS meanwhile
+        return session.say(text, **kwargs)
+    return session.say(text, audio=cache.synthesize_live(session.tts, text, voice_config), **kwargs)
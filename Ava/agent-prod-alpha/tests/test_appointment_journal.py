@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from agent_utils import appointment_journal
+from agent_utils.appointment_journal import AppointmentJournal, idempotency_key
+
+
+def booking(patient_id, time_of_day="10:00"):
+    return {
+        "patient_id": patient_id,
+        "doctor_specialty": "cardiology",
+        "appointment_date": "2030-01-01",
+        "appointment_time": time_of_day,
+        "idempotency_key": idempotency_key(patient_id, "cardiology", "2030-01-01", time_of_day),
+    }
+
+
+class FakeAppointments:
+    def __init__(self):
+        self.batches = []
+        self.reject = set()
+        self.error = None
+
+    async def bulk_write(self, operations, ordered):
+        if self.error is not None:
+            raise self.error
+        keys = [op._filter["idempotency_key"] for op in operations]
+        self.batches.append(keys)
+        errors = [{"index": i, "errmsg": "document failed validation"}
+                  for i, key in enumerate(keys) if key in self.reject]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+@pytest.fixture
+def appointments(monkeypatch):
+    collection = FakeAppointments()
+
+    class FakeDatabase:
+        appointments = collection
+
+    async def connection():
+        return FakeDatabase()
+
+    monkeypatch.setattr(appointment_journal, "get_mongodb_connection", connection)
+    return collection
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return AppointmentJournal(str(tmp_path / "journal.sqlite3"), max_attempts=2, retention=60)
+
+
+def test_duplicate_bookings_collapse(journal):
+    assert journal.append(booking("p1"))
+    assert not journal.append(booking(" P1 "))
+    assert len(journal.pending()) == 1
+
+
+async def test_flush_writes_oldest_first_in_batches(journal, appointments):
+    documents = [booking(f"p{i}") for i in range(5)]
+    for document in documents:
+        journal.append(document)
+    assert await journal.flush() == 5
+    assert appointments.batches == [[d["idempotency_key"] for d in documents]]
+    assert journal.pending() == []
+    assert await journal.flush() == 0
+
+
+async def test_connection_errors_are_not_counted(journal, appointments):
+    journal.append(booking("p1"))
+    appointments.error = AutoReconnect("down")
+    for _ in range(3):
+        with pytest.raises(AutoReconnect):
+            await journal.flush()
+    assert len(journal.pending()) == 1
+    assert journal.dead_letters() == []
+
+
+async def test_rejected_booking_is_dead_lettered(journal, appointments):
+    good, bad = booking("p1"), booking("p2")
+    journal.append(good)
+    journal.append(bad)
+    appointments.reject.add(bad["idempotency_key"])
+
+    await journal.flush()
+    assert [key for key, _ in journal.pending()] == [bad["idempotency_key"]]
+    await journal.flush()
+    assert journal.pending() == []
+    assert journal.pending_for_patient("p2") == []
+    (dead,) = journal.dead_letters()
+    assert dead["document"]["patient_id"] == "p2"
+    assert dead["attempts"] == 2
+
+
+async def test_purge_deletes_only_old_flushed_entries(journal, appointments):
+    journal.append(booking("p1"))
+    await journal.flush()
+    journal.append(booking("p2"))
+    assert journal.purge(time.time() - 60) == 0
+    assert journal.purge(time.time() + 1) == 1
+    assert len(journal.pending()) == 1
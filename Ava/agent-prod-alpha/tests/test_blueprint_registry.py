@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+
+from agent_utils.blueprint_registry import BlueprintRegistry
+from agent_utils.model_providers import ProviderMappings
+
+
+def write_blueprint(path, agent_id, model="gpt-4o"):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "id": agent_id,
+            "model": {"provider": "openai", "model": model, "messages": []},
+            "voice": {"provider": "elevenlabs", "voice_id": "v1"},
+            "transcriber": {"provider": "deepgram", "model": "nova-3"},
+        }, f)
+    # Make sure the next scan sees a new signature
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_changed_id_unregisters_the_old_one(tmp_path):
+    path = tmp_path / "clinic.json"
+    write_blueprint(path, "clinic-a")
+    registry = BlueprintRegistry(str(tmp_path), reload_interval=0)
+    old = registry.get("clinic-a")
+    assert old is not None
+
+    write_blueprint(path, "clinic-b", model="gpt-4o-mini")
+    assert registry.get("clinic-b") is not None
+    assert registry.get("clinic-a") is None
+    assert registry.get_by_hash(old.content_hash) is None
+
+
+def test_removed_file_keeps_ids_of_other_files(tmp_path):
+    write_blueprint(tmp_path / "a.json", "shared")
+    registry = BlueprintRegistry(str(tmp_path), reload_interval=0)
+    assert registry.get("shared").source.endswith("a.json")
+
+    # Another file takes over the id, removing the first one must not drop it
+    write_blueprint(tmp_path / "b.json", "shared", model="gpt-4o-mini")
+    registry.reload()
+    os.remove(tmp_path / "a.json")
+    assert registry.get("shared").source.endswith("b.json")
+
+
+def test_edited_file_is_picked_up(tmp_path):
+    path = tmp_path / "clinic.json"
+    write_blueprint(path, "clinic")
+    registry = BlueprintRegistry(str(tmp_path), reload_interval=0)
+    write_blueprint(path, "clinic", model="gpt-4o-mini")
+    assert registry.get("clinic").data["model"]["model"] == "gpt-4o-mini"
+
+
+def test_inline_blueprint_with_unloaded_provider_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(ProviderMappings, "_loaded", {})
+    write_blueprint(tmp_path / "default.json", "default")
+    registry = BlueprintRegistry(str(tmp_path), reload_interval=0)
+    default = registry.get("default")
+    inline = {
+        "model": {"provider": "groq", "model": "llama", "messages": []},
+        "voice": {"provider": "elevenlabs", "voice_id": "v1"},
+        "transcriber": {"provider": "deepgram", "model": "nova-3"},
+    }
+    resolved = []
+    # Jobs resolve their blueprint off the main thread, where plugins can't be imported
+    thread = threading.Thread(target=lambda: resolved.append(registry.resolve(json.dumps(inline))))
+    thread.start()
+    thread.join()
+    assert resolved[0] is default
+
+    # On the main thread the plugins can still be imported on first use
+    assert registry.resolve(json.dumps(inline)).data["model"]["provider"] == "groq"
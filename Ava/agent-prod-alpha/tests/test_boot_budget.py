@@ -0,0 +1,36 @@
+"""
+Worker boot budget: importing agent.py (what the worker and every job process
+do at boot, provider plugin preload included) must stay within
+BOOT_BUDGET_SECONDS and BOOT_BUDGET_RSS_MB. benchmarks/boot_budget.py prints
+the per-plugin breakdown.
+"""
+
+import os
+import statistics
+
+import pytest
+
+# agent.py needs the LiveKit plugins it imports at module level
+pytest.importorskip("livekit.plugins.silero")
+pytest.importorskip("livekit.plugins.turn_detector")
+
+from boot_budget import boot_once
+
+BOOT_BUDGET_SECONDS = float(os.getenv('BOOT_BUDGET_SECONDS', '8.0'))
+BOOT_BUDGET_RSS_MB = float(os.getenv('BOOT_BUDGET_RSS_MB', '700'))
+BOOT_BUDGET_RUNS = int(os.getenv('BOOT_BUDGET_RUNS', '3'))
+
+
+@pytest.fixture(scope="module")
+def boots():
+    return [boot_once() for _ in range(BOOT_BUDGET_RUNS)]
+
+
+def test_boot_time_within_budget(boots):
+    seconds = statistics.median(run["seconds"] for run in boots)
+    assert seconds <= BOOT_BUDGET_SECONDS, f"boot took {seconds:.2f}s, budget {BOOT_BUDGET_SECONDS:.2f}s"
+
+
+def test_boot_rss_within_budget(boots):
+    rss = statistics.median(run["rss_mb"] for run in boots)
+    assert rss <= BOOT_BUDGET_RSS_MB, f"RSS after boot {rss:.0f}MB, budget {BOOT_BUDGET_RSS_MB:.0f}MB"
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agent_utils import connection_warmup
+from agent_utils.connection_warmup import wait_for_participant_warm
+
+
+class FakeCache:
+    def __init__(self):
+        self.leases = 0
+
+    def acquire(self, metadata):
+        self.leases += 1
+        return "key", {"llm": object(), "tts": object(), "stt": object()}
+
+    def release(self, key):
+        self.leases -= 1
+
+
+class FakeContext:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def wait_for_participant(self):
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return "participant"
+
+
+@pytest.fixture
+def slow_warm_up(monkeypatch):
+    finished = asyncio.Event()
+
+    async def warm_up(providers):
+        await asyncio.sleep(0.2)
+        finished.set()
+
+    monkeypatch.setattr(connection_warmup, "warm_up_providers", warm_up)
+    return finished
+
+
+async def test_returns_without_waiting_for_warm_up(slow_warm_up):
+    cache = FakeCache()
+    ready = []
+    participant, key, providers = await asyncio.wait_for(
+        wait_for_participant_warm(FakeContext(), cache, {}, on_ready=ready.append), timeout=0.1)
+    assert (participant, key, cache.leases) == ("participant", "key", 1)
+    assert ready == [providers]
+    assert not slow_warm_up.is_set()
+    await asyncio.wait_for(slow_warm_up.wait(), timeout=1)
+
+
+async def test_releases_lease_when_participant_wait_fails(slow_warm_up):
+    cache = FakeCache()
+    with pytest.raises(RuntimeError):
+        await wait_for_participant_warm(FakeContext(RuntimeError("room closed")), cache, {})
+    assert cache.leases == 0
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
+
+from agent_utils.context_compaction import ContextCompactor
+
+
+class FakeStream:
+    def __init__(self, text):
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        yield SimpleNamespace(delta=SimpleNamespace(content=self._text))
+
+
+class FakeLLM:
+    def __init__(self, text):
+        self.text = text
+        self.requests = []
+
+    def chat(self, chat_ctx):
+        self.requests.append(chat_ctx)
+        return FakeStream(self.text)
+
+
+def conversation(turns: int, tool_output: str = "Patient found") -> ChatContext:
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content="You are the clinic assistant.", id="instructions")
+    for i in range(turns):
+        chat_ctx.add_message(role="user", content=f"question {i}", id=f"user_{i}")
+        chat_ctx.items.append(FunctionCall(id=f"call_{i}", call_id=f"c{i}", name="patient_lookup",
+                                           arguments=f'{{"patient_id": "{i}"}}'))
+        chat_ctx.items.append(FunctionCallOutput(id=f"output_{i}", call_id=f"c{i}", name="patient_lookup",
+                                                 output=tool_output, is_error=False))
+        chat_ctx.add_message(role="assistant", content=f"answer {i}", id=f"assistant_{i}")
+    return chat_ctx
+
+
+def ids(chat_ctx: ChatContext) -> list[str]:
+    return [item.id for item in chat_ctx.items]
+
+
+def test_compact_keeps_prefix_and_recent_turns_and_condenses_old_tool_outputs():
+    compactor = ContextCompactor(keep_turns=2, token_ceiling=100_000)
+    compacted = compactor.compact(conversation(4, tool_output="record " * 200))
+
+    # Without a summary nothing is dropped under the ceiling
+    assert ids(compacted) == ids(conversation(4))
+    outputs = [item.output for item in compacted.items if item.type == "function_call_output"]
+    assert [output.endswith("[condensed]") for output in outputs] == [True, True, False, False]
+
+
+def test_trimming_to_the_ceiling_never_splits_tool_pairs():
+    chat_ctx = conversation(6, tool_output="record " * 40)
+    compactor = ContextCompactor(keep_turns=2, token_ceiling=200)
+    compacted = compactor.compact(chat_ctx)
+
+    assert compactor.stats.trimmed_requests == 1
+    assert compacted.items[0].id == "instructions"
+    # Whole turns are dropped, oldest first, so the newest one is complete
+    assert ids(compacted)[-4:] == ["user_5", "call_5", "output_5", "assistant_5"]
+    calls = {item.call_id for item in compacted.items if item.type == "function_call"}
+    outputs = {item.call_id for item in compacted.items if item.type == "function_call_output"}
+    assert calls == outputs
+    assert len(compacted.items) < len(chat_ctx.items)
+
+
+async def test_finished_summary_replaces_the_folded_turns():
+    chat_ctx = conversation(5)
+    llm = FakeLLM("Caller asked five questions about patient records.")
+    compactor = ContextCompactor(keep_turns=2, token_ceiling=100_000)
+    compactor.schedule(chat_ctx, llm)
+    await compactor._task
+
+    assert "question 0" in llm.requests[0].items[-1].text_content
+    compacted = compactor.compact(chat_ctx)
+    assert ids(compacted)[:2] == ["instructions", "context_summary_1"]
+    assert "five questions" in compacted.items[1].text_content
+    # The turns folded into the summary are gone, the last keep_turns stay verbatim
+    assert ids(compacted)[2:] == [item.id for item in chat_ctx.items if item.id.endswith(("_3", "_4"))]
+    assert compactor.stats.summaries == 1
+
+
+async def test_short_conversation_is_not_summarized():
+    llm = FakeLLM("summary")
+    compactor = ContextCompactor(keep_turns=2)
+    compactor.schedule(conversation(2), llm)
+    assert compactor._task is None
+    assert llm.requests == []
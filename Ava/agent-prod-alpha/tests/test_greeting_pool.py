@@ -0,0 +1,75 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agent_utils import greeting_pool
+from agent_utils.greeting_pool import GreetingPool
+from agent_utils.utterance_cache import UtteranceCache
+
+VOICE_A = {"provider": "elevenlabs", "voice_id": "a"}
+VOICE_B = {"provider": "cartesia", "voice_id": "b"}
+
+
+class FakeStream:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        yield SimpleNamespace(frame=SimpleNamespace(data=b"\x00\x00" * 480, sample_rate=24000, num_channels=1))
+
+
+class FakeTTS:
+    def synthesize(self, text):
+        return FakeStream()
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    counter = itertools.count(1)
+    texts = []
+
+    async def generate(llm, metadata, blueprint_hash=None):
+        texts.append(f"greeting {next(counter)}")
+        return texts[-1]
+
+    monkeypatch.setattr(greeting_pool, "generate_greeting", generate)
+    return texts
+
+
+async def filled_pool(directory, voice, size=2):
+    pool = GreetingPool(UtteranceCache(directory), size=size, refill_interval=60)
+    await pool.fill("bp", {"voice": voice}, None, FakeTTS())
+    return pool
+
+
+async def test_taken_greeting_is_not_served_after_restart(tmp_path, generated):
+    pool = await filled_pool(str(tmp_path), VOICE_A)
+    text, _ = pool.take("bp", VOICE_A)
+    await asyncio.sleep(0.05)
+
+    restarted = GreetingPool(UtteranceCache(str(tmp_path)), size=2)
+    assert restarted.take("bp", VOICE_A)[0] != text
+    assert restarted.take("bp", VOICE_A) is None
+
+
+async def test_pools_are_kept_per_voice(tmp_path, generated):
+    pool = await filled_pool(str(tmp_path), VOICE_A)
+    assert pool.take("bp", VOICE_B) is None
+    await pool.fill("bp", {"voice": VOICE_B}, None, FakeTTS())
+    assert pool.take("bp", VOICE_B) is not None
+    assert pool.take("bp", VOICE_A) is not None
+
+
+async def test_refill_is_debounced(tmp_path, generated):
+    pool = await filled_pool(str(tmp_path), VOICE_A)
+    assert len(generated) == 2
+    pool.take("bp", VOICE_A)
+    assert pool.fill("bp", {"voice": VOICE_A}, None, FakeTTS()) is None
+    assert len(generated) == 2
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from livekit.agents import APIConnectionError, llm
+from livekit.agents.llm import ChatChunk, ChoiceDelta
+
+from agent_utils.hedged_llm import HedgedLLM, provider_health
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FailingStream(FakeStream):
+    async def __anext__(self):
+        chunk = await super().__anext__()
+        if chunk.delta.content is None:
+            raise APIConnectionError("connection reset")
+        return chunk
+
+
+class FakeLLM(llm.LLM):
+    def __init__(self, *texts, stream_class=FakeStream):
+        super().__init__()
+        self._texts = texts
+        self._stream_class = stream_class
+        self.requests = 0
+
+    def chat(self, **kwargs):
+        self.requests += 1
+        return self._stream_class([ChatChunk(id="1", delta=ChoiceDelta(role="assistant", content=text))
+                                   for text in self._texts])
+
+
+async def reply(hedged):
+    parts = []
+    async with hedged.chat(chat_ctx=llm.ChatContext()) as stream:
+        async for chunk in stream:
+            parts.append(chunk.delta.content)
+    return "".join(parts)
+
+
+async def test_empty_first_stream_fails_over():
+    hedged = HedgedLLM([("test-empty", FakeLLM()), ("test-backup", FakeLLM("Hello", " there"))])
+    assert await reply(hedged) == "Hello there"
+    assert provider_health("test-empty").failures == 1
+    assert provider_health("test-backup").hedges_won == 1
+
+
+async def test_all_empty_streams_raise():
+    hedged = HedgedLLM([("test-empty-a", FakeLLM()), ("test-empty-b", FakeLLM())])
+    with pytest.raises(Exception, match="all LLM providers failed"):
+        await reply(hedged)
+
+
+async def test_mid_stream_error_is_not_retried():
+    # The second chunk fails after the first one was sent
+    flaky = FakeLLM("Hello", None, stream_class=FailingStream)
+    hedged = HedgedLLM([("test-flaky", flaky)])
+    parts = []
+    with pytest.raises(APIConnectionError) as raised:
+        async with hedged.chat(chat_ctx=llm.ChatContext()) as stream:
+            async for chunk in stream:
+                parts.append(chunk.delta.content)
+    assert not raised.value.retryable
+    assert parts == ["Hello"]
+    assert flaky.requests == 1
@@ -0,0 +1,26 @@
+import json
+
+from agent_utils.jsonl_log import append_jsonl
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rotates_before_exceeding_the_size_cap(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    for i in range(5):
+        append_jsonl(path, [{"i": i, "pad": "x" * 40}], max_bytes=120, backups=2)
+
+    assert [r["i"] for r in read(path)] == [4]
+    assert [r["i"] for r in read(path + ".1")] == [2, 3]
+    assert [r["i"] for r in read(path + ".2")] == [0, 1]
+    assert not (tmp_path / "log.jsonl.3").exists()
+
+
+def test_no_backups_starts_over(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    append_jsonl(path, [{"i": 0, "pad": "x" * 100}], max_bytes=120, backups=0)
+    append_jsonl(path, [{"i": 1, "pad": "x" * 100}], max_bytes=120, backups=0)
+    assert [r["i"] for r in read(path)] == [1]
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from agent_utils import model_providers
+from agent_utils.model_providers import (
+    ProviderMappings,
+    boot_providers,
+    provider_label,
+    referenced_providers,
+)
+
+BLUEPRINT = {
+    "model": {"provider": "OpenAI", "model": "gpt-4o", "fallbacks": [{"provider": "groq", "model": "llama"}]},
+    "voice": {"provider": "elevenlabs", "voice_id": "v1", "candidates": [{"provider": "cartesia"}]},
+    "transcriber": {"provider": "deepgram", "model": "nova-3"},
+}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(ProviderMappings, "_modules", dict(ProviderMappings._modules))
+    monkeypatch.setattr(ProviderMappings, "_loaded", {})
+    monkeypatch.setattr(ProviderMappings, "import_report", {})
+    return ProviderMappings
+
+
+def test_referenced_providers_include_alternatives():
+    assert referenced_providers([BLUEPRINT]) == ["OpenAI", "groq", "elevenlabs", "cartesia", "deepgram"]
+
+
+def test_boot_providers_adds_preload_list(monkeypatch, registry):
+    monkeypatch.setattr(model_providers, "PRELOAD_PROVIDERS", " upliftai, ")
+    assert boot_providers([])[-1:] == ["upliftai"]
+    monkeypatch.setattr(model_providers, "PRELOAD_PROVIDERS", "all")
+    assert set(boot_providers([])) == set(registry.providers())
+
+
+def test_provider_label():
+    assert provider_label(BLUEPRINT["model"]) == "openai/gpt-4o"
+    assert provider_label(BLUEPRINT["voice"]) == "elevenlabs/v1"
+
+
+def test_plugins_import_lazily_on_the_main_thread(registry):
+    registry.register("fake", "json")
+    assert registry.get_provider("FAKE").__name__ == "json"
+    assert "json" in registry.import_report
+    assert registry.get_provider("unknown") is None
+
+
+def test_plugin_not_preloaded_fails_off_the_main_thread(registry):
+    registry.register("fake", "json")
+    errors = []
+
+    def job():
+        try:
+            registry.get_provider("fake")
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    thread.join()
+    assert "PRELOAD_PROVIDERS" in str(errors[0])
+
+    # Preloaded plugins are served to any thread
+    registry.preload(["fake"])
+    thread = threading.Thread(target=job)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
@@ -0,0 +1,69 @@
+from agent_utils.patient_renderer import (
+    RenderStats,
+    estimate_tokens,
+    render_patient,
+    render_patient_for_voice,
+    truncate_to_tokens,
+)
+
+PATIENT = {
+    "full_name": "Ayesha Khan",
+    "patient_id": "1001",
+    "date_of_birth": "1980-05-01",
+    "test_report": "Blood pressure is slightly high. Cholesterol is normal. " * 10,
+    "doctors_prescription": [
+        {"date": "2024-01-01", "medications": [{"medicine_name": "Old medicine"}],
+         "special_instructions": "Outdated."},
+        {"date": "2024-06-01", "medications": [
+            {"medicine_name": "Amlodipine", "dosage": "5mg", "frequency": "once daily", "duration": "30 days"}],
+         "special_instructions": "Take after breakfast.", "lifestyle_recommendations": "Walk daily."},
+    ],
+}
+
+
+def test_short_text_is_kept_whole():
+    assert truncate_to_tokens("  Take   after breakfast. ", 50) == "Take after breakfast."
+
+
+def test_cut_at_sentence_boundary():
+    text = "First sentence here. Second sentence here. " * 20
+    result = truncate_to_tokens(text, 30)
+    assert result.endswith("here. (shortened)")
+    assert estimate_tokens(result) <= 30
+
+
+def test_unbreakable_text_is_hard_cut_to_the_budget():
+    result = truncate_to_tokens("x" * 5000, 20)
+    assert result.startswith("xxx")
+    assert result.endswith("(shortened)")
+    assert estimate_tokens(result) <= 20
+
+
+def test_long_first_sentence_is_cut_at_a_word():
+    result = truncate_to_tokens("word " * 500, 20)
+    assert result.endswith("word (shortened)")
+    assert estimate_tokens(result) <= 20
+
+
+def test_render_prioritizes_newest_prescription():
+    text = render_patient_for_voice(PATIENT, budget=300)
+    lines = text.split("\n")
+    assert lines[0] == "Patient Ayesha Khan, ID 1001, born 1980-05-01."
+    assert lines[1].startswith("Current medicines: Amlodipine, 5mg, once daily, for 30 days.")
+    assert lines[2] == "Special instructions: Take after breakfast."
+    assert "Outdated" not in text
+    # Medicines of older prescriptions are never read out as current
+    assert "Old medicine" not in lines[1]
+    assert lines[-1] == "Previous medicines: Old medicine."
+
+
+def test_render_stays_within_budget():
+    assert estimate_tokens(render_patient_for_voice(PATIENT, budget=60)) <= 60 + 5
+
+
+def test_render_is_memoized_and_counted():
+    stats = RenderStats()
+    first = render_patient(PATIENT, stats)
+    assert render_patient(PATIENT, stats) == first
+    assert stats.rendered == 2
+    assert stats.compact_tokens < stats.baseline_tokens
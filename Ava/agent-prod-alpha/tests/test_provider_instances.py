@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agent_utils import provider_instances
+from agent_utils.provider_instances import ProviderInstanceCache
+
+
+class FakeInstance:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def blueprint(llm_model="gpt-4o"):
+    return {
+        "model": {"provider": "openai", "model": llm_model, "messages": [{"role": "system", "content": "hi"}]},
+        "voice": {"provider": "elevenlabs", "voice_id": "v1"},
+        "transcriber": {"provider": "deepgram", "model": "nova-3"},
+    }
+
+
+@pytest.fixture
+def created(monkeypatch):
+    built = []
+
+    def create(metadata):
+        instances = {"llm": FakeInstance(), "tts": FakeInstance(), "stt": FakeInstance()}
+        built.append(instances)
+        return instances
+
+    monkeypatch.setattr(provider_instances, "create_provider_instances", create)
+    return built
+
+
+def test_fingerprint_ignores_prompts_and_provider_case():
+    other = blueprint()
+    other["model"]["messages"] = []
+    other["voice"]["provider"] = "ElevenLabs"
+    assert provider_instances.provider_fingerprint(blueprint()) == provider_instances.provider_fingerprint(other)
+    assert provider_instances.provider_fingerprint(blueprint("gpt-4o-mini")) != \
+        provider_instances.provider_fingerprint(blueprint())
+
+
+def test_hits_reuse_instances(created):
+    cache = ProviderInstanceCache(max_size=2)
+    first = cache.get_or_create(blueprint())
+    assert cache.get_or_create(blueprint()) is first
+    assert (cache.hits, cache.misses, len(created)) == (1, 1, 1)
+
+
+async def test_lru_evicts_and_closes_least_recently_used(created):
+    cache = ProviderInstanceCache(max_size=2)
+    a = cache.get_or_create(blueprint("a"))
+    cache.get_or_create(blueprint("b"))
+    cache.get_or_create(blueprint("a"))
+    cache.get_or_create(blueprint("c"))
+    await asyncio.sleep(0)
+    # "b" was least recently used
+    assert cache.get_or_create(blueprint("a")) is a
+    assert all(instance.closed for instance in created[1].values())
+    assert not any(instance.closed for instance in a.values())
+
+
+async def test_leased_entry_closed_only_after_release(created):
+    cache = ProviderInstanceCache(max_size=1)
+    key, leased = cache.acquire(blueprint("a"))
+    cache.acquire(blueprint("a"))
+    cache.get_or_create(blueprint("b"))
+    await asyncio.sleep(0)
+    assert not any(instance.closed for instance in leased.values())
+
+    cache.release(key)
+    await asyncio.sleep(0)
+    assert not any(instance.closed for instance in leased.values())
+
+    cache.release(key)
+    await asyncio.sleep(0)
+    assert all(instance.closed for instance in leased.values())
+
+
+async def test_aclose_closes_cached_and_evicted(created):
+    cache = ProviderInstanceCache(max_size=1)
+    cache.acquire(blueprint("a"))
+    cache.get_or_create(blueprint("b"))
+    await cache.aclose()
+    assert all(instance.closed for instances in created for instance in instances.values())
+
+
+async def test_every_entry_evicted_under_lease_is_closed(created):
+    cache = ProviderInstanceCache(max_size=1)
+    key, first = cache.acquire(blueprint("a"))
+    cache.get_or_create(blueprint("b"))
+    # Re-acquired after eviction, then evicted again while both are leased
+    _, second = cache.acquire(blueprint("a"))
+    cache.get_or_create(blueprint("b"))
+    assert second is not first
+
+    cache.release(key)
+    cache.release(key)
+    await asyncio.sleep(0)
+    assert all(instance.closed for instances in (first, second) for instance in instances.values())
@@ -0,0 +1,56 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agent_utils.provider_router import ProviderRouter
+from agent_utils.stt_availability import track_stt_fallback
+
+
+class Emitter:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, ev):
+        self.handlers[event](ev)
+
+
+def eou(delay):
+    return SimpleNamespace(metrics=SimpleNamespace(type="eou_metrics", transcription_delay=delay))
+
+
+def router(tmp_path):
+    return ProviderRouter(str(tmp_path / "router.sqlite3"), str(tmp_path / "decisions.jsonl"))
+
+
+def test_streamed_stt_is_measured_by_transcription_delay(tmp_path):
+    provider_router = router(tmp_path)
+    primary, backup, adapter, session = object(), object(), Emitter(), Emitter()
+    track_stt_fallback(adapter, [("router-primary/stt", primary), ("router-backup/stt", backup)])
+    provider_router.attach_session(session, ["router-primary/stt", "router-backup/stt"])
+
+    for _ in range(6):
+        session.emit("metrics_collected", eou(0.2))
+    adapter.emit("stt_availability_changed", SimpleNamespace(stt=primary, available=False))
+    session.emit("metrics_collected", eou(0.6))
+
+    assert provider_router.stats("stt:router-primary/stt").samples() == pytest.approx(6)
+    assert provider_router.stats("stt:router-backup/stt").samples() == pytest.approx(1)
+    index, reason, _ = provider_router.choose("stt", [{"provider": "router-primary", "model": "stt"},
+                                                      {"provider": "router-backup", "model": "stt"}])
+    assert (index, reason) in ((0, "fastest"), (1, "explore"))
+
+
+async def test_route_logs_decisions(tmp_path):
+    provider_router = router(tmp_path)
+    metadata = {"model": {"provider": "openai", "model": "gpt-4o",
+                          "candidates": [{"provider": "groq", "model": "llama"}]}}
+    routed = await provider_router.route(metadata, room="room-1")
+    assert routed["model"]["provider"] in ("openai", "groq")
+
+    provider_router._log_decisions([{"room": "room-2"}])
+    rooms = [json.loads(line)["room"] for line in (tmp_path / "decisions.jsonl").read_text().splitlines()]
+    assert "room-2" in rooms
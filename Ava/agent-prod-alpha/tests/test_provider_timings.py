@@ -0,0 +1,74 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agent_utils.provider_timings import (
+    STANDIN_PROVIDER,
+    TimingRecorder,
+    load_timings,
+    replay_config,
+)
+from agent_utils.stt_availability import track_stt_fallback
+
+
+class Emitter:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, ev):
+        self.handlers[event](ev)
+
+
+def eou(delay):
+    return SimpleNamespace(metrics=SimpleNamespace(type="eou_metrics", transcription_delay=delay))
+
+
+def test_transcription_delay_is_credited_to_the_serving_stt(tmp_path):
+    recorder = TimingRecorder(str(tmp_path / "timings.jsonl"))
+    primary, backup, adapter, session = object(), object(), Emitter(), Emitter()
+    track_stt_fallback(adapter, [("deepgram/nova-3", primary), ("assemblyai/best", backup)])
+    recorder.attach_session(session, ["deepgram/nova-3", "assemblyai/best"])
+
+    session.emit("metrics_collected", eou(0.2))
+    adapter.emit("stt_availability_changed", SimpleNamespace(stt=primary, available=False))
+    session.emit("metrics_collected", eou(0.3))
+    adapter.emit("stt_availability_changed", SimpleNamespace(stt=backup, available=False))
+    session.emit("metrics_collected", eou(0.4))
+
+    assert [(r["label"], r["transcription_delay"]) for r in recorder._pending] == [
+        ("deepgram/nova-3", 0.2), ("assemblyai/best", 0.3), ("deepgram/nova-3", 0.4)]
+
+
+def test_load_timings_reads_rotated_files_oldest_first(tmp_path):
+    path = tmp_path / "timings.jsonl"
+    for name, ttft in (("timings.jsonl.2", 0.1), ("timings.jsonl.1", 0.2), ("timings.jsonl", 0.3)):
+        (tmp_path / name).write_text(json.dumps({"kind": "llm", "label": "openai/gpt-4o", "ttft": ttft}) + "\n")
+    assert [r["ttft"] for r in load_timings(str(path))[("llm", "openai/gpt-4o")]] == [0.1, 0.2, 0.3]
+
+
+def test_replay_config_of_each_kind():
+    llm = replay_config("llm", "openai/gpt-4o", [
+        {"ttft": 0.5, "duration": 1.5, "completion_tokens": 50},
+        {"ttft": 0.6, "duration": 1.6, "completion_tokens": 0},
+    ])
+    assert llm == {"provider": STANDIN_PROVIDER, "model": "openai/gpt-4o",
+                   "ttft": {"dist": "replay", "samples": [0.5, 0.6]},
+                   "completion_tokens": {"dist": "replay", "samples": [50, 0]},
+                   "tokens_per_second": 50.0}
+
+    tts = replay_config("tts", "cartesia/sonic-2", [
+        {"ttfb": 0.2, "duration": 0.7, "audio_duration": 5.0, "characters": 75},
+    ])
+    assert tts["voice_id"] == "cartesia/sonic-2"
+    assert tts["ttfb"] == {"dist": "replay", "samples": [0.2]}
+    assert tts["chars_per_second"] == 15.0
+    assert tts["realtime_factor"] == pytest.approx(0.1)
+
+    # Streamed STT only has transcription delays
+    stt = replay_config("stt", "deepgram/nova-3", [{"transcription_delay": 0.3}])
+    assert stt == {"provider": STANDIN_PROVIDER, "model": "deepgram/nova-3",
+                   "latency": {"dist": "replay", "samples": [0.3]}}
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from agent_utils.session_metrics import MetricsExporter
+
+
+def sample(name, agent):
+    return REGISTRY.get_sample_value(name, {"agent": agent}) or 0
+
+
+def llm_metrics(speech_id="s1"):
+    return SimpleNamespace(type="llm_metrics", prompt_tokens=100, prompt_cached_tokens=80, completion_tokens=20,
+                           duration=0.8, ttft=0.3, speech_id=speech_id)
+
+
+async def test_flush_exports_counters_and_summaries(tmp_path):
+    exporter = MetricsExporter(jsonl_path=str(tmp_path / "metrics.jsonl"), interval=60)
+    metrics = exporter.session("room-1", agent="test-export")
+    assert sample("voice_active_sessions", "test-export") == 1
+
+    metrics.record(llm_metrics())
+    assert sample("voice_llm_ttft_seconds_count", "test-export") == 1
+    await exporter.flush()
+    metrics.record(llm_metrics("s2"))
+    await exporter.close_session("room-1")
+    await exporter.aclose()
+
+    # Only the increments since the previous flush are pushed
+    assert sample("voice_llm_prompt_tokens_total", "test-export") == 200
+    assert sample("voice_active_sessions", "test-export") == 0
+    assert "room-1" not in exporter.sessions
+    assert len((tmp_path / "metrics.jsonl").read_text().splitlines()) == 2
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from agent_utils.slot_index import SlotIndex
+
+NOW = datetime(2030, 1, 1, 11, 10)
+
+
+@pytest.fixture
+def index():
+    index = SlotIndex(slot_minutes=30, opens="09:00", closes="17:00")
+    index.rebuild([
+        {"doctor_specialty": "Cardiology", "appointment_date": "2030-01-02", "appointment_time": "10:00",
+         "idempotency_key": "k1"},
+    ])
+    return index
+
+
+def test_overlapping_slots_conflict(index):
+    assert not index.is_free("cardiology", "2030-01-02", "10:00", now=NOW)
+    assert not index.is_free("  CARDIOLOGY ", "2030-01-02", "10:29", now=NOW)
+    assert not index.is_free("cardiology", "2030-01-02", "09:31", now=NOW)
+    assert index.is_free("cardiology", "2030-01-02", "10:30", now=NOW)
+    assert index.is_free("cardiology", "2030-01-02", "09:30", now=NOW)
+    assert index.is_free("neurology", "2030-01-02", "10:00", now=NOW)
+
+
+def test_outside_opening_hours_is_not_free(index):
+    assert not index.is_free("cardiology", "2030-01-02", "08:30", now=NOW)
+    assert not index.is_free("cardiology", "2030-01-02", "16:45", now=NOW)
+
+
+def test_reserve_is_idempotent_per_key(index):
+    assert index.reserve("cardiology", "2030-01-02", "11:00", "k2", now=NOW)
+    assert index.reserve("cardiology", "2030-01-02", "11:00", "k2", now=NOW)
+    assert not index.reserve("cardiology", "2030-01-02", "11:15", "k3", now=NOW)
+    index.release("cardiology", "2030-01-02", "11:00")
+    assert index.reserve("cardiology", "2030-01-02", "11:15", "k3", now=NOW)
+
+
+def test_local_reservations_survive_a_rebuild(index):
+    index.reserve("cardiology", "2030-01-03", "09:00", "k2", now=NOW)
+    index.rebuild([])
+    assert index.holder("cardiology", "2030-01-03", "09:00") == "k2"
+
+
+def test_past_slots_are_never_free(index):
+    assert index.is_past("2030-01-01", "11:00", now=NOW)
+    assert index.is_past("2029-12-31", "15:00", now=NOW)
+    assert not index.is_past("2030-01-01", "11:30", now=NOW)
+    assert not index.is_free("cardiology", "2030-01-01", "09:00", now=NOW)
+    assert not index.reserve("cardiology", "2029-12-31", "15:00", "k2", now=NOW)
+
+
+def test_nearest_free_skips_the_past(index):
+    assert index.nearest_free("cardiology", "2030-01-01", "10:00", count=3, now=NOW) == [
+        ("2030-01-01", "11:30"), ("2030-01-01", "12:00"), ("2030-01-01", "12:30")]
+    # A date in the past starts the search today
+    assert index.nearest_free("cardiology", "2029-12-20", "16:00", count=1, now=NOW) == [("2030-01-01", "16:00")]
+
+
+def test_nearest_free_prefers_closest_times_on_the_same_day(index):
+    index.reserve("cardiology", "2030-01-02", "16:30", "k2", now=NOW)
+    assert index.nearest_free("cardiology", "2030-01-02", "16:30", count=2, now=NOW) == [
+        ("2030-01-02", "16:00"), ("2030-01-02", "15:30")]
+
+
+def test_without_hours_only_the_same_slot_conflicts():
+    index = SlotIndex(slot_minutes=30, opens=None, closes=None)
+    assert index.reserve("cardiology", "2030-01-02", "10:00", "k1", now=NOW)
+    assert not index.is_free("cardiology", "2030-01-02", "10:00", now=NOW)
+    # Neither opening hours nor the spacing of bookings are enforced
+    assert index.reserve("cardiology", "2030-01-02", "10:15", "k2", now=NOW)
+    assert index.is_free("cardiology", "2030-01-02", "07:00", now=NOW)
+    assert index.is_free("cardiology", "2030-01-02", "23:45", now=NOW)
+    assert index.nearest_free("cardiology", "2030-01-02", "10:00", count=2, now=NOW) == [
+        ("2030-01-02", "09:30"), ("2030-01-02", "10:30")]
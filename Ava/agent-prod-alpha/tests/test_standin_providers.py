@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from standin_providers import Distribution, parse_distribution
+
+
+@pytest.mark.parametrize(("spec", "expected"), [
+    (None, {"dist": "constant", "value": 0.0}),
+    (0.25, {"dist": "constant", "value": 0.25}),
+    ("0.3", {"dist": "constant", "value": 0.3}),
+    ("constant:0.5", {"dist": "constant", "value": 0.5}),
+    ("uniform:0.1:0.3", {"dist": "uniform", "low": 0.1, "high": 0.3}),
+    ("lognormal:0.4:1.2", {"dist": "lognormal", "p50": 0.4, "p95": 1.2}),
+    ('{"dist": "replay", "samples": [1, "2"]}', {"dist": "replay", "samples": [1.0, 2.0]}),
+])
+def test_parses_specs(spec, expected):
+    assert parse_distribution(spec) == expected
+
+
+@pytest.mark.parametrize("spec", [
+    "uniform:0.1",
+    "gamma:1:2",
+    {"dist": "lognormal", "p50": 0, "p95": 1},
+    {"dist": "uniform", "low": 0.1},
+    {"dist": "replay", "samples": []},
+])
+def test_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_distribution(spec)
+
+
+def test_replay_samples_in_order():
+    distribution = Distribution({"dist": "replay", "samples": [0.1, 0.2]})
+    assert [distribution.sample() for _ in range(3)] == [0.1, 0.2, 0.1]
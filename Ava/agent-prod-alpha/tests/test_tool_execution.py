@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from agent_utils import function_tools
+from agent_utils.slot_index import SlotIndex
+from agent_utils.tool_execution import run_with_filler
+
+
+class FakeSpeech:
+    def __init__(self):
+        self.interrupted = False
+
+    def done(self):
+        return False
+
+    def interrupt(self):
+        self.interrupted = True
+
+
+class FakeSession:
+    userdata = None
+
+    def __init__(self):
+        self.replies = []
+
+    def generate_reply(self, instructions, allow_interruptions):
+        self.replies.append(FakeSpeech())
+        return self.replies[-1]
+
+
+def context():
+    return SimpleNamespace(session=FakeSession())
+
+
+async def test_fast_work_returns_without_filler():
+    async def work():
+        return "patient"
+
+    assert await run_with_filler(context(), work(), "please wait", threshold=1.0) == "patient"
+
+
+async def test_slow_work_plays_a_filler_then_returns():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "booked"
+
+    ctx = context()
+    assert await run_with_filler(ctx, work(), "please wait", threshold=0.01) == "booked"
+    assert len(ctx.session.replies) == 1
+    # The result came right after the filler started, its audio is cut short
+    assert ctx.session.replies[0].interrupted
+
+
+async def test_interrupted_tool_call_cancels_the_work():
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def work():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    call = asyncio.ensure_future(run_with_filler(context(), work(), "please wait", threshold=5.0))
+    await started.wait()
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+
+async def test_interrupted_booking_releases_the_slot(monkeypatch):
+    slot_index = SlotIndex(slot_minutes=30, opens=None, closes=None)
+    inserting = asyncio.Event()
+
+    async def get_db():
+        async def update_one(*args, **kwargs):
+            inserting.set()
+            await asyncio.sleep(10)
+
+        return SimpleNamespace(appointments=SimpleNamespace(update_one=update_one))
+
+    monkeypatch.setattr(function_tools, "get_slot_index", lambda: slot_index)
+    monkeypatch.setattr(function_tools, "get_mongodb_connection", get_db)
+    monkeypatch.setattr(function_tools, "APPOINTMENT_WRITE_BEHIND", False)
+
+    call = asyncio.ensure_future(function_tools.book_appointment(
+        context(), "Jane Doe", "42", "cardiology", "2099-01-02", "10:00"))
+    await inserting.wait()
+    assert not slot_index.is_free("cardiology", "2099-01-02", "10:00")
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    assert slot_index.is_free("cardiology", "2099-01-02", "10:00")
@@ -0,0 +1,83 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent_utils.turn_tracing import (
+    TurnTracer,
+    critical_path,
+    load_turns,
+    prune_traces,
+    report,
+)
+
+SPEECH_END = 1000.0
+
+
+def eou_metrics(speech_id):
+    return SimpleNamespace(type="eou_metrics", speech_id=speech_id, last_speaking_time=SPEECH_END,
+                           transcription_delay=0.2, end_of_utterance_delay=0.5, on_user_turn_completed_delay=0.05)
+
+
+def llm_metrics():
+    return SimpleNamespace(type="llm_metrics", timestamp=SPEECH_END + 1.6, duration=1.0, ttft=0.3,
+                           label="openai.LLM", prompt_tokens=900, cancelled=False)
+
+
+def tts_metrics():
+    return SimpleNamespace(type="tts_metrics", timestamp=SPEECH_END + 1.5, duration=0.5, ttfb=0.2,
+                           label="cartesia.TTS", characters_count=42)
+
+
+def trace_file(directory, name, size, age):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prunes_expired_then_oldest_over_the_cap(tmp_path):
+    expired = trace_file(tmp_path, "expired.jsonl", 10, age=3600)
+    oldest = trace_file(tmp_path, "oldest.jsonl", 60, age=300)
+    older = trace_file(tmp_path, "older.jsonl", 60, age=200)
+    newest = trace_file(tmp_path, "newest.jsonl", 60, age=100)
+    other = trace_file(tmp_path, "notes.txt", 500, age=3600)
+
+    assert prune_traces(str(tmp_path), retention=1800, max_bytes=150) == 2
+    assert not expired.exists()
+    assert not oldest.exists()
+    assert older.exists()
+    assert newest.exists()
+    assert other.exists()
+
+
+async def test_critical_path_of_a_traced_turn(tmp_path, capsys):
+    tracer = TurnTracer("session-1", directory=str(tmp_path))
+    tracer.on_metrics(eou_metrics("speech-1"))
+    tracer.on_metrics(llm_metrics())
+    tracer.on_metrics(tts_metrics())
+    await tracer.aclose()
+
+    with open(tracer.path, encoding="utf-8") as f:
+        request = json.loads(f.readline())
+    spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = spans[0]
+    assert "parentSpanId" not in root
+    assert {s["parentSpanId"] for s in spans[1:]} == {root["spanId"]}
+    assert {s["traceId"] for s in spans} == {root["traceId"]}
+
+    turns = load_turns([tracer.path])
+    assert len(turns) == 1
+    # The turn ends when the first TTS frame is ready
+    assert turns[0]["root"]["end"] == pytest.approx(SPEECH_END + 1.2)
+    # stt_final finished before the EOU decision and llm_request contains llm_first_token
+    assert [s["name"] for s in critical_path(turns[0])] == [
+        "eou_decision", "turn_completed", "llm_first_token", "tts_first_frame"]
+
+    report([tracer.path])
+    out = capsys.readouterr().out
+    assert "1 turns from 1 files" in out
+    assert "tts_first_frame" in out
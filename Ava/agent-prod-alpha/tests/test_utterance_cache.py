@@ -0,0 +1,111 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.rtc")
+
+from agent_utils.utterance_cache import (
+    UtteranceCache,
+    say_cached,
+    static_utterances,
+    utterance_key,
+)
+
+VOICE = {"provider": "elevenlabs", "voice_id": "v1"}
+
+
+class FakeFrame:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.sample_rate = 24000
+        self.num_channels = 1
+
+
+class FakeStream:
+    def __init__(self, frames):
+        self._frames = frames
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for frame in self._frames:
+            yield SimpleNamespace(frame=frame)
+
+
+class FakeTTS:
+    def __init__(self):
+        self.requests = 0
+
+    def synthesize(self, text):
+        self.requests += 1
+        return FakeStream([FakeFrame(b"\x01\x00" * 480), FakeFrame(b"\x02\x00" * 480)])
+
+
+class FakeSession:
+    def __init__(self, tts, played_frames=None):
+        self.tts = tts
+        self.played_frames = played_frames
+        self.playing = []
+
+    def say(self, text, audio=None, **kwargs):
+        if audio is not None:
+            self.playing.append(asyncio.ensure_future(self._play(audio)))
+        return text
+
+    async def _play(self, audio):
+        played = 0
+        async for _ in audio:
+            played += 1
+            if played == self.played_frames:
+                # Interrupted by the caller
+                break
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+async def test_miss_tees_live_audio_into_the_cache(tmp_path):
+    cache, tts = UtteranceCache(str(tmp_path)), FakeTTS()
+    session = FakeSession(tts)
+    say_cached(session, cache, "hello", VOICE)
+    await asyncio.gather(*session.playing)
+    await settle()
+
+    _, _, pcm = cache.load(utterance_key("hello", VOICE))
+    assert pcm == b"\x01\x00" * 480 + b"\x02\x00" * 480
+    say_cached(session, cache, "hello", VOICE)
+    await asyncio.gather(*session.playing)
+    assert (tts.requests, cache.hits, cache.misses) == (1, 1, 1)
+
+
+async def test_interrupted_miss_is_not_cached(tmp_path):
+    cache = UtteranceCache(str(tmp_path))
+    session = FakeSession(FakeTTS(), played_frames=1)
+    say_cached(session, cache, "hello", VOICE)
+    await asyncio.gather(*session.playing)
+    await settle()
+    assert not cache.contains(utterance_key("hello", VOICE))
+
+
+async def test_store_evicts_files_and_memory(tmp_path):
+    cache = UtteranceCache(str(tmp_path), max_bytes=1500)
+    await cache.store("old", 24000, 1, b"\x00" * 1000)
+    os.utime(tmp_path / "old.pcm", (0, 0))
+    await cache.store("new", 24000, 1, b"\x00" * 1000)
+    # Both fit in memory but only the newest file fits on disk
+    assert not cache.contains("old")
+    assert cache.load("new") is not None
+
+
+def test_end_call_message_is_not_pre_rendered():
+    metadata = {"firstMessage": "hi", "firstMessageMode": "assistant-speaks-first",
+                "endCallMessage": "bye", "fillerMessages": {"book_appointment": "one moment"}}
+    assert static_utterances(metadata) == ["hi", "one moment"]
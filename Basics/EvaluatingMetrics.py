@@ -1,78 +1,135 @@
-from livekit.agents import Agent, AgentSession, JobContext
-from livekit.plugins import (
-    openai,
-    deepgram,
-    cartesia,
-    silero,
-)
-from livekit.agents.metrics import LLMMetrics, STTMetrics, TTSMetrics, EOUMetrics
-import asyncio
+import os
+import json
+import statistics
+import importlib
+from typing import Optional
+
+from livekit.agents import Agent, AgentSession, JobContext, MetricsCollectedEvent
+from livekit.plugins import silero
+
+# Providers under evaluation, blueprint-style sections as JSON or "provider/model",
+# e.g. METRICS_AGENT_LLM=openai/gpt-4o-mini for lower latency. Offline A/B
+# comparisons on recorded calls: Ava/agent-prod-alpha/benchmarks/provider_ab.py
+DEFAULT_PROVIDERS = {
+    'stt': {"provider": "deepgram", "model": "nova-3", "language": "multi"},
+    'llm': {"provider": "openai", "model": "gpt-4-turbo"},
+    'tts': {"provider": "cartesia", "model": "sonic-2", "voice": "f786b574-daa5-4673-aa0c-cbe3e8534c02"},
+}
+
+# Latencies recorded per metrics type, STT duration of non-streamed requests only
+LATENCIES = {
+    "llm_metrics": ["ttft"],
+    "tts_metrics": ["ttfb"],
+    "eou_metrics": ["end_of_utterance_delay", "transcription_delay"],
+    "stt_metrics": ["duration"],
+}
+# Totals recorded per metrics type
+TOTALS = {
+    "llm_metrics": ["prompt_tokens", "completion_tokens"],
+    "stt_metrics": ["audio_duration"],
+}
+
+
+def provider_config(kind: str) -> dict:
+    value = os.getenv(f'METRICS_AGENT_{kind.upper()}')
+    if not value:
+        return DEFAULT_PROVIDERS[kind]
+    if value.lstrip().startswith('{'):
+        return json.loads(value)
+    provider, _, model = value.partition('/')
+    return {"provider": provider, "model": model} if model else {"provider": provider}
+
+
+def provider_label(config: dict) -> str:
+    return f"{config['provider']}/{config.get('model') or config.get('voice') or ''}"
+
+
+def plugin(config: dict):
+    return importlib.import_module(f"livekit.plugins.{config['provider'].lower()}")
+
+
+def provider_instance(config: dict, kind: str):
+    """e.g. {"provider": "deepgram", "model": "nova-3"} -> deepgram.STT(model="nova-3")"""
+    params = {key: value for key, value in config.items() if key != 'provider'}
+    return getattr(plugin(config), kind.upper())(**params)
+
+
+PROVIDERS = {kind: provider_config(kind) for kind in DEFAULT_PROVIDERS}
+# Plugins must be imported on the main thread
+for config in PROVIDERS.values():
+    plugin(config)
+
+
+class SessionLatencies:
+    """Latency samples and token counts of one session, recorded synchronously from metrics_collected"""
+
+    def __init__(self):
+        self.samples = {f"{kind.split('_')[0]} {name}": [] for kind, names in LATENCIES.items() for name in names}
+        self.totals = {name: 0 for names in TOTALS.values() for name in names}
+        self.tokens_per_second = []
+
+    def record(self, metrics):
+        if metrics.type == "stt_metrics" and metrics.streamed:
+            # A streamed STT's latency is the transcription delay of the EOU metrics
+            names = []
+        else:
+            names = LATENCIES.get(metrics.type, [])
+        for name in names:
+            value = getattr(metrics, name)
+            if value >= 0:
+                self.samples[f"{metrics.type.split('_')[0]} {name}"].append(value)
+        for name in TOTALS.get(metrics.type, []):
+            self.totals[name] += getattr(metrics, name)
+        if metrics.type == "llm_metrics" and metrics.tokens_per_second > 0:
+            self.tokens_per_second.append(metrics.tokens_per_second)
+
+    def report(self) -> str:
+        parts = [
+            f"{name} p50 {statistics.median(values) * 1000:.0f}ms ({len(values)})"
+            for name, values in self.samples.items() if values
+        ]
+        if not parts:
+            return "no turns"
+        parts.append(f"{self.totals['prompt_tokens']} prompt / {self.totals['completion_tokens']} completion tokens")
+        if self.tokens_per_second:
+            parts.append(f"{statistics.median(self.tokens_per_second):.1f} tokens/s p50")
+        parts.append(f"{self.totals['audio_duration']:.1f}s of audio transcribed")
+        return ", ".join(parts)
+
 
 class MetricsAgent(Agent):
-    def __init__(self) -> None:
-        #llm = openai.LLM(model="gpt-4o-mini")  # Example with lower latency
-        stt = deepgram.STT(model="nova-3", language="multi")
-        llm = openai.LLM(model="gpt-4-turbo")  # Updated to use OpenAI's GPT-4 Turbo
-        tts = cartesia.TTS(model="sonic-2", voice="f786b574-daa5-4673-aa0c-cbe3e8534c02")
+    def __init__(self, providers: Optional[dict] = None) -> None:
+        providers = providers or PROVIDERS
         silero_vad = silero.VAD.load()
 
         super().__init__(
             instructions="You are a helpful assistant communicating via voice",
-            stt=stt,
-            llm=llm,
-            tts=tts,
+            stt=provider_instance(providers['stt'], 'stt'),
+            llm=provider_instance(providers['llm'], 'llm'),
+            tts=provider_instance(providers['tts'], 'tts'),
             vad=silero_vad,
         )
 
-        def llm_metrics_wrapper(metrics: LLMMetrics):
-            asyncio.create_task(self.on_llm_metrics_collected(metrics))
-        llm.on("metrics_collected", llm_metrics_wrapper)
-
-        def stt_metrics_wrapper(metrics: STTMetrics):
-            asyncio.create_task(self.on_stt_metrics_collected(metrics))
-        stt.on("metrics_collected", stt_metrics_wrapper)
-
-        def eou_metrics_wrapper(metrics: EOUMetrics):
-            asyncio.create_task(self.on_eou_metrics_collected(metrics))
-        stt.on("eou_metrics_collected", eou_metrics_wrapper)
-
-        def tts_metrics_wrapper(metrics: TTSMetrics):
-            asyncio.create_task(self.on_tts_metrics_collected(metrics))
-        tts.on("metrics_collected", tts_metrics_wrapper)
-
-    async def on_llm_metrics_collected(self, metrics: LLMMetrics) -> None:
-        print("\n--- LLM Metrics ---")
-        print(f"Prompt Tokens: {metrics.prompt_tokens}")
-        print(f"Completion Tokens: {metrics.completion_tokens}")
-        print(f"Tokens per second: {metrics.tokens_per_second:.4f}")
-        print(f"TTFT: {metrics.ttft:.4f}s")
-        print("------------------\n")
-
-    async def on_stt_metrics_collected(self, metrics: STTMetrics) -> None:
-        print("\n--- STT Metrics ---")
-        print(f"Duration: {metrics.duration:.4f}s")
-        print(f"Audio Duration: {metrics.audio_duration:.4f}s")
-        print(f"Streamed: {'Yes' if metrics.streamed else 'No'}")
-        print("------------------\n")
-
-    async def on_eou_metrics_collected(self, metrics: EOUMetrics) -> None:
-        print("\n--- End of Utterance Metrics ---")
-        print(f"End of Utterance Delay: {metrics.end_of_utterance_delay:.4f}s")
-        print(f"Transcription Delay: {metrics.transcription_delay:.4f}s")
-        print("--------------------------------\n")
-
-    async def on_tts_metrics_collected(self, metrics: TTSMetrics) -> None:
-        print("\n--- TTS Metrics ---")
-        print(f"TTFB: {metrics.ttfb:.4f}s")
-        print(f"Duration: {metrics.duration:.4f}s")
-        print(f"Audio Duration: {metrics.audio_duration:.4f}s")
-        print(f"Streamed: {'Yes' if metrics.streamed else 'No'}")
-        print("------------------\n")
 
 async def entrypoint(ctx: JobContext):
     await ctx.connect()
     session = AgentSession()
+
+    # Recording only appends to lists, the summary is printed when the job ends
+    latencies = SessionLatencies()
+
+    @session.on("metrics_collected")
+    def _on_metrics_collected(ev: MetricsCollectedEvent):
+        latencies.record(ev.metrics)
+
+    async def log_metrics():
+        # Labelled with the providers so runs can be compared
+        combo = " + ".join(provider_label(PROVIDERS[kind]) for kind in ('stt', 'llm', 'tts'))
+        print(f"Session metrics ({combo}): {latencies.report()}")
+
+    ctx.add_shutdown_callback(log_metrics)
+
     await session.start(
         agent=MetricsAgent(),
         room=ctx.room,
-    )
\ No newline at end of file
+    )